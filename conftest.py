@@ -0,0 +1,4 @@
+# Тестовые базы копируются из мигрированного шаблона (core.testing).
+# Плагин подключается здесь, а не ключом -p в pytest.ini: к разбору
+# ключей путь yatube/ из python_paths ещё не добавлен
+pytest_plugins = ['core.testing.pytest_plugin']
@@ -1,5 +1,14 @@
-from django.apps import AppConfig
+from django.apps import AppConfig, apps
+from django.contrib.auth.password_validation import (
+    get_default_password_validators)
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from . import auth_backends, checks  # noqa: F401
+        from .storage import track_references
+        track_references(apps.get_models())
+        # Список частых паролей читается при старте, а не при регистрации
+        get_default_password_validators()
@@ -0,0 +1,78 @@
+"""Бэкенд аутентификации с пользователем в общем кэше.
+
+AuthenticationMiddleware вызывает get_user() на каждом запросе вошедшего
+пользователя. Пользователь берётся из кэша USER_CACHE, без запроса
+к БД. В кэше лежат только поля из USER_CACHE_FIELDS и хэш сессии
+(HMAC пароля, а не сам хэш пароля); остальные поля объекта отложены
+и читаются из БД при обращении. Сохранение или удаление пользователя
+сбрасывает запись.
+
+Сброс должен дойти до всех воркеров, поэтому кэш обязан быть общим
+(memcached, redis); локальный кэш процесса отклоняет проверка
+core.E001. Пока USER_CACHE не задан, бэкенд читает пользователя
+из БД, как ModelBackend.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+USER_CACHE_FIELDS = ('id', 'username', 'first_name', 'last_name', 'email',
+                     'is_active', 'is_staff', 'is_superuser')
+
+
+def user_cache_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def user_cache():
+    """Общий кэш пользователей или None, если он не настроен."""
+    alias = settings.USER_CACHE
+    return caches[alias] if alias else None
+
+
+def cached_fields(user):
+    fields = {name: getattr(user, name) for name in USER_CACHE_FIELDS}
+    fields['session_auth_hash'] = user.get_session_auth_hash()
+    return fields
+
+
+def user_from_cache(fields):
+    """Пользователь с полями из кэша; остальные загрузятся по требованию."""
+    model = get_user_model()
+    # from_db ждёт значения в порядке полей модели
+    names = [field.attname for field in model._meta.concrete_fields
+             if field.attname in fields]
+    user = model.from_db(None, names, [fields[name] for name in names])
+    session_auth_hash = fields['session_auth_hash']
+    # Хэш сессии считается от пароля, которого в кэше нет
+    user.get_session_auth_hash = lambda: session_auth_hash
+    return user
+
+
+class CachedModelBackend(ModelBackend):
+
+    def get_user(self, user_id):
+        cache = user_cache()
+        if cache is None:
+            return super().get_user(user_id)
+        key = user_cache_key(user_id)
+        fields = cache.get(key)
+        if fields is None:
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            cache.set(key, cached_fields(user), settings.USER_CACHE_TIMEOUT)
+        else:
+            user = user_from_cache(fields)
+        return user if self.user_can_authenticate(user) else None
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def user_changed(sender, instance, **kwargs):
+    cache = user_cache()
+    if cache is not None:
+        cache.delete(user_cache_key(instance.pk))
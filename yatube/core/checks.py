@@ -0,0 +1,72 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+# Кэши, которые живут внутри одного процесса
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+# Хранилища сессий, которые держат сессию в кэше
+CACHED_SESSION_ENGINES = (
+    'django.contrib.sessions.backends.cache',
+    'django.contrib.sessions.backends.cached_db',
+)
+
+
+def shared_cache_errors(setting, alias, hint):
+    """Ошибки, если кэш alias из настройки setting не общий для воркеров."""
+    backend = settings.CACHES.get(alias, {}).get('BACKEND')
+    if backend is None:
+        return [Error(f'{setting}: нет кэша {alias!r} в CACHES.',
+                      id='core.E002')]
+    if backend in LOCAL_CACHE_BACKENDS:
+        return [Error(
+            f'{setting}: кэш {alias!r} ({backend}) не общий для воркеров.',
+            hint=f'{hint}; укажите memcached или redis.',
+            id='core.E001')]
+    return []
+
+
+@register(Tags.caches)
+def user_cache_is_shared(app_configs, **kwargs):
+    """USER_CACHE должен указывать на кэш, общий для всех воркеров."""
+    alias = settings.USER_CACHE
+    if not alias:
+        return []
+    return shared_cache_errors(
+        'USER_CACHE', alias,
+        'Сброс после смены пароля не дойдёт до других процессов')
+
+
+@register(Tags.caches)
+def session_cache_is_shared(app_configs, **kwargs):
+    """Сессии в кэше - только в кэше, общем для всех воркеров."""
+    if settings.SESSION_ENGINE not in CACHED_SESSION_ENGINES:
+        return []
+    return shared_cache_errors(
+        'SESSION_CACHE_ALIAS', settings.SESSION_CACHE_ALIAS,
+        'После выхода на одном воркере другие продолжат отдавать '
+        'сессию из своего кэша')
+
+
+@register(Tags.caches)
+def profiling_cache_is_shared(app_configs, **kwargs):
+    """PROFILING_CACHE должен указывать на кэш, общий для всех воркеров."""
+    alias = settings.PROFILING_CACHE
+    if not alias:
+        return []
+    return shared_cache_errors(
+        'PROFILING_CACHE', alias,
+        'Сеанс включится только в том воркере, где его запустили')
+
+
+@register(Tags.caches)
+def throttle_cache_is_shared(app_configs, **kwargs):
+    """THROTTLE_CACHE должен указывать на кэш, общий для всех воркеров."""
+    alias = settings.THROTTLE_CACHE
+    if not alias:
+        return []
+    return shared_cache_errors(
+        'THROTTLE_CACHE', alias,
+        'Каждый воркер будет считать запросы сам, и лимит умножится '
+        'на число воркеров')
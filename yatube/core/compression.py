@@ -0,0 +1,101 @@
+"""Сжатие ответов и удаление лишних пробелов из HTML.
+
+Сжатие выбирается по Accept-Encoding: brotli, если установлен пакет
+brotli и клиент его принимает, иначе gzip. Потоковые ответы сжимаются
+по частям. HTML можно предварительно «ужать»: пробелы между тегами и
+повторяющиеся пробелы убираются везде, кроме pre, textarea, script
+и style.
+"""
+import re
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    'text/', 'application/json', 'application/javascript',
+    'application/xml', 'image/svg+xml',
+)
+PRESERVED_RE = re.compile(
+    rb'(<(pre|textarea|script|style)\b.*?</\2\s*>)', re.S | re.I)
+# Перевод строки с отступом между тегами - разметка шаблона, а не текст
+BETWEEN_TAGS_RE = re.compile(rb'>\s*\n\s*<')
+SPACES_RE = re.compile(rb'\s+')
+
+
+def minify_html(content):
+    """HTML без пробелов между тегами и повторяющихся пробелов."""
+    parts = PRESERVED_RE.split(content)
+    result = []
+    # split() с двумя группами: текст, блок целиком, имя тега, текст...
+    for index in range(0, len(parts), 3):
+        text = BETWEEN_TAGS_RE.sub(b'><', parts[index])
+        result.append(SPACES_RE.sub(b' ', text))
+        if index + 1 < len(parts):
+            result.append(parts[index + 1])
+    return b''.join(result).strip()
+
+
+def accepted_encodings(header):
+    """Кодировки из Accept-Encoding с ненулевым q."""
+    accepted = set()
+    for item in (header or '').split(','):
+        coding, _, params = item.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if coding and quality > 0:
+            accepted.add(coding.lower())
+    return accepted
+
+
+def choose_encoding(header):
+    accepted = accepted_encodings(header)
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+
+def _gzip_compressor(level):
+    return zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+
+def compress(data, encoding, level=6):
+    if encoding == 'br':
+        return brotli.compress(data, quality=min(level, 11))
+    compressor = _gzip_compressor(level)
+    return compressor.compress(data) + compressor.flush()
+
+
+def compress_stream(chunks, encoding, level=6):
+    """Сжимает поток по частям, отдавая данные после каждой части."""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=min(level, 11))
+        process, finish = compressor.process, compressor.finish
+    else:
+        compressor = _gzip_compressor(level)
+
+        def process(chunk):
+            return compressor.compress(chunk) + compressor.flush(
+                zlib.Z_SYNC_FLUSH)
+        finish = compressor.flush
+    for chunk in chunks:
+        data = process(chunk)
+        if data:
+            yield data
+    yield finish()
+
+
+def is_compressible(response):
+    content_type = response.get('Content-Type', '')
+    return (not response.has_header('Content-Encoding')
+            and response.status_code != 206
+            and content_type.startswith(COMPRESSIBLE_TYPES))
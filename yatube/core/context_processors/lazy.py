@@ -0,0 +1,94 @@
+"""Ленивые контекст-процессоры с TTL-кэшем и замером стоимости.
+
+Процессор из LAZY_CONTEXT_PROCESSORS отдаёт в контекст не значения,
+а ленивые прокси для объявленных ключей. Процессор вызывается при
+первом обращении к любому из них, поэтому процессор, чей вывод шаблон
+не использует, не вычисляется вовсе. Прокси передаёт значению
+атрибуты, сравнения и вывод, так что его читают и теги на Python. Результат
+запоминается на объекте запроса, время каждого вызова пишется в лог
+и в request.context_processor_timings.
+"""
+import functools
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.utils.functional import SimpleLazyObject
+
+logger = logging.getLogger(__name__)
+
+
+def ttl_cache(ttl):
+    """Запоминает результат процессора на ttl секунд для всего процесса.
+
+    Подходит только процессорам, чей результат не зависит от запроса.
+    """
+    def decorator(processor):
+        lock = threading.Lock()
+        state = {'expires': 0.0, 'value': None}
+
+        @functools.wraps(processor)
+        def wrapper(request):
+            now = time.monotonic()
+            if now >= state['expires']:
+                with lock:
+                    if now >= state['expires']:
+                        state['value'] = processor(request)
+                        state['expires'] = now + ttl
+            return state['value']
+
+        wrapper.cache_clear = lambda: state.update(expires=0.0)
+        return wrapper
+    return decorator
+
+
+def timed_call(path, processor, request):
+    """Вызывает процессор и записывает, сколько он стоил запросу."""
+    started = time.perf_counter()
+    result = processor(request)
+    elapsed = (time.perf_counter() - started) * 1000
+    timings = request.__dict__.setdefault('context_processor_timings', {})
+    timings[path] = timings.get(path, 0.0) + elapsed
+    logger.debug('Контекст-процессор %s: %.3f ms (%s)',
+                 path, elapsed, request.path)
+    return result
+
+
+class LazyValue(SimpleLazyObject):
+    """Значение ключа процессора, вычисляется при первом обращении."""
+
+    def __init__(self, evaluate, key):
+        super().__init__(lambda: evaluate().get(key))
+
+
+def lazy_processor(path, processor, keys):
+    """Оборачивает процессор: ключи отдаются лениво, вызов один на запрос."""
+    def wrapper(request):
+        def evaluate():
+            results = request.__dict__.setdefault(
+                '_context_processor_results', {})
+            if path not in results:
+                results[path] = timed_call(path, processor, request)
+            return results[path]
+        return {key: LazyValue(evaluate, key) for key in keys}
+    return wrapper
+
+
+def timed_processor(path, processor):
+    """Оборачивает процессор без объявленных ключей: только замер."""
+    def wrapper(request):
+        return timed_call(path, processor, request)
+    return wrapper
+
+
+def wrap_processors(paths, processors):
+    """Оборачивает processors, соответствующие путям paths."""
+    lazy = getattr(settings, 'LAZY_CONTEXT_PROCESSORS', {})
+    wrapped = []
+    for path, processor in zip(paths, processors):
+        if path in lazy:
+            wrapped.append(lazy_processor(path, processor, lazy[path]))
+        else:
+            wrapped.append(timed_processor(path, processor))
+    return tuple(wrapped)
@@ -1,6 +1,9 @@
 from django.utils import timezone
 
+from .lazy import ttl_cache
 
+
+@ttl_cache(60)
 def year(request):
     """Добавляет переменную с текущим годом."""
     return {
@@ -0,0 +1,167 @@
+"""Отдача статики и медиафайлов из процесса приложения.
+
+Файл передаётся объектом FileResponse: WSGI-сервер с
+wsgi.file_wrapper (gunicorn, uWSGI) отправляет его через sendfile,
+не копируя в память процесса. Поддерживаются запросы одного
+диапазона байтов (Range), условные запросы и заранее сжатые
+варианты .br/.gz, созданные collectstatic.
+"""
+import mimetypes
+import os
+import re
+import stat
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_http_date_safe
+
+from .compression import accepted_encodings
+from .storage import ContentAddressedStorage
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+HASHED_STATIC_RE = re.compile(r'\.[0-9a-f]{12}\.\w+$')
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+class FileRange:
+    """Часть открытого файла, которую FileResponse читает до конца.
+
+    fileno() оставлен, чтобы сервер мог отправить диапазон через
+    sendfile, ограничившись Content-Length.
+    """
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """(start, length) для одного диапазона или None, если он не задан.
+
+    Неудовлетворимый диапазон даёт ValueError.
+    """
+    match = RANGE_RE.match(header or '')
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        start = max(size - int(last), 0)
+        end = size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end - start + 1
+
+
+def cache_control(name, max_age):
+    """Имена с хэшем содержимого кэшируются навсегда."""
+    if (HASHED_STATIC_RE.search(name)
+            or ContentAddressedStorage.is_hashed(name)):
+        return IMMUTABLE
+    return f'public, max-age={max_age}'
+
+
+def _not_modified(request, etag, mtime):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match is not None:
+        return etag in [tag.strip() for tag in if_none_match.split(',')]
+    since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE'))
+    return since is not None and int(mtime) <= since
+
+
+def _variant(request, path, precompressed):
+    """Путь, размер и Content-Encoding отдаваемого варианта файла."""
+    if precompressed and not mimetypes.guess_type(path)[1]:
+        accepted = accepted_encodings(
+            request.META.get('HTTP_ACCEPT_ENCODING'))
+        for coding, ext in ENCODINGS:
+            if coding in accepted and os.path.isfile(path + ext):
+                return path + ext, os.path.getsize(path + ext), coding
+    return path, os.path.getsize(path), None
+
+
+def _byte_range(request, etag, size):
+    """Запрошенный диапазон, если If-Range совпадает с ETag."""
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range is not None and if_range != etag:
+        return None
+    return parse_range(request.META.get('HTTP_RANGE'), size)
+
+
+def _headers(response, etag, mtime, cache, precompressed):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(mtime)
+    response['Cache-Control'] = cache
+    if precompressed:
+        response['Vary'] = 'Accept-Encoding'
+    return response
+
+
+def _file_response(request, path, size, byte_range, content_type):
+    content_type = content_type or 'application/octet-stream'
+    if content_type.startswith('text/'):
+        content_type += '; charset=utf-8'
+    if request.method == 'HEAD':
+        response = HttpResponse(content_type=content_type)
+    else:
+        file = open(path, 'rb')
+        if byte_range:
+            file = FileRange(file, *byte_range)
+        response = FileResponse(file, content_type=content_type)
+    response['Accept-Ranges'] = 'bytes'
+    response['Content-Length'] = size
+    if byte_range:
+        start, length = byte_range
+        response.status_code = 206
+        response['Content-Range'] = (
+            f'bytes {start}-{start + length - 1}/{size}')
+        response['Content-Length'] = length
+    return response
+
+
+def serve_file(request, root, name, max_age, precompressed=False):
+    """Ответ с файлом root/name или None, если файла нет."""
+    try:
+        path = safe_join(root, name)
+        stats = os.stat(path)
+    except (OSError, ValueError, SuspiciousFileOperation):
+        return None
+    if not stat.S_ISREG(stats.st_mode):
+        return None
+    send_path, size, encoding = _variant(request, path, precompressed)
+    etag = f'{stats.st_mtime_ns:x}-{stats.st_size:x}'
+    etag = f'"{etag}-{encoding}"' if encoding else f'"{etag}"'
+    headers = (etag, stats.st_mtime, cache_control(name, max_age),
+               precompressed)
+    if _not_modified(request, etag, stats.st_mtime):
+        return _headers(HttpResponseNotModified(), *headers)
+    try:
+        byte_range = None if encoding else _byte_range(request, etag, size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    response = _file_response(request, send_path, size, byte_range,
+                              mimetypes.guess_type(path)[0])
+    if encoding:
+        response['Content-Encoding'] = encoding
+    return _headers(response, *headers)
@@ -0,0 +1,34 @@
+from django import forms
+from django.conf import settings
+
+
+class ProfilingForm(forms.Form):
+    views = forms.CharField(
+        label='View', required=False,
+        help_text='Имена через запятую, например posts:posts_index, '
+                  'posts:follow_index.')
+    rate = forms.FloatField(
+        label='Доля остальных запросов, %', min_value=0, max_value=100,
+        initial=0)
+    duration = forms.IntegerField(
+        label='Длительность, с', min_value=1, max_value=60 * 60,
+        initial=60)
+    interval = forms.IntegerField(
+        label='Интервал сэмплирования, мс', min_value=1, max_value=1000,
+        initial=settings.PROFILING_INTERVAL_MS)
+
+    def clean_views(self):
+        return [name.strip()
+                for name in self.cleaned_data['views'].split(',')
+                if name.strip()]
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if not settings.PROFILING_CACHE:
+            raise forms.ValidationError(
+                'Не задан общий кэш PROFILING_CACHE: сеанс включился бы '
+                'только в одном воркере.')
+        if not cleaned_data.get('views') and not cleaned_data.get('rate'):
+            raise forms.ValidationError(
+                'Укажите view или долю запросов.')
+        return cleaned_data
@@ -0,0 +1,83 @@
+"""Персональные фрагменты страниц (ESI-дырки).
+
+Общая для всех «оболочка» страницы кэшируется целиком, а части,
+зависящие от пользователя, вставляются в неё тегом
+<esi:include src="/fragments/<name>/?..."/>. Тег заполняет либо
+edge-кэш с поддержкой ESI, либо FragmentMiddleware, а фрагмент можно
+запросить и отдельно по его URL.
+"""
+import inspect
+import re
+from html import escape, unescape
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from django.template.loader import render_to_string
+from django.urls import Resolver404, get_script_prefix, resolve
+
+from .fast_reverse import fast_reverse
+
+ESI_INCLUDE_RE = re.compile(rb'<esi:include src="([^"]*)"\s*/>')
+
+_registry = {}
+
+
+def register(name):
+    """Регистрирует функцию фрагмента: (request, **params) -> str."""
+    def decorator(func):
+        accepted = list(inspect.signature(func).parameters)[1:]
+        _registry[name] = (func, accepted)
+        return func
+    return decorator
+
+
+def render_fragment(request, name, params):
+    """HTML фрагмента или None, если такого фрагмента нет.
+
+    Лишние параметры отбрасываются: фрагмент получает только те,
+    что объявлены в его сигнатуре.
+    """
+    if name not in _registry:
+        return None
+    func, accepted = _registry[name]
+    return func(request, **{key: params[key]
+                            for key in accepted if key in params})
+
+
+def include_tag(name, **params):
+    """Разметка ESI-включения фрагмента."""
+    src = fast_reverse('core:fragment', name)
+    params = {key: value for key, value in params.items() if value}
+    if params:
+        src = f'{src}?{urlencode(params)}'
+    return f'<esi:include src="{escape(src)}"/>'
+
+
+def _fragment_from_src(src):
+    parts = urlsplit(unescape(src))
+    path = parts.path
+    prefix = get_script_prefix()
+    if path.startswith(prefix):
+        path = '/' + path[len(prefix):]
+    try:
+        match = resolve(path)
+    except Resolver404:
+        return None, None
+    if match.view_name != 'core:fragment':
+        return None, None
+    return match.kwargs['name'], dict(parse_qsl(parts.query))
+
+
+def fill(content, request):
+    """Заменяет ESI-включения в готовом HTML отрендеренными фрагментами."""
+    def replace(match):
+        name, params = _fragment_from_src(match.group(1).decode())
+        html = render_fragment(request, name, params)
+        return html.encode() if html is not None else b''
+    return ESI_INCLUDE_RE.sub(replace, content)
+
+
+@register('header_user')
+def header_user(request, view_name=''):
+    """Пункты меню шапки, зависящие от входа пользователя."""
+    return render_to_string(
+        'fragments/header_user.html', {'view_name': view_name}, request)
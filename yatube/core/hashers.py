@@ -0,0 +1,40 @@
+"""PBKDF2 с настраиваемым числом итераций и ограниченным пулом потоков.
+
+Алгоритм тот же, что у стандартного PBKDF2PasswordHasher, поэтому
+старые хэши проверяются без изменений. Если у хэша другое число
+итераций, Django пересчитывает его при следующем входе.
+
+hashlib.pbkdf2_hmac отпускает GIL, поэтому хэширование в пуле из
+PASSWORD_HASH_WORKERS потоков идёт параллельно с обработкой других
+запросов, но волна регистраций не займёт больше этого числа ядер.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+_executor = None
+_lock = threading.Lock()
+
+
+def executor():
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.PASSWORD_HASH_WORKERS,
+                    thread_name_prefix='password-hash')
+    return _executor
+
+
+class PooledPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_HASH_ITERATIONS
+
+    def encode(self, password, salt, iterations=None):
+        return executor().submit(
+            super().encode, password, salt, iterations).result()
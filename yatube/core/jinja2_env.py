@@ -0,0 +1,52 @@
+"""Окружение Jinja2 с аналогами тегов и фильтров DTL."""
+import logging
+
+from django.template.defaultfilters import date, linebreaks, truncatechars
+from django.templatetags.static import static
+from jinja2 import Environment
+from markupsafe import Markup
+from sorl.thumbnail import get_thumbnail
+
+from .fast_reverse import fast_reverse
+from .fragments import include_tag
+from .templatetags.user_filters import addclass
+from posts.templatetags.following import is_following
+
+logger = logging.getLogger(__name__)
+
+
+def thumbnail(file_, geometry, **options):
+    """Аналог тега {% thumbnail %}: миниатюра или None.
+
+    Как и тег sorl-thumbnail, ошибки генерации не ломают страницу.
+    """
+    if not file_:
+        return None
+    try:
+        return get_thumbnail(file_, geometry, **options)
+    except Exception:
+        logger.exception('Не удалось создать миниатюру %s', file_)
+        return None
+
+
+def fragment(name, **params):
+    """Аналог тега {% fragment %}."""
+    return Markup(include_tag(name, **params))
+
+
+def environment(**options):
+    env = Environment(**options)
+    env.globals.update({
+        'static': static,
+        'url': fast_reverse,
+        'fragment': fragment,
+        'thumbnail': thumbnail,
+    })
+    env.filters.update({
+        'addclass': addclass,
+        'date': date,
+        'is_following': is_following,
+        'linebreaks': linebreaks,
+        'truncatechars': truncatechars,
+    })
+    return env
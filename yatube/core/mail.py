@@ -0,0 +1,139 @@
+"""Очередь исходящих писем.
+
+QueuedEmailBackend не ходит в сеть: каждое письмо сохраняется в Outbox
+целиком в формате MIME одной вставкой, поэтому запрос сброса пароля не
+ждёт почтовый сервер. Команда send_queued_mail забирает созревшие
+письма пачкой и отправляет их через EMAIL_DELIVERY_BACKEND по одному
+соединению; после ошибки отправки соединение открывается заново.
+Неудачная попытка откладывает письмо на
+EMAIL_QUEUE_RETRY_DELAY * 2 ** (попытка - 1) секунд, после
+EMAIL_QUEUE_MAX_ATTEMPTS попыток письмо помечается failed.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.utils import timezone
+
+from .models import Outbox
+
+# Сколько секунд взятое письмо не достанется другому процессу
+LEASE = 5 * 60
+
+
+class RawMessage:
+    """Готовое письмо с интерфейсом, который ждут почтовые бэкенды."""
+
+    def __init__(self, data):
+        self.data = data
+
+    def as_bytes(self, unixfrom=False, linesep='\n'):
+        if linesep == '\n':
+            return self.data
+        return self.data.replace(b'\n', linesep.encode())
+
+    def get_charset(self):
+        return None
+
+
+class QueuedMessage(EmailMessage):
+    """Письмо из очереди, отправляемое без повторной сборки."""
+
+    def __init__(self, outbox, connection=None):
+        super().__init__(subject=outbox.subject,
+                         from_email=outbox.from_email,
+                         to=outbox.recipients.splitlines(),
+                         connection=connection)
+        self.raw = bytes(outbox.message)
+
+    def message(self):
+        return RawMessage(self.raw)
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    """Складывает письма в очередь вместо отправки."""
+
+    def send_messages(self, email_messages):
+        rows = [
+            Outbox(from_email=message.from_email,
+                   recipients='\n'.join(message.recipients()),
+                   subject=str(message.subject)[:255],
+                   message=message.message().as_bytes())
+            for message in email_messages if message.recipients()
+        ]
+        try:
+            Outbox.objects.bulk_create(rows)
+        except Exception:
+            if not self.fail_silently:
+                raise
+            return 0
+        return len(rows)
+
+
+def claim(batch):
+    """Забирает созревшие письма, чтобы их не отправил другой процесс."""
+    now = timezone.now()
+    ids = list(Outbox.objects.filter(
+        failed=False, next_attempt__lte=now).order_by(
+        'next_attempt', 'pk').values_list('pk', flat=True)[:batch])
+    if not ids:
+        return []
+    lease = now + timedelta(seconds=LEASE)
+    Outbox.objects.filter(pk__in=ids, next_attempt__lte=now).update(
+        next_attempt=lease)
+    return list(Outbox.objects.filter(
+        pk__in=ids, next_attempt=lease).order_by('pk'))
+
+
+def retry_later(outbox, error):
+    attempts = outbox.attempts + 1
+    delay = settings.EMAIL_QUEUE_RETRY_DELAY * 2 ** (attempts - 1)
+    Outbox.objects.filter(pk=outbox.pk).update(
+        attempts=attempts,
+        next_attempt=timezone.now() + timedelta(seconds=delay),
+        last_error=repr(error),
+        failed=attempts >= settings.EMAIL_QUEUE_MAX_ATTEMPTS)
+
+
+def close(connection):
+    """Закрывает соединение; ошибка при закрытии уже не важна."""
+    try:
+        connection.close()
+    except Exception:
+        pass
+
+
+def deliver(batch=None):
+    """Отправляет одну пачку писем, возвращает (отправлено, отложено).
+
+    Если соединение не открывается, откладываются все оставшиеся
+    письма пачки: попытка засчитывается, и сервер получает паузу.
+    """
+    outboxes = claim(batch or settings.EMAIL_QUEUE_BATCH)
+    if not outboxes:
+        return 0, 0
+    sent = postponed = 0
+    connection = get_connection(settings.EMAIL_DELIVERY_BACKEND)
+    try:
+        for index, outbox in enumerate(outboxes):
+            try:
+                # Новое соединение, только если прежнее закрыто
+                connection.open()
+            except Exception as error:
+                for rest in outboxes[index:]:
+                    retry_later(rest, error)
+                return sent, postponed + len(outboxes) - index
+            try:
+                connection.send_messages([QueuedMessage(outbox, connection)])
+            except Exception as error:
+                retry_later(outbox, error)
+                postponed += 1
+                # Соединение могло оборваться - следующему письму новое
+                close(connection)
+            else:
+                Outbox.objects.filter(pk=outbox.pk).delete()
+                sent += 1
+    finally:
+        close(connection)
+    return sent, postponed
@@ -0,0 +1,70 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import override_settings
+
+from users.forms import CreationForm
+
+PASSWORD = 'correct-horse-battery'
+
+
+def signup(number):
+    form = CreationForm({
+        'username': f'bench_auth_{number}',
+        'email': f'bench_auth_{number}@example.com',
+        'password1': PASSWORD,
+        'password2': PASSWORD,
+    })
+    assert form.is_valid(), form.errors
+    form.save(commit=False)
+
+
+def login(encoded):
+    assert check_password(PASSWORD, encoded)
+
+
+class Command(BaseCommand):
+    help = ('Измеряет пропускную способность регистрации (валидаторы и '
+            'хэширование) и проверки пароля при входе в нескольких '
+            'потоках.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--operations', type=int, default=40)
+        parser.add_argument('--threads', type=int, nargs='+',
+                            default=[1, 4, 8])
+        parser.add_argument('--iterations', type=int,
+                            default=settings.PASSWORD_HASH_ITERATIONS)
+
+    def run(self, func, args, threads):
+        def call(arg):
+            try:
+                func(arg)
+            finally:
+                connections.close_all()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(call, args))
+        return time.perf_counter() - started
+
+    def handle(self, *args, **options):
+        count = options['operations']
+        self.stdout.write(
+            f'iterations={options["iterations"]}, '
+            f'PASSWORD_HASH_WORKERS={settings.PASSWORD_HASH_WORKERS}')
+        self.stdout.write(f'{"operation":<10}{"threads":>8}'
+                          f'{"op/s":>10}{"ms/op":>10}')
+        with override_settings(
+                PASSWORD_HASH_ITERATIONS=options['iterations']):
+            encoded = make_password(PASSWORD)
+            for threads in options['threads']:
+                for name, func, arguments in (
+                        ('signup', signup, range(count)),
+                        ('login', login, [encoded] * count)):
+                    elapsed = self.run(func, arguments, threads)
+                    self.stdout.write(
+                        f'{name:<10}{threads:>8}{count / elapsed:>10.1f}'
+                        f'{elapsed / count * 1000:>10.2f}')
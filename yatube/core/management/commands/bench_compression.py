@@ -0,0 +1,62 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from core import compression
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = ('Показывает, сколько байт экономят удаление пробелов, gzip '
+            'и brotli на страницах разных типов и сколько CPU это стоит.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--level', type=int,
+                            default=settings.COMPRESSION_LEVEL)
+
+    def pages(self):
+        post = Post.objects.select_related('author', 'group').filter(
+            group__isnull=False).first()
+        if post is None:
+            raise CommandError('Нужен хотя бы один пост в группе.')
+        yield 'index', reverse('posts:posts_index')
+        yield 'group', reverse('posts:group_list', args=[post.group.slug])
+        yield 'profile', reverse('posts:profile', args=[post.author])
+        yield 'post', reverse('posts:post_detail', args=[post.pk])
+
+    def cpu_ms(self, func, repeat):
+        started = time.process_time()
+        for _ in range(repeat):
+            func()
+        return (time.process_time() - started) / repeat * 1000
+
+    def handle(self, *args, **options):
+        repeat, level = options['repeat'], options['level']
+        encodings = ['gzip'] + (['br'] if compression.brotli else [])
+        self.stdout.write(
+            f'{"page":<9}{"variant":<12}{"bytes":>9}{"saved":>8}'
+            f'{"cpu ms":>9}')
+        client = Client()
+        with override_settings(HTML_MINIFY=False):
+            bodies = [(name, client.get(url).content)
+                      for name, url in self.pages()]
+        for name, html in bodies:
+            minified = compression.minify_html(html)
+            rows = [('raw', html, 0.0), ('minify', minified, self.cpu_ms(
+                lambda: compression.minify_html(html), repeat))]
+            for encoding in encodings:
+                for label, body in (('', html), ('minify+', minified)):
+                    data = compression.compress(body, encoding, level)
+                    cost = self.cpu_ms(
+                        lambda: compression.compress(body, encoding, level),
+                        repeat)
+                    rows.append((label + encoding, data, cost))
+            for variant, data, cost in rows:
+                saved = 100 - len(data) * 100 / len(html)
+                self.stdout.write(
+                    f'{name:<9}{variant:<12}{len(data):>9}{saved:>7.1f}%'
+                    f'{cost:>9.3f}')
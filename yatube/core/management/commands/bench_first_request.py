@@ -0,0 +1,45 @@
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.urls import get_resolver
+
+from core.templates_warmup import reset_templates, warm_templates
+from core.testing.bench import isolated_caches
+
+
+class Command(BaseCommand):
+    help = ('Латентность первого запроса к страницам '
+            'без прогрева шаблонов и с ним.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'urls', nargs='*',
+            default=['/', '/about/author/', '/about/tech/'])
+
+    def first_request(self, url):
+        cache.clear()
+        started = time.perf_counter()
+        Client().get(url)
+        return (time.perf_counter() - started) * 1000
+
+    def handle(self, *args, **options):
+        with isolated_caches():
+            self.run(options['urls'])
+
+    def run(self, urls):
+        get_resolver().url_patterns
+        self.stdout.write(f'{"url":<24}{"cold, ms":>12}{"warm, ms":>12}')
+        for url in urls:
+            reset_templates()
+            cold = self.first_request(url)
+            reset_templates()
+            warm_templates()
+            warm = self.first_request(url)
+            self.stdout.write(f'{url:<24}{cold:>12.2f}{warm:>12.2f}')
+        reset_templates()
+        started = time.perf_counter()
+        count = warm_templates()
+        elapsed = (time.perf_counter() - started) * 1000
+        self.stdout.write(f'Прогрев: {count} шаблонов за {elapsed:.2f} ms')
@@ -0,0 +1,68 @@
+import time
+import tracemalloc
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.template import engines
+from django.test import RequestFactory
+from django.urls import resolve
+
+from posts.forms import CommentForm
+from posts.models import Post
+from posts.utils import page
+from yatube.settings import PER_PAGE
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает время рендера и память шаблонов ленты '
+            'и страницы поста в DTL и Jinja2 на одном контексте.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=200)
+
+    def make_request(self, path):
+        request = RequestFactory().get(path)
+        request.resolver_match = resolve(path)
+        request.user = AnonymousUser()
+        return request
+
+    def contexts(self):
+        post = Post.objects.first()
+        if post is None:
+            raise CommandError('Нет постов для рендера.')
+        index = self.make_request('/')
+        yield 'posts/index.html', index, {
+            'page_obj': page(index, Post.objects.all(), PER_PAGE),
+        }
+        detail = self.make_request(f'/posts/{post.pk}/')
+        yield 'posts/post_detail.html', detail, {
+            'post': post,
+            'comments': list(post.comments.all()),
+            'form': CommentForm(),
+        }
+
+    def measure(self, template, context, request, repeat):
+        template.render(dict(context), request)
+        started = time.perf_counter()
+        for _ in range(repeat):
+            template.render(dict(context), request)
+        elapsed = (time.perf_counter() - started) / repeat * 1000
+        tracemalloc.start()
+        template.render(dict(context), request)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return elapsed, peak / 1024
+
+    def handle(self, *args, **options):
+        aliases = [engine.name for engine in engines.all()]
+        if 'jinja2' not in aliases:
+            raise CommandError('Jinja2 не установлен или не настроен.')
+        self.stdout.write(
+            f'{"template":<26}{"engine":<8}{"ms/render":>10}{"peak KiB":>10}')
+        for name, request, context in self.contexts():
+            for alias in ('django', 'jinja2'):
+                template = engines[alias].get_template(name)
+                elapsed, peak = self.measure(
+                    template, context, request, options['repeat'])
+                self.stdout.write(
+                    f'{name:<26}{alias:<8}{elapsed:>10.3f}{peak:>10.1f}')
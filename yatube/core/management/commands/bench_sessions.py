@@ -0,0 +1,52 @@
+import tempfile
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from core.testing.bench import isolated_caches
+from posts.models import Follow
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает пропускную способность follow_index вошедшего '
+            'пользователя для каждого хранилища сессий.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--follows', type=int, default=10)
+
+    def measure(self, engine, user, count):
+        with tempfile.TemporaryDirectory() as path, override_settings(
+                SESSION_ENGINE=engine, SESSION_FILE_PATH=path):
+            cache.clear()
+            client = Client()
+            client.force_login(user)
+            url = reverse('posts:follow_index')
+            client.get(url)
+            started = time.perf_counter()
+            for _ in range(count):
+                client.get(url)
+            return time.perf_counter() - started
+
+    def handle(self, *args, **options):
+        count = options['requests']
+        self.stdout.write(f'{"engine":<16}{"req/s":>10}{"ms/req":>10}')
+        with isolated_caches(), transaction.atomic():
+            user = get_user_model().objects.create_user(
+                username='bench_sessions')
+            authors = get_user_model().objects.exclude(pk=user.pk)
+            Follow.objects.bulk_create(
+                Follow(user=user, author=author)
+                for author in authors[:options['follows']])
+            for name, engine in settings.SESSION_ENGINES.items():
+                elapsed = self.measure(engine, user, count)
+                self.stdout.write(
+                    f'{name:<16}{count / elapsed:>10.1f}'
+                    f'{elapsed / count * 1000:>10.2f}')
+            transaction.set_rollback(True)
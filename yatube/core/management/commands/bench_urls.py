@@ -0,0 +1,41 @@
+import timeit
+
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+
+from core.fast_reverse import fast_reverse
+from yatube.settings import PER_PAGE
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает reverse и fast_reverse на ссылках одной '
+            'страницы ленты: group_list, post_detail и profile.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        cards = [(f'group-{i}', i, f'автор_{i}') for i in range(PER_PAGE)]
+
+        def with_reverse():
+            for slug, pk, username in cards:
+                reverse('posts:group_list', args=[slug])
+                reverse('posts:post_detail', args=[pk])
+                reverse('posts:profile', args=[username])
+
+        def with_fast_reverse():
+            for slug, pk, username in cards:
+                fast_reverse('posts:group_list', slug)
+                fast_reverse('posts:post_detail', pk)
+                fast_reverse('posts:profile', username)
+
+        with_fast_reverse()
+        repeat = options['repeat']
+        results = {}
+        for name, func in (('reverse', with_reverse),
+                           ('fast_reverse', with_fast_reverse)):
+            results[name] = timeit.timeit(func, number=repeat) / repeat * 1e6
+            self.stdout.write(f'{name:<14}{results[name]:>10.1f} µs/страница')
+        saving = results['reverse'] - results['fast_reverse']
+        self.stdout.write(f'Экономия: {saving:.1f} µs на страницу '
+                          f'({len(cards) * 3} ссылок)')
@@ -0,0 +1,42 @@
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore as DBStore
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = ('Удаляет истёкшие сессии пачками, не блокируя базу '
+            'одним большим DELETE.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch', type=int, default=1000,
+                            help='Сколько сессий удалять за один запрос.')
+        parser.add_argument('--pause', type=float, default=0,
+                            help='Пауза между пачками в секундах.')
+
+    def clear_db(self, store, batch, pause):
+        sessions = store.get_model_class().objects
+        removed = 0
+        while True:
+            keys = list(sessions.filter(
+                expire_date__lt=timezone.now()).values_list(
+                'pk', flat=True)[:batch])
+            if not keys:
+                return removed
+            # В cached_db записи кэша истекают сами вместе с сессией
+            removed += sessions.filter(pk__in=keys).delete()[0]
+            if pause:
+                time.sleep(pause)
+
+    def handle(self, *args, **options):
+        store = import_module(settings.SESSION_ENGINE).SessionStore
+        if issubclass(store, DBStore):
+            removed = self.clear_db(store, options['batch'],
+                                    options['pause'])
+        else:
+            removed = store.clear_expired()
+        self.stdout.write(
+            f'{settings.SESSION_ENGINE}: удалено сессий: {removed or 0}')
@@ -0,0 +1,38 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+from core.models import StoredFile
+from core.storage import content_storage
+
+
+class Command(BaseCommand):
+    help = 'Удаляет медиафайлы без ссылок и их миниатюры.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace', type=int, default=settings.MEDIA_GC_GRACE,
+            help='Сколько секунд файл без ссылок ещё хранится.')
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, что будет удалено.')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(seconds=options['grace'])
+        orphans = StoredFile.objects.filter(refs=0, updated__lt=cutoff)
+        deleted = 0
+        for name in orphans.values_list('name', flat=True).iterator():
+            if options['dry_run']:
+                self.stdout.write(name)
+                continue
+            # Ссылка могла появиться после выборки
+            if not StoredFile.objects.filter(pk=name, refs=0).delete()[0]:
+                continue
+            default.kvstore.delete(ImageFile(name, storage=content_storage))
+            content_storage.delete(name)
+            deleted += 1
+        self.stdout.write(f'Удалено файлов: {deleted}')
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from core.prerender import prerender
+
+
+class Command(BaseCommand):
+    help = ('Сохраняет страницы из PRERENDER_VIEWS и страницу 404 '
+            'в виде готового HTML для гостей.')
+
+    def handle(self, *args, **options):
+        for path in prerender():
+            self.stdout.write(path)
@@ -0,0 +1,40 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.mail import deliver
+from core.models import Outbox
+
+
+class Command(BaseCommand):
+    help = 'Отправляет письма из очереди пачками по одному соединению.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch', type=int,
+                            default=settings.EMAIL_QUEUE_BATCH,
+                            help='Сколько писем отправлять за соединение.')
+        parser.add_argument('--loop', type=float, default=0,
+                            help='Опрашивать очередь с этим интервалом '
+                                 'в секундах, а не выйти, когда она пуста.')
+        parser.add_argument('--retry-failed', action='store_true',
+                            help='Вернуть в очередь письма, исчерпавшие '
+                                 'попытки.')
+
+    def handle(self, *args, **options):
+        if options['retry_failed']:
+            count = Outbox.objects.filter(failed=True).update(
+                failed=False, attempts=0)
+            self.stdout.write(f'Возвращено в очередь писем: {count}')
+        total_sent = total_postponed = 0
+        while True:
+            sent, postponed = deliver(options['batch'])
+            total_sent += sent
+            total_postponed += postponed
+            if sent or postponed:
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['loop'])
+        self.stdout.write(
+            f'Отправлено писем: {total_sent}, отложено: {total_postponed}')
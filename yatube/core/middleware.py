@@ -0,0 +1,189 @@
+import threading
+
+from django.conf import settings
+from django.utils.cache import patch_cache_control, patch_vary_headers
+
+from . import (compression, file_server, fragments, prerender, profiling,
+               throttle)
+from .views import too_many_requests
+
+
+class StaticFilesMiddleware:
+    """Отдаёт собранную статику и медиафайлы, не доходя до view.
+
+    Статика берётся из STATIC_ROOT вместе со сжатыми вариантами,
+    медиа - из MEDIA_ROOT. Если файла нет, запрос идёт дальше.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if settings.SERVE_FILES and request.method in ('GET', 'HEAD'):
+            mounts = (
+                (settings.STATIC_URL, settings.STATIC_ROOT, True),
+                (settings.MEDIA_URL, settings.MEDIA_ROOT, False),
+            )
+            path = request.path_info
+            for prefix, root, precompressed in mounts:
+                if prefix and root and path.startswith(prefix):
+                    response = file_server.serve_file(
+                        request, root, path[len(prefix):],
+                        settings.FILES_MAX_AGE, precompressed)
+                    if response is not None:
+                        return response
+                    break
+        return self.get_response(request)
+
+
+class FragmentMiddleware:
+    """Заполняет ESI-включения персональными фрагментами.
+
+    Если перед приложением стоит edge-кэш, объявивший поддержку ESI
+    в заголовке Surrogate-Capability, разметка остаётся ему.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (response.streaming
+                or not response.get('Content-Type', '').startswith(
+                    'text/html')
+                or b'<esi:include' not in response.content):
+            return response
+        capability = request.META.get('HTTP_SURROGATE_CAPABILITY', '')
+        if 'ESI/1.0' in capability:
+            response['Surrogate-Control'] = 'content="ESI/1.0"'
+            return response
+        response.content = fragments.fill(response.content, request)
+        patch_vary_headers(response, ('Cookie',))
+        patch_cache_control(response, private=True)
+        return response
+
+
+class PrerenderMiddleware:
+    """Отдаёт гостям заранее отрендеренные страницы.
+
+    Срабатывает только для GET/HEAD без строки запроса и без cookie
+    сессии, до middleware сессий и аутентификации. Если файла нет,
+    запрос обрабатывается как обычно.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if (request.method in ('GET', 'HEAD')
+                and not request.META.get('QUERY_STRING')
+                and settings.SESSION_COOKIE_NAME not in request.COOKIES):
+            response = file_server.serve_file(
+                request, settings.PRERENDER_ROOT,
+                prerender.page_file(request.path_info),
+                settings.PRERENDER_MAX_AGE, precompressed=True)
+            if response is not None:
+                patch_vary_headers(response, ('Cookie',))
+                return response
+        return self.get_response(request)
+
+
+class CompressionMiddleware:
+    """Сжимает текстовые ответы gzip или brotli.
+
+    Тела меньше COMPRESSION_MIN_SIZE и уже сжатые ответы не трогает,
+    потоковые ответы сжимает по частям. При HTML_MINIFY сначала
+    убирает лишние пробелы из HTML.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not compression.is_compressible(response):
+            return response
+        if not response.streaming and settings.HTML_MINIFY and response.get(
+                'Content-Type', '').startswith('text/html'):
+            response.content = compression.minify_html(response.content)
+            response['Content-Length'] = len(response.content)
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = compression.choose_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING'))
+        if encoding is None:
+            return response
+        level = settings.COMPRESSION_LEVEL
+        if response.streaming:
+            response.streaming_content = compression.compress_stream(
+                response.streaming_content, encoding, level)
+            del response['Content-Length']
+        else:
+            if len(response.content) < settings.COMPRESSION_MIN_SIZE:
+                return response
+            compressed = compression.compress(
+                response.content, encoding, level)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = len(compressed)
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
+
+
+class ThrottleMiddleware:
+    """Отвечает 429 на запросы сверх лимита из THROTTLE_RATES.
+
+    Стоит после AuthenticationMiddleware: лимит вошедшего
+    пользователя считается по нему, а не по IP-адресу.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        retry_after = throttle.check(request)
+        if retry_after is None:
+            return None
+        response = too_many_requests(request)
+        response['Retry-After'] = str(retry_after)
+        return response
+
+
+class ProfilingMiddleware:
+    """Снимает стеки запросов во время сеанса профилирования.
+
+    Сеанс включается на странице core:profiling. Сэмплирование идёт
+    от process_view до возврата ответа, поэтому middleware стоит
+    в начале списка: в профиль попадают и view, и middleware ниже.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            return self.get_response(request)
+        finally:
+            profiled = getattr(request, '_profiling', None)
+            if profiled is not None:
+                config, view_name = profiled
+                stacks = profiling.sampler().unregister(threading.get_ident())
+                profiling.record(config, view_name, stacks)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        config = profiling.active_config()
+        if config is None:
+            return None
+        view_name = request.resolver_match.view_name
+        if not profiling.should_profile(config, view_name):
+            return None
+        profiling.sampler().register(threading.get_ident(),
+                                     config['interval'] / 1000)
+        request._profiling = (config, view_name)
+        return None
@@ -0,0 +1,33 @@
+# Generated by Django 2.2.16 on 2026-10-19 13:37
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Outbox',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('from_email', models.CharField(max_length=255)),
+                ('recipients', models.TextField(help_text='Адреса по одному на строке')),
+                ('subject', models.CharField(blank=True, max_length=255)),
+                ('message', models.BinaryField(help_text='Письмо целиком в формате MIME')),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('next_attempt', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('last_error', models.TextField(blank=True)),
+                ('failed', models.BooleanField(default=False)),
+            ],
+            options={
+                'verbose_name': 'outgoing email',
+                'verbose_name_plural': 'outgoing emails',
+            },
+        ),
+    ]
@@ -1,4 +1,8 @@
 from django.db import models
+from django.db.models import F
+from django.utils import timezone
+
+from .storage import ContentAddressedStorage
 
 
 class CreatedModel(models.Model):
@@ -10,3 +14,49 @@ class CreatedModel(models.Model):
 
     class Meta:
         abstract = True
+
+
+class StoredFile(models.Model):
+    """Число ссылок на файл в хранилище, адресуемом по содержимому."""
+    name = models.CharField(max_length=255, primary_key=True)
+    refs = models.PositiveIntegerField(default=0)
+    updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.name}: {self.refs}'
+
+    @classmethod
+    def add_reference(cls, name):
+        if not ContentAddressedStorage.is_hashed(name):
+            return
+        _, created = cls.objects.get_or_create(name=name,
+                                               defaults={'refs': 1})
+        if not created:
+            cls.objects.filter(pk=name).update(
+                refs=F('refs') + 1, updated=timezone.now())
+
+    @classmethod
+    def remove_reference(cls, name):
+        if not ContentAddressedStorage.is_hashed(name):
+            return
+        cls.objects.filter(pk=name, refs__gt=0).update(
+            refs=F('refs') - 1, updated=timezone.now())
+
+
+class Outbox(CreatedModel):
+    """Письмо в очереди на отправку."""
+    from_email = models.CharField(max_length=255)
+    recipients = models.TextField(help_text='Адреса по одному на строке')
+    subject = models.CharField(max_length=255, blank=True)
+    message = models.BinaryField(help_text='Письмо целиком в формате MIME')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt = models.DateTimeField(default=timezone.now, db_index=True)
+    last_error = models.TextField(blank=True)
+    failed = models.BooleanField(default=False)
+
+    class Meta:
+        verbose_name = 'outgoing email'
+        verbose_name_plural = 'outgoing emails'
+
+    def __str__(self):
+        return f'{self.subject} -> {self.recipients}'
@@ -0,0 +1,56 @@
+"""Кэш целых страниц с общей версией контента.
+
+Версия хранится в кэше Django по умолчанию и входит в префикс ключа
+страницы, поэтому после изменения постов, комментариев или групп все
+закэшированные оболочки разом становятся недоступны. Сигналы меняют
+версию сразу и ещё раз после коммита транзакции.
+
+Версия и оболочки общие для воркеров, только если кэш по умолчанию
+общий (memcached, redis). С LocMemCache у каждого процесса свои
+оболочки и своя версия: изменение, сделанное в одном воркере,
+остальные увидят не раньше, чем истечёт PAGE_CACHE_TIMEOUT.
+"""
+import functools
+
+from django.core.cache import cache
+from django.db import transaction
+from django.views.decorators.cache import cache_page
+
+VERSION_KEY = 'page_cache_version'
+
+
+def page_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, 1, None)
+        version = cache.get(VERSION_KEY, 1)
+    return version
+
+
+def bump_page_version():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, 1, None)
+
+
+def bump_page_version_on_commit():
+    """Меняет версию сейчас и ещё раз после коммита.
+
+    Второй сброс убирает оболочку со старыми данными, которую
+    параллельный запрос закэшировал под новой версией до коммита.
+    """
+    bump_page_version()
+    transaction.on_commit(bump_page_version)
+
+
+def cache_shell(timeout, key_prefix):
+    """Как cache_page, но ключ включает текущую версию контента."""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            prefix = f'{key_prefix}.{page_version()}'
+            cached_view = cache_page(timeout, key_prefix=prefix)(view)
+            return cached_view(request, *args, **kwargs)
+        return wrapper
+    return decorator
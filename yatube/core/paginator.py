@@ -0,0 +1,45 @@
+"""Пагинатор без полного COUNT(*) для больших таблиц."""
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+COUNT_LIMIT = 10000
+
+
+def estimate_rows(model, using):
+    """Оценка числа строк таблицы без её просмотра или None."""
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE relname = %s',
+                [table])
+        elif connection.vendor == 'sqlite':
+            # Для rowid-таблицы MAX(rowid) берётся из конца B-дерева
+            cursor.execute(
+                f'SELECT MAX(rowid) FROM {connection.ops.quote_name(table)}')
+        else:
+            return None
+        row = cursor.fetchone()
+    return int(row[0]) if row and row[0] is not None else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Число объектов оценивается, а не считается.
+
+    Для выборки без фильтров берётся оценка из СУБД, для выборки
+    с фильтрами - COUNT с ограничением COUNT_LIMIT строк.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        query = getattr(queryset, 'query', None)
+        if query is None:
+            return super().count
+        if not query.where:
+            estimate = estimate_rows(queryset.model, queryset.db)
+            if estimate is not None and estimate > COUNT_LIMIT:
+                return estimate
+        return queryset[:COUNT_LIMIT].count()
@@ -0,0 +1,25 @@
+"""Валидатор частых паролей со списком, загруженным один раз.
+
+Стандартный CommonPasswordValidator читает gzip-список при создании
+экземпляра. Здесь список загружается в frozenset один раз на процесс,
+а CoreConfig.ready создаёт валидаторы при старте воркера, чтобы первая
+регистрация не платила за чтение файла.
+"""
+import functools
+import gzip
+
+from django.contrib.auth import password_validation
+
+
+@functools.lru_cache(maxsize=None)
+def load_passwords(path):
+    with gzip.open(str(path), 'rt') as lines:
+        return frozenset(line.strip() for line in lines)
+
+
+class CommonPasswordValidator(password_validation.CommonPasswordValidator):
+
+    def __init__(self, password_list_path=(
+            password_validation.CommonPasswordValidator
+            .DEFAULT_PASSWORD_LIST_PATH)):
+        self.passwords = load_passwords(password_list_path)
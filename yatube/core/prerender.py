@@ -0,0 +1,82 @@
+"""Заранее отрендеренные страницы для анонимных посетителей.
+
+Команда prerender прогоняет страницы из PRERENDER_VIEWS через весь стек
+так, как их увидел бы гость, и сохраняет HTML в PRERENDER_ROOT вместе
+со сжатыми копиями. PrerenderMiddleware отдаёт эти файлы запросам без
+cookie сессии раньше middleware сессий и аутентификации.
+
+Перед рендером файл страницы удаляется, иначе клиент команды получил
+бы его же от PrerenderMiddleware. Страница 404 сохраняется с меткой
+вместо адреса, которую page_not_found заменяет адресом запроса.
+"""
+import os
+from html import escape
+
+from django.conf import settings
+from django.test import Client
+from django.urls import reverse
+
+from .compression import brotli, compress
+
+INDEX = 'index.html'
+NOT_FOUND = '404.html'
+NOT_FOUND_PATH = '/__prerender_not_found__/'
+
+
+def page_file(path):
+    """Файл страницы внутри PRERENDER_ROOT для пути запроса."""
+    return os.path.join(path.strip('/'), INDEX)
+
+
+def write_page(relative, content):
+    path = os.path.join(settings.PRERENDER_ROOT, relative)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    variants = {'': content, '.gz': compress(content, 'gzip', 9)}
+    if brotli is not None:
+        variants['.br'] = compress(content, 'br', 11)
+    for ext, data in variants.items():
+        tmp_path = f'{path}{ext}.tmp'
+        with open(tmp_path, 'wb') as page:
+            page.write(data)
+        os.replace(tmp_path, path + ext)
+    return path
+
+
+def remove_page(relative):
+    path = os.path.join(settings.PRERENDER_ROOT, relative)
+    for ext in ('', '.gz', '.br'):
+        if os.path.exists(path + ext):
+            os.remove(path + ext)
+
+
+def prerender():
+    """Рендерит все страницы, возвращает список записанных файлов."""
+    client = Client()
+    written = []
+    for viewname in settings.PRERENDER_VIEWS:
+        path = reverse(viewname)
+        # Иначе PrerenderMiddleware ответит старым файлом
+        remove_page(page_file(path))
+        response = client.get(path)
+        if response.status_code != 200 or response.cookies:
+            continue
+        written.append(write_page(page_file(path), response.content))
+    remove_page(NOT_FOUND)
+    response = client.get(NOT_FOUND_PATH)
+    if response.status_code == 404 and not response.cookies:
+        written.append(write_page(NOT_FOUND, response.content))
+    return written
+
+
+def not_found_page(request):
+    """Готовая страница 404 для гостя или None."""
+    if settings.SESSION_COOKIE_NAME in request.COOKIES:
+        return None
+    try:
+        with open(os.path.join(settings.PRERENDER_ROOT, NOT_FOUND),
+                  'rb') as page:
+            content = page.read()
+    except OSError:
+        return None
+    return content.replace(NOT_FOUND_PATH.encode(),
+                           escape(request.path).encode())
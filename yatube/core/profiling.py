@@ -0,0 +1,291 @@
+"""Сэмплирующий профайлер для работающего сайта.
+
+Настройка сеанса (какие view, какая доля запросов, до какого времени)
+лежит в кэше PROFILING_CACHE, поэтому включается из core:profiling
+сразу во всех воркерах, без перезапуска. Кэш должен быть общим
+(memcached, redis): локальный кэш процесса отклоняет проверка
+core.E001, а без PROFILING_CACHE сеанс не запускается. Процесс
+перечитывает настройку не чаще раза в PROFILING_CONFIG_TTL секунд.
+
+В процессе работает один поток Sampler. Поток, обрабатывающий
+выбранный запрос, регистрируется в нём на время запроса, и Sampler
+раз в interval миллисекунд снимает его стек. Стеки сворачиваются в строки
+'view;функция (файл:строка);...' и копятся в памяти процесса; Sampler
+раз в PROFILING_FLUSH_INTERVAL секунд добавляет их в кэш сеанса. Из них
+собираются файлы collapsed stacks (flamegraph.pl, inferno) и speedscope.
+Сложение в кэше не атомарно: при одновременной записи из двух воркеров
+часть сэмплов теряется, для профиля это допустимо.
+"""
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+
+CONFIG_KEY = 'profiling:config'
+OTHER_STACKS = '[прочие стеки]'
+
+# (настройка, время чтения): кортеж заменяется целиком одним
+# присваиванием, поэтому потоки не увидят настройку от одного чтения
+# со временем от другого
+_config = (None, None)
+_sampler = None
+_sampler_lock = threading.Lock()
+# Стеки, ещё не добавленные в кэш: сеанс -> {'config', 'requests',
+# 'stacks'}
+_pending = {}
+_pending_lock = threading.Lock()
+_flushed = time.monotonic()
+_flush_lock = threading.Lock()
+
+
+def profiling_cache():
+    """Кэш сеансов или None, если PROFILING_CACHE не задан."""
+    alias = settings.PROFILING_CACHE
+    return caches[alias] if alias else None
+
+
+def stacks_key(session):
+    return f'profiling:stacks:{session}'
+
+
+def _remember(config):
+    global _config
+    _config = (config, time.monotonic())
+
+
+def get_config():
+    """Настройка последнего сеанса или None."""
+    cache = profiling_cache()
+    if cache is None:
+        return None
+    config, read = _config
+    if (read is None
+            or time.monotonic() - read >= settings.PROFILING_CONFIG_TTL):
+        config = cache.get(CONFIG_KEY)
+        _remember(config)
+    return config
+
+
+def active_config():
+    config = get_config()
+    if config is None or config['until'] <= time.time():
+        return None
+    return config
+
+
+def start(views=(), rate=0, duration=60, interval=None):
+    """Начинает сеанс: view по имени и/или rate процентов всех запросов."""
+    now = time.time()
+    config = {
+        'session': int(now * 1000),
+        'views': sorted(views),
+        'rate': rate,
+        'interval': interval or settings.PROFILING_INTERVAL_MS,
+        'started': now,
+        'until': now + duration,
+    }
+    timeout = duration + settings.PROFILING_KEEP
+    cache = profiling_cache()
+    cache.set(CONFIG_KEY, config, timeout)
+    cache.set(stacks_key(config['session']),
+              {'requests': 0, 'stacks': {}}, timeout)
+    _remember(config)
+    return config
+
+
+def stop():
+    """Заканчивает сеанс; собранные стеки остаются доступны."""
+    config = get_config()
+    if config is None:
+        return None
+    config = dict(config, until=min(config['until'], time.time()))
+    profiling_cache().set(CONFIG_KEY, config, settings.PROFILING_KEEP)
+    _remember(config)
+    return config
+
+
+def should_profile(config, view_name):
+    if view_name in config['views']:
+        return True
+    return random.random() * 100 < config['rate']
+
+
+def frame_name(code):
+    filename = code.co_filename
+    if filename.startswith(settings.BASE_DIR):
+        filename = os.path.relpath(filename, settings.BASE_DIR)
+    else:
+        filename = os.path.join(*filename.split(os.sep)[-2:])
+    return f'{code.co_name} ({filename}:{code.co_firstlineno})'
+
+
+def collapse(frame):
+    """Стек от корня к frame: 'внешняя;...;внутренняя'."""
+    names = []
+    while frame is not None:
+        names.append(frame_name(frame.f_code))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class Sampler(threading.Thread):
+    """Снимает стеки зарегистрированных потоков, каждого раз в его interval.
+
+    Один поток на процесс: запросы только регистрируются в нём, а не
+    запускают свой поток.
+    """
+
+    def __init__(self):
+        super().__init__(daemon=True, name='profiling-sampler')
+        self.lock = threading.Condition()
+        # id потока -> [interval, время следующего сэмпла, стеки]
+        self.threads = {}
+
+    def register(self, thread_id, interval):
+        with self.lock:
+            self.threads[thread_id] = [interval, time.monotonic() + interval,
+                                       Counter()]
+            self.lock.notify()
+
+    def unregister(self, thread_id):
+        """Снимает поток с учёта и возвращает его стеки."""
+        with self.lock:
+            return self.threads.pop(thread_id)[2]
+
+    def due(self, timeout):
+        """Потоки, которым пора снять стек; ждёт не дольше timeout."""
+        with self.lock:
+            now = time.monotonic()
+            wait = min((entry[1] - now for entry in self.threads.values()),
+                       default=timeout)
+            if wait > 0:
+                self.lock.wait(min(wait, timeout))
+                now = time.monotonic()
+            return [thread_id for thread_id, entry in self.threads.items()
+                    if entry[1] <= now]
+
+    def run(self):
+        while True:
+            thread_ids = self.due(settings.PROFILING_FLUSH_INTERVAL)
+            if thread_ids:
+                self.sample(thread_ids)
+            flush()
+
+    def sample(self, thread_ids):
+        frames = sys._current_frames()
+        stacks = {thread_id: collapse(frames[thread_id])
+                  for thread_id in thread_ids if thread_id in frames}
+        now = time.monotonic()
+        with self.lock:
+            for thread_id in thread_ids:
+                entry = self.threads.get(thread_id)
+                if entry is None:
+                    continue
+                entry[1] = now + entry[0]
+                if thread_id in stacks:
+                    entry[2][stacks[thread_id]] += 1
+
+
+def sampler():
+    """Sampler процесса; запускается при первом обращении и после fork."""
+    global _sampler
+    with _sampler_lock:
+        if _sampler is None or not _sampler.is_alive():
+            _sampler = Sampler()
+            _sampler.start()
+        return _sampler
+
+
+def record(config, view_name, stacks):
+    """Добавляет стеки одного запроса к стекам процесса."""
+    with _pending_lock:
+        pending = _pending.setdefault(config['session'], {
+            'config': config, 'requests': 0, 'stacks': Counter()})
+        pending['requests'] += 1
+        for stack, count in stacks.items():
+            pending['stacks'][f'{view_name};{stack}'] += count
+
+
+def _merge(cache, pending):
+    config = pending['config']
+    key = stacks_key(config['session'])
+    data = cache.get(key) or {'requests': 0, 'stacks': {}}
+    data['requests'] += pending['requests']
+    collected = data['stacks']
+    for stack, count in pending['stacks'].items():
+        if (stack not in collected
+                and len(collected) >= settings.PROFILING_MAX_STACKS):
+            view_name = stack.split(';', 1)[0]
+            stack = f'{view_name};{OTHER_STACKS}'
+        collected[stack] = collected.get(stack, 0) + count
+    timeout = max(config['until'] - time.time(), 0) + settings.PROFILING_KEEP
+    cache.set(key, data, timeout)
+
+
+def flush(force=False):
+    """Добавляет стеки процесса в кэш, не чаще PROFILING_FLUSH_INTERVAL."""
+    global _pending, _flushed
+    with _flush_lock:
+        now = time.monotonic()
+        if not force and now - _flushed < settings.PROFILING_FLUSH_INTERVAL:
+            return
+        _flushed = now
+        with _pending_lock:
+            pending, _pending = _pending, {}
+        cache = profiling_cache()
+        if cache is None:
+            return
+        for session in pending.values():
+            _merge(cache, session)
+
+
+def collected(config):
+    """{'requests': число запросов, 'stacks': {стек: сэмплы}}."""
+    flush(force=True)
+    return profiling_cache().get(stacks_key(config['session'])) or {
+        'requests': 0, 'stacks': {}}
+
+
+def top_frames(stacks, limit=20):
+    """Функции, на которых чаще всего заставали поток: (кадр, сэмплы)."""
+    leaves = Counter()
+    for stack, count in stacks.items():
+        leaves[stack.rsplit(';', 1)[-1]] += count
+    return leaves.most_common(limit)
+
+
+def to_collapsed(stacks):
+    return ''.join(f'{stack} {count}\n'
+                   for stack, count in sorted(stacks.items()))
+
+
+def to_speedscope(stacks, name, interval):
+    """Сэмплированный профиль в формате speedscope, вес - миллисекунды."""
+    frames = {}
+    samples = []
+    weights = []
+    for stack, count in sorted(stacks.items()):
+        samples.append([frames.setdefault(frame, len(frames))
+                        for frame in stack.split(';')])
+        weights.append(count * interval)
+    return json.dumps({
+        '$schema': 'https://www.speedscope.app/file-format-schema.json',
+        'name': name,
+        'exporter': 'yatube',
+        'shared': {'frames': [{'name': frame} for frame in frames]},
+        'profiles': [{
+            'type': 'sampled',
+            'name': name,
+            'unit': 'milliseconds',
+            'startValue': 0,
+            'endValue': sum(weights),
+            'samples': samples,
+            'weights': weights,
+        }],
+    }, ensure_ascii=False)
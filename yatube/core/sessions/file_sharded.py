@@ -0,0 +1,65 @@
+"""Файловые сессии, разложенные по подкаталогам.
+
+Файл сессии лежит в SESSION_FILE_PATH/<2 символа ключа>/<2 символа>/,
+поэтому каталоги остаются небольшими и при большом числе входов,
+а сессии не делят файл SQLite с постами. Каталог создаётся сам.
+"""
+import os
+
+from django.conf import settings
+from django.contrib.sessions.backends import file
+from django.dispatch import receiver
+from django.test.signals import setting_changed
+
+
+class SessionStore(file.SessionStore):
+
+    @classmethod
+    def _get_storage_path(cls):
+        try:
+            return cls._storage_path
+        except AttributeError:
+            storage_path = settings.SESSION_FILE_PATH
+            os.makedirs(storage_path, exist_ok=True)
+            cls._storage_path = storage_path
+            return storage_path
+
+    def _key_to_file(self, session_key=None):
+        path = super()._key_to_file(session_key)
+        directory, name = os.path.split(path)
+        key = name[len(self.file_prefix):]
+        return os.path.join(directory, key[:2], key[2:4], name)
+
+    def save(self, must_create=False):
+        if self.session_key is not None:
+            os.makedirs(os.path.dirname(self._key_to_file()), exist_ok=True)
+        super().save(must_create)
+
+    @classmethod
+    def session_keys(cls):
+        """Ключи всех сохранённых сессий."""
+        prefix = settings.SESSION_COOKIE_NAME
+        for _, _, names in os.walk(cls._get_storage_path()):
+            for name in names:
+                if name.startswith(prefix) and '_out_' not in name:
+                    yield name[len(prefix):]
+
+    @classmethod
+    def clear_expired(cls):
+        """Удаляет истёкшие сессии, возвращает их число."""
+        removed = 0
+        for session_key in cls.session_keys():
+            session = cls(session_key)
+            # load() удаляет истёкшую сессию и создал бы новую
+            session.create = lambda: None
+            session.load()
+            if not os.path.exists(session._key_to_file(session_key)):
+                removed += 1
+        return removed
+
+
+@receiver(setting_changed)
+def reset_storage_path(setting, **kwargs):
+    if setting == 'SESSION_FILE_PATH' and hasattr(
+            SessionStore, '_storage_path'):
+        del SessionStore._storage_path
@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.template import engines
+
+
+def template_engine(request):
+    """Движок шаблонов для текущего view.
+
+    Возвращает 'jinja2', если view указан в JINJA2_VIEWS и движок
+    настроен, иначе None (движок по умолчанию, DTL).
+    """
+    match = request.resolver_match
+    if match is None or match.view_name not in settings.JINJA2_VIEWS:
+        return None
+    if 'jinja2' not in (engine.name for engine in engines.all()):
+        return None
+    return 'jinja2'
@@ -0,0 +1,69 @@
+"""Хранилище статики с хэшами в именах и предварительным сжатием.
+
+collectstatic записывает файлы с хэшем содержимого в имени
+(app.3f2a…9c.css) и манифест, а рядом - сжатые копии .gz и,
+если установлен пакет brotli, .br. Их отдаёт StaticFilesMiddleware,
+не сжимая ничего на лету.
+"""
+import gzip
+import logging
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_EXTENSIONS = {
+    '.css', '.js', '.json', '.map', '.svg', '.txt', '.xml', '.html',
+    '.ico', '.eot', '.ttf', '.otf',
+}
+MIN_SIZE = 256
+
+
+def compress(data):
+    """Сжатые варианты данных: {'.gz': bytes, '.br': bytes}.
+
+    В результат попадают только варианты меньше исходных данных.
+    """
+    variants = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(data, quality=11)
+    return {ext: compressed for ext, compressed in variants.items()
+            if len(compressed) < len(data)}
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    manifest_strict = False
+
+    def stored_name(self, name):
+        # Без collectstatic (разработка, тесты) отдаём исходное имя
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            logger.debug('Нет хэшированного имени для %s', name)
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in self.hashed_files.values():
+            self.compress_file(name)
+
+    def compress_file(self, name):
+        if os.path.splitext(name)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+            return
+        with self.open(name) as original:
+            data = original.read()
+        if len(data) < MIN_SIZE:
+            return
+        for ext, compressed in compress(data).items():
+            if self.exists(name + ext):
+                self.delete(name + ext)
+            self._save(name + ext, ContentFile(compressed))
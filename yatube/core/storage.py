@@ -0,0 +1,122 @@
+"""Хранилище медиафайлов, адресуемых по содержимому.
+
+Имя файла - SHA-256 его содержимого с исходным расширением, разложенное
+по двухуровневым каталогам: posts/ab/cd/abcd…ef.jpg. Одинаковая картинка,
+загруженная повторно, не записывается второй раз и получает то же имя,
+а значит и те же миниатюры sorl-thumbnail: их ключ строится из имени
+исходника.
+
+Ссылки на файлы считаются в StoredFile сигналами моделей с полями на
+этом хранилище; файлы без ссылок удаляет команда gc_media.
+"""
+import hashlib
+import os
+import posixpath
+import re
+
+from django.core.files.storage import FileSystemStorage
+from django.db.models import FileField
+from django.db.models.signals import post_delete, post_init, post_save
+from django.utils.deconstruct import deconstructible
+
+HASH_NAME_RE = re.compile(
+    r'(^|/)([0-9a-f]{2})/([0-9a-f]{2})/\2\3[0-9a-f]{60}(\.[\w]+)?$')
+READ_SIZE = 64 * 1024
+
+
+def content_hash(content):
+    """SHA-256 содержимого файла, читается блоками."""
+    digest = hashlib.sha256()
+    for chunk in content.chunks(READ_SIZE):
+        digest.update(chunk)
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    return digest.hexdigest()
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+
+    def hashed_name(self, name, digest):
+        directory, filename = posixpath.split(name)
+        ext = os.path.splitext(filename)[1].lower()
+        return posixpath.join(
+            directory, digest[:2], digest[2:4], f'{digest}{ext}')
+
+    @staticmethod
+    def is_hashed(name):
+        return bool(name and HASH_NAME_RE.search(name))
+
+    def get_available_name(self, name, max_length=None):
+        # Итоговое имя зависит только от содержимого, см. _save().
+        # Для имени-хэша сюда попадает цикл FileSystemStorage._save,
+        # когда файл уже создан другим воркером: выходим из цикла
+        if self.is_hashed(name) and os.path.exists(self.path(name)):
+            raise FileExistsError(name)
+        return name
+
+    def _save(self, name, content):
+        name = self.hashed_name(name, content_hash(content))
+        if self.exists(name):
+            return name
+        try:
+            return super()._save(name, content)
+        except OSError:
+            # Тот же файл одновременно записал другой воркер. Поток
+            # даёт FileExistsError, а file_move_safe для временного
+            # файла - IOError, поэтому смотрим на сам файл
+            if os.path.exists(self.path(name)):
+                return name
+            raise
+
+
+content_storage = ContentAddressedStorage()
+
+
+def _file_names(instance, fields):
+    """Имена файлов загруженных полей; отложенные поля не трогаем."""
+    names = {}
+    for field in fields:
+        if field.attname in instance.__dict__:
+            value = instance.__dict__[field.attname]
+            names[field.attname] = getattr(value, 'name', value) or ''
+    return names
+
+
+def _track(model):
+    from .models import StoredFile
+
+    fields = [field for field in model._meta.get_fields()
+              if isinstance(field, FileField)
+              and isinstance(field.storage, ContentAddressedStorage)]
+    if not fields:
+        return
+
+    def remember(sender, instance, **kwargs):
+        instance._stored_files = _file_names(instance, fields)
+
+    def saved(sender, instance, created, **kwargs):
+        old = {} if created else getattr(instance, '_stored_files', {})
+        new = _file_names(instance, fields)
+        for attname, name in new.items():
+            if not created and attname not in old:
+                continue
+            previous = old.get(attname)
+            if name != previous:
+                StoredFile.add_reference(name)
+                StoredFile.remove_reference(previous)
+        instance._stored_files = new
+
+    def deleted(sender, instance, **kwargs):
+        for name in _file_names(instance, fields).values():
+            StoredFile.remove_reference(name)
+
+    post_init.connect(remember, sender=model, weak=False)
+    post_save.connect(saved, sender=model, weak=False)
+    post_delete.connect(deleted, sender=model, weak=False)
+
+
+def track_references(models):
+    """Подключает подсчёт ссылок для моделей с полями на хранилище."""
+    for model in models:
+        _track(model)
@@ -0,0 +1,21 @@
+from django.template.backends import django
+
+from .context_processors.lazy import wrap_processors
+
+
+class DjangoTemplates(django.DjangoTemplates):
+    """DTL, в котором контекст-процессоры ленивые и замеряются.
+
+    Список context_processors в TEMPLATES остаётся стандартным,
+    поэтому проверки админки видят auth и messages процессоры.
+    """
+
+    def __init__(self, params):
+        super().__init__(params)
+        engine = self.engine
+        # Встроенные процессоры Django (csrf) идут первыми и остаются как есть
+        processors = engine.template_context_processors
+        builtin = len(processors) - len(engine.context_processors)
+        engine.template_context_processors = (
+            processors[:builtin] + wrap_processors(
+                engine.context_processors, processors[builtin:]))
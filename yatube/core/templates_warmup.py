@@ -0,0 +1,48 @@
+"""Прогрев кэшированного загрузчика шаблонов."""
+import logging
+import os
+
+from django.template import TemplateSyntaxError, engines
+from django.template.backends.django import DjangoTemplates
+
+logger = logging.getLogger(__name__)
+
+
+def template_names(directory):
+    """Имена всех .html-шаблонов в каталоге относительно него."""
+    for root, _, files in os.walk(directory):
+        for filename in files:
+            if filename.endswith('.html'):
+                path = os.path.join(root, filename)
+                yield os.path.relpath(path, directory).replace(os.sep, '/')
+
+
+def reset_templates():
+    """Сбрасывает кэш загрузчиков, как при старте нового воркера."""
+    for engine in engines.all():
+        if isinstance(engine, DjangoTemplates):
+            for loader in engine.engine.template_loaders:
+                loader.reset()
+
+
+def warm_templates():
+    """Компилирует шаблоны из DIRS всех DTL-движков.
+
+    Возвращает число загруженных шаблонов. Вложенные include
+    (header.html, switcher.html, paginator.html) тоже лежат в DIRS
+    и попадают в кэш загрузчика.
+    """
+    count = 0
+    for engine in engines.all():
+        if not isinstance(engine, DjangoTemplates):
+            continue
+        for directory in engine.dirs:
+            for name in template_names(directory):
+                try:
+                    engine.get_template(name)
+                except TemplateSyntaxError as error:
+                    logger.warning('Шаблон %s не скомпилирован: %s',
+                                   name, error)
+                    continue
+                count += 1
+    return count
@@ -0,0 +1,11 @@
+from django import template
+
+from ..fast_reverse import fast_reverse
+
+register = template.Library()
+
+
+@register.simple_tag(name='url')
+def url(viewname, *args, **kwargs):
+    """Замена встроенного {% url %} с готовыми шаблонами маршрутов."""
+    return fast_reverse(viewname, *args, **kwargs)
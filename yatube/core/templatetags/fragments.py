@@ -0,0 +1,12 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from .. import fragments
+
+register = template.Library()
+
+
+@register.simple_tag
+def fragment(name, **params):
+    """{% fragment 'follow_button' author=author.username %}"""
+    return mark_safe(fragments.include_tag(name, **params))
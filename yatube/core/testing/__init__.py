@@ -0,0 +1,14 @@
+"""Инфраструктура тестов: базы из шаблона и параллельный запуск.
+
+Миграции выполняются один раз в файл-шаблон SQLite, имя которого -
+хэш файлов миграций и функций из TEST_SNAPSHOT_FIXTURES. Каждый прогон
+и каждый воркер получают копию шаблона вместо миграций и свой
+MEDIA_ROOT.
+
+    python manage.py test --parallel 4
+    pytest [-n 4]
+
+Плагин pytest подключает conftest.py в корне репозитория, ключ -n
+даёт pytest-xdist из requirements.txt. Для баз, отличных от SQLite,
+тестовые базы создаются миграциями, как обычно.
+"""
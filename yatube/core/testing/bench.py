@@ -0,0 +1,17 @@
+"""Общее для команд bench_*: они не должны трогать живые кэши."""
+from django.conf import settings
+from django.test import override_settings
+
+LOCMEM = 'django.core.cache.backends.locmem.LocMemCache'
+
+
+def isolated_caches():
+    """override_settings, подменяющий каждый кэш отдельным LocMemCache.
+
+    cache.clear() внутри бенчмарка очищает только его собственный кэш,
+    а не memcached или redis работающего сайта.
+    """
+    return override_settings(CACHES={
+        alias: {'BACKEND': LOCMEM, 'LOCATION': f'bench-{alias}'}
+        for alias in settings.CACHES
+    })
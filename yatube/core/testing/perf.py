@@ -0,0 +1,146 @@
+"""Число запросов и время view в сравнении с базовой линией.
+
+measure() выполняет запрос и считает SQL-запросы и время. Baseline
+хранит эти значения в JSON-файле в репозитории; проверка падает, если
+запросов стало больше. Время зависит от машины, поэтому сравнивается
+только с PERF_CHECK_TIME=1 в окружении (ключ pytest --perf-time):
+допустимо в TIME_FACTOR раз больше базовой линии плюс TIME_SLACK.
+С PERF_BASELINE_UPDATE=1 в окружении или ключом pytest --perf-update
+файл перезаписывается текущими значениями.
+
+scaling_problems() сравнивает замеры одной view на наборах данных
+разного размера: если число запросов растёт вместе с числом объектов
+на странице, это N+1.
+"""
+import json
+import os
+import re
+import time
+from collections import Counter, namedtuple
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+TIME_FACTOR = 3
+TIME_SLACK = 0.1
+
+Measurement = namedtuple('Measurement', 'queries seconds objects sql')
+LITERAL_RE = re.compile(r"'[^']*'|\b\d+\b")
+
+
+def measure(call, objects=0):
+    """Выполняет call(), возвращает (Measurement, результат call)."""
+    with CaptureQueriesContext(connection) as captured:
+        started = time.perf_counter()
+        result = call()
+        elapsed = time.perf_counter() - started
+    sql = [query['sql'] for query in captured.captured_queries]
+    return Measurement(len(sql), elapsed, objects, sql), result
+
+
+def queries_per_object(small, large):
+    """Сколько запросов добавляет каждый объект на странице."""
+    if large.objects == small.objects:
+        return 0
+    return (large.queries - small.queries) / (large.objects - small.objects)
+
+
+def scaling_problems(name, measurements):
+    """Описание N+1 для замеров одной view на разных размерах данных."""
+    measurements = sorted(measurements, key=lambda item: item.objects)
+    small, large = measurements[0], measurements[-1]
+    growth = queries_per_object(small, large)
+    if growth <= 0:
+        return []
+    return [
+        f'{name}: {growth:.2f} запроса на объект '
+        f'({small.queries} при {small.objects}, '
+        f'{large.queries} при {large.objects}), '
+        f'чаще всего повторяется: {repeated_query(small, large)}'
+    ]
+
+
+def repeated_query(small, large):
+    """Запрос, число повторов которого выросло больше всего."""
+    def shapes(measurement):
+        return Counter(LITERAL_RE.sub('?', sql) for sql in measurement.sql)
+    growth = shapes(large)
+    growth.subtract(shapes(small))
+    shape, _ = growth.most_common(1)[0]
+    return shape
+
+
+class Baseline:
+    """Базовая линия: имя замера -> число запросов и время."""
+
+    def __init__(self, path, update=None, check_time=None):
+        self.path = path
+        if update is None:
+            update = bool(os.environ.get('PERF_BASELINE_UPDATE'))
+        if check_time is None:
+            check_time = bool(os.environ.get('PERF_CHECK_TIME'))
+        self.update = update
+        self.check_time = check_time
+        self.changed = False
+        try:
+            with open(path, encoding='utf-8') as baseline:
+                self.data = json.load(baseline)
+        except FileNotFoundError:
+            self.data = {}
+
+    def check(self, name, measurement):
+        """Список проблем замера; в режиме обновления - запоминает его."""
+        if self.update:
+            self.data[name] = {'queries': measurement.queries,
+                               'seconds': round(measurement.seconds, 4)}
+            self.changed = True
+            return []
+        expected = self.data.get(name)
+        if expected is None:
+            return [f'{name}: нет в базовой линии {self.path}, '
+                    f'запустите с PERF_BASELINE_UPDATE=1']
+        problems = []
+        if measurement.queries > expected['queries']:
+            problems.append(
+                f'{name}: запросов {measurement.queries}, '
+                f'в базовой линии {expected["queries"]}')
+        limit = expected['seconds'] * TIME_FACTOR + TIME_SLACK
+        if self.check_time and measurement.seconds > limit:
+            problems.append(
+                f'{name}: {measurement.seconds:.3f} с, '
+                f'допустимо {limit:.3f} с')
+        return problems
+
+    def save(self):
+        if not self.changed:
+            return
+        with open(self.path, 'w', encoding='utf-8') as baseline:
+            json.dump(self.data, baseline, indent=2, sort_keys=True,
+                      ensure_ascii=False)
+            baseline.write('\n')
+        self.changed = False
+
+
+class PerfRecorder:
+    """Замеры одного теста с проверкой по базовой линии."""
+
+    def __init__(self, baseline, prefix=''):
+        self.baseline = baseline
+        self.prefix = prefix
+        self.measurements = {}
+
+    def measure(self, name, call, objects=0, size=None):
+        key = f'{self.prefix}{name}'
+        if size is not None:
+            key = f'{key}[{size}]'
+        measurement, result = measure(call, objects)
+        problems = self.baseline.check(key, measurement)
+        assert not problems, '\n'.join(problems)
+        self.measurements.setdefault(name, []).append(measurement)
+        return result
+
+    def assert_constant(self, name):
+        """Падает, если число запросов view растёт с размером страницы."""
+        problems = scaling_problems(f'{self.prefix}{name}',
+                                    self.measurements.get(name, []))
+        assert not problems, '\n'.join(problems)
@@ -0,0 +1,47 @@
+"""Плагин pytest для замеров производительности view.
+
+    pytest -p core.testing.perf_plugin [--perf-baseline FILE]
+        [--perf-update] [--perf-time]
+
+Фикстура perf - PerfRecorder с общей для сессии базовой линией,
+маркер @pytest.mark.perf('prefix') задаёт префикс имён замеров теста.
+"""
+import os
+
+import pytest
+
+from .perf import Baseline, PerfRecorder
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('perf')
+    group.addoption('--perf-baseline', default=None,
+                    help='JSON-файл базовой линии замеров '
+                         '(по умолчанию perf_baseline.json в rootdir).')
+    group.addoption('--perf-update', action='store_true',
+                    help='Перезаписать базовую линию текущими замерами.')
+    group.addoption('--perf-time', action='store_true',
+                    help='Сравнивать и время, а не только число запросов.')
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        'markers', 'perf(prefix): префикс имён замеров производительности')
+
+
+@pytest.fixture(scope='session')
+def perf_baseline(request):
+    config = request.config
+    path = config.getoption('--perf-baseline') or os.path.join(
+        str(config.rootdir), 'perf_baseline.json')
+    baseline = Baseline(path, update=config.getoption('--perf-update') or None,
+                        check_time=config.getoption('--perf-time') or None)
+    yield baseline
+    baseline.save()
+
+
+@pytest.fixture
+def perf(request, perf_baseline):
+    marker = request.node.get_closest_marker('perf')
+    prefix = marker.args[0] if marker and marker.args else ''
+    return PerfRecorder(perf_baseline, prefix)
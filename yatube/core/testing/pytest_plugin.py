@@ -0,0 +1,38 @@
+"""Плагин pytest: базы из шаблона и свой MEDIA_ROOT у каждого воркера.
+
+Подключается в conftest.py в корне репозитория и заменяет фикстуру
+django_db_setup из pytest-django. Фикстура регистрируется в
+pytest_configure, то есть после pytest-django, иначе победила бы его.
+С pytest-xdist каждый воркер gwN получает свою копию шаблона.
+"""
+import os
+import shutil
+import tempfile
+
+import pytest
+from django.conf import settings
+from django.test.utils import teardown_databases
+
+from . import template_db
+from .runner import set_media_root
+
+
+class TemplateDatabases:
+
+    @pytest.fixture(scope='session')
+    def django_db_setup(self, django_test_environment, django_db_blocker):
+        worker = os.environ.get('PYTEST_XDIST_WORKER', '')
+        old_media_root = settings.MEDIA_ROOT
+        media_root = tempfile.mkdtemp(prefix=f'yatube-media-{worker}')
+        set_media_root(media_root)
+        with django_db_blocker.unblock():
+            old_config = template_db.setup_databases(suffix=worker)
+        yield
+        with django_db_blocker.unblock():
+            teardown_databases(old_config, verbosity=0)
+        set_media_root(old_media_root)
+        shutil.rmtree(media_root, ignore_errors=True)
+
+
+def pytest_configure(config):
+    config.pluginmanager.register(TemplateDatabases(), 'template_databases')
@@ -0,0 +1,46 @@
+"""Раннер manage.py test: базы из шаблона, свой MEDIA_ROOT у воркера."""
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test import runner
+from django.test.signals import setting_changed
+
+from . import template_db
+
+
+def set_media_root(path):
+    os.makedirs(path, exist_ok=True)
+    settings.MEDIA_ROOT = path
+    # Хранилища файлов запоминают каталог при первом обращении
+    setting_changed.send(sender=type(settings._wrapped),
+                         setting='MEDIA_ROOT', value=path, enter=True)
+
+
+def _init_worker(counter):
+    runner._init_worker(counter)
+    set_media_root(os.path.join(settings.MEDIA_ROOT,
+                                f'worker_{runner._worker_id}'))
+
+
+class TemplateParallelTestSuite(runner.ParallelTestSuite):
+    init_worker = _init_worker
+
+
+class TemplateDBTestRunner(runner.DiscoverRunner):
+    """DiscoverRunner, копирующий базы из шаблона вместо миграций."""
+    parallel_test_suite = TemplateParallelTestSuite
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.media_root = tempfile.mkdtemp(prefix='yatube-media-')
+        set_media_root(self.media_root)
+
+    def teardown_test_environment(self, **kwargs):
+        shutil.rmtree(self.media_root, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
+
+    def setup_databases(self, **kwargs):
+        return template_db.setup_databases(parallel=self.parallel,
+                                           verbosity=self.verbosity)
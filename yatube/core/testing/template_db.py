@@ -0,0 +1,110 @@
+"""Тестовые базы SQLite, скопированные из заранее мигрированного шаблона."""
+import hashlib
+import inspect
+import os
+import shutil
+import sys
+
+import django
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connections
+from django.db.migrations.loader import MigrationLoader
+from django.test import utils
+from django.utils.module_loading import import_string
+
+
+def snapshot_fixtures():
+    return [import_string(path) for path in settings.TEST_SNAPSHOT_FIXTURES]
+
+
+def template_digest(connection):
+    """Хэш всего, от чего зависит содержимое шаблона."""
+    digest = hashlib.sha256(django.get_version().encode())
+    loader = MigrationLoader(connection, load=False)
+    loader.load_disk()
+    modules = {migration.__module__
+               for migration in loader.disk_migrations.values()}
+    for module in sorted(modules):
+        with open(sys.modules[module].__file__, 'rb') as source:
+            digest.update(module.encode())
+            digest.update(source.read())
+    for fixture in snapshot_fixtures():
+        digest.update(inspect.getsource(fixture).encode())
+    return digest.hexdigest()[:16]
+
+
+def build_template(connection, path):
+    """Мигрирует шаблон и заполняет его общими фикстурами."""
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    old_name = connection.settings_dict['NAME']
+    connection.close()
+    connection.settings_dict['NAME'] = tmp_path
+    try:
+        call_command('migrate', database=connection.alias, run_syncdb=True,
+                     interactive=False, verbosity=0)
+        for fixture in snapshot_fixtures():
+            fixture()
+    finally:
+        connection.close()
+        connection.settings_dict['NAME'] = old_name
+    # Воркеры, собравшие шаблон одновременно, просто заменят его
+    os.replace(tmp_path, path)
+
+
+def template_path(connection):
+    """Путь к шаблону базы; шаблон собирается, если его ещё нет."""
+    os.makedirs(settings.TEST_TEMPLATE_DIR, exist_ok=True)
+    path = os.path.join(
+        settings.TEST_TEMPLATE_DIR,
+        f'template_{connection.alias}_{template_digest(connection)}.sqlite3')
+    if not os.path.exists(path):
+        build_template(connection, path)
+    return path
+
+
+def db_file_name(alias, suffix=''):
+    name = f'test_{alias}_{os.getpid()}'
+    if suffix:
+        name = f'{name}_{suffix}'
+    return os.path.join(settings.TEST_TEMPLATE_DIR, f'{name}.sqlite3')
+
+
+def add_suffix(suffix):
+    """Своё имя тестовой базы воркера, как у pytest-django с xdist."""
+    for alias in connections:
+        settings_dict = connections[alias].settings_dict
+        test = settings_dict.setdefault('TEST', {})
+        name = test.get('NAME') or f'test_{settings_dict["NAME"]}'
+        test['NAME'] = f'{name}_{suffix}'
+
+
+def setup_databases(parallel=0, suffix='', verbosity=0):
+    """Как django.test.utils.setup_databases, но копированием шаблона.
+
+    Шаблоны поддерживаются только для SQLite: с другими базами
+    они создаются как обычно, миграциями. Возвращает old_config
+    для django.test.utils.teardown_databases.
+    """
+    if any(connections[alias].vendor != 'sqlite' for alias in connections):
+        if suffix:
+            add_suffix(suffix)
+        return utils.setup_databases(verbosity, interactive=False,
+                                     parallel=parallel)
+    old_config = []
+    for alias in connections:
+        connection = connections[alias]
+        template = template_path(connection)
+        old_name = connection.settings_dict['NAME']
+        name = db_file_name(alias, suffix)
+        shutil.copyfile(template, name)
+        connection.close()
+        settings.DATABASES[alias]['NAME'] = name
+        connection.settings_dict['NAME'] = name
+        if parallel > 1:
+            for index in range(parallel):
+                clone = connection.creation.get_test_db_clone_settings(
+                    str(index + 1))
+                shutil.copyfile(template, clone['NAME'])
+        old_config.append((connection, old_name, True))
+    return old_config
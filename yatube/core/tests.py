@@ -1,4 +1,47 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import shutil
+import smtplib
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core import mail
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.mail.backends.locmem import EmailBackend as LocmemBackend
+from django.core.management import call_command
+from django.http import HttpResponse, StreamingHttpResponse
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import NoReverseMatch, reverse
+from django.utils import timezone
+
+from .context_processors.lazy import LazyValue, ttl_cache
+from .auth_backends import CachedModelBackend, user_cache_key
+from .checks import (profiling_cache_is_shared, session_cache_is_shared,
+                     throttle_cache_is_shared, user_cache_is_shared)
+from .compression import minify_html
+from .mail import deliver
+from .sessions.file_sharded import SessionStore as ShardedSessionStore
+from .fast_reverse import fast_reverse
+from .middleware import CompressionMiddleware
+from .models import Outbox, StoredFile
+from .password_validation import CommonPasswordValidator
+from .prerender import page_file
+from . import profiling
+from .staticfiles import CompressedManifestStaticFilesStorage
+from .storage import content_hash, content_storage
+from .testing import template_db
+from .testing.template_db import template_digest, db_file_name
+from .throttle import hit
+from .templates_warmup import reset_templates, template_names, warm_templates
 
 
 class ViewTestClass(TestCase):
@@ -6,3 +49,753 @@ class ViewTestClass(TestCase):
         response = self.client.get('/nonexist-page/')
         self.assertEqual(response.status_code, 404)
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+class TemplatesWarmupTests(TestCase):
+    def test_all_templates_compile(self):
+        """Прогрев компилирует все шаблоны из каталога templates."""
+        reset_templates()
+        names = list(template_names(settings.TEMPLATES_DIR))
+        self.assertIn('posts/includes/paginator.html', names)
+        self.assertEqual(warm_templates(), len(names))
+
+    def test_benchmark_keeps_live_cache(self):
+        """Бенчмарк очищает свой кэш, а не кэш сайта."""
+        cache.set('live', 1)
+        call_command('bench_first_request', '/about/author/',
+                     stdout=open(os.devnull, 'w'))
+        self.assertEqual(cache.get('live'), 1)
+
+
+class FastReverseTests(TestCase):
+    def test_same_as_reverse(self):
+        """fast_reverse строит те же URL, что и reverse."""
+        cases = (
+            ('posts:posts_index', ()),
+            ('posts:group_list', ('tolstoi',)),
+            ('posts:post_detail', (15,)),
+            ('posts:post_edit', ('15',)),
+            ('posts:profile', ('Лев Толстой',)),
+            ('posts:profile_follow', ('a&b?c',)),
+            ('about:author', ()),
+        )
+        for viewname, args in cases:
+            with self.subTest(viewname=viewname):
+                self.assertEqual(fast_reverse(viewname, *args),
+                                 reverse(viewname, args=args))
+
+    def test_kwargs(self):
+        self.assertEqual(fast_reverse('posts:post_detail', post_id=3),
+                         reverse('posts:post_detail', kwargs={'post_id': 3}))
+
+    def test_invalid_arguments(self):
+        """Неподходящие аргументы дают NoReverseMatch, как reverse."""
+        for args in (('abc',), (1, 2), ()):
+            with self.subTest(args=args):
+                with self.assertRaises(NoReverseMatch):
+                    fast_reverse('posts:post_detail', *args)
+
+
+class ContextProcessorsTests(TestCase):
+    def test_ttl_cache(self):
+        """Результат процессора запоминается до сброса кэша."""
+        calls = []
+
+        @ttl_cache(60)
+        def processor(request):
+            calls.append(request)
+            return {'value': len(calls)}
+
+        self.assertEqual(processor(None), {'value': 1})
+        self.assertEqual(processor(None), {'value': 1})
+        processor.cache_clear()
+        self.assertEqual(processor(None), {'value': 2})
+
+    def test_unused_processors_not_evaluated(self):
+        """Процессоры, чьи ключи шаблон не читает, не вызываются."""
+        response = self.client.get('/about/author/')
+        timings = response.wsgi_request.context_processor_timings
+        self.assertIn('core.context_processors.year.year', timings)
+        self.assertIn('django.contrib.auth.context_processors.auth', timings)
+        self.assertNotIn('posts.context_processors.notifications', timings)
+        self.assertNotIn(
+            'django.contrib.messages.context_processors.messages', timings)
+
+    def test_lazy_value_proxies_attributes(self):
+        """Ленивое значение читается из Python как обычный объект."""
+        calls = []
+
+        def evaluate():
+            calls.append(1)
+            return {'user': get_user_model()(username='leo')}
+
+        value = LazyValue(evaluate, 'user')
+        self.assertEqual(calls, [])
+        self.assertEqual(value.username, 'leo')
+        self.assertEqual(str(value), 'leo')
+        self.assertEqual(len(calls), 1)
+
+    def test_admin_index_for_staff(self):
+        """Теги админки получают пользователя из контекста."""
+        admin = get_user_model().objects.create_superuser(
+            'admin', 'admin@example.com', 'password')
+        self.client.force_login(admin)
+        self.assertEqual(self.client.get('/admin/').status_code, 200)
+
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ContentStorageTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_dedupe_and_sharding(self):
+        """Одинаковое содержимое хранится один раз под именем-хэшем."""
+        first = content_storage.save('posts/a.GIF', ContentFile(b'gif'))
+        second = content_storage.save('posts/b.gif', ContentFile(b'gif'))
+        self.assertEqual(first, second)
+        digest = os.path.basename(first)[:-4]
+        self.assertEqual(
+            first, f'posts/{digest[:2]}/{digest[2:4]}/{digest}.gif')
+        self.assertEqual(len(os.listdir(os.path.dirname(
+            content_storage.path(first)))), 1)
+
+    def test_concurrent_save_of_same_content(self):
+        """Файл, записанный другим воркером после проверки, не ошибка."""
+        content = ContentFile(b'race')
+        name = content_storage.hashed_name(
+            'posts/a.gif', content_hash(content))
+        path = content_storage.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as target:
+            target.write(b'race')
+        with mock.patch.object(content_storage, 'exists', return_value=False):
+            self.assertEqual(content_storage.save('posts/a.gif', content),
+                             name)
+        with open(path, 'rb') as target:
+            self.assertEqual(target.read(), b'race')
+
+    def test_concurrent_save_of_temporary_file(self):
+        """Гонка при переносе временного файла тоже не ошибка."""
+        upload = TemporaryUploadedFile('b.gif', 'image/gif', 4, None)
+        upload.write(b'move')
+        upload.seek(0)
+        name = content_storage.hashed_name(
+            'posts/b.gif', content_hash(upload))
+        path = content_storage.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as target:
+            target.write(b'move')
+        move = mock.patch('django.core.files.storage.file_move_safe',
+                          side_effect=IOError('Destination file exists'))
+        with move, mock.patch.object(content_storage, 'exists',
+                                     return_value=False):
+            self.assertEqual(content_storage.save('posts/b.gif', upload),
+                             name)
+        upload.close()
+        with open(path, 'rb') as target:
+            self.assertEqual(target.read(), b'move')
+
+    def test_references_and_gc(self):
+        """Ссылки считаются сигналами, gc_media удаляет ненужные файлы."""
+        from posts.models import Post
+
+        author = get_user_model().objects.create_user(username='leo')
+        posts = [Post(author=author, text=str(i)) for i in range(2)]
+        for post in posts:
+            post.image.save('same.gif', ContentFile(b'picture'))
+        name = posts[0].image.name
+        self.assertEqual(StoredFile.objects.get(pk=name).refs, 2)
+        posts[0].delete()
+        call_command('gc_media', grace=-1, stdout=open(os.devnull, 'w'))
+        self.assertTrue(content_storage.exists(name))
+        post = Post.objects.get(pk=posts[1].pk)
+        post.image = ''
+        post.save()
+        self.assertEqual(StoredFile.objects.get(pk=name).refs, 0)
+        call_command('gc_media', grace=-1, stdout=open(os.devnull, 'w'))
+        self.assertFalse(content_storage.exists(name))
+        self.assertFalse(StoredFile.objects.filter(pk=name).exists())
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT,
+                   STATIC_ROOT=os.path.join(TEMP_MEDIA_ROOT, 'static'))
+class FileServerTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.image = content_storage.save(
+            'posts/image.gif', ContentFile(bytes(range(100))))
+        storage = CompressedManifestStaticFilesStorage(
+            location=os.path.join(TEMP_MEDIA_ROOT, 'static'))
+        storage.save('css/app.css', ContentFile(b'body{color:red}' * 40))
+        storage.compress_file('css/app.css')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_media_range(self):
+        """Картинки отдаются целиком и по диапазонам."""
+        url = settings.MEDIA_URL + self.image
+        response = self.client.get(url)
+        self.assertEqual(b''.join(response.streaming_content),
+                         bytes(range(100)))
+        self.assertEqual(response['Cache-Control'],
+                         'public, max-age=31536000, immutable')
+        response = self.client.get(url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/100')
+        self.assertEqual(b''.join(response.streaming_content),
+                         bytes(range(10, 20)))
+        response = self.client.get(url, HTTP_RANGE='bytes=-5')
+        self.assertEqual(b''.join(response.streaming_content),
+                         bytes(range(95, 100)))
+        response = self.client.get(url, HTTP_RANGE='bytes=200-')
+        self.assertEqual(response.status_code, 416)
+        etag = self.client.head(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_precompressed_static(self):
+        """Статика отдаётся сжатой копией, если клиент её принимает."""
+        url = settings.STATIC_URL + 'css/app.css'
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        refused = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertFalse(refused.has_header('Content-Encoding'))
+        plain = self.client.get(url)
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        self.assertEqual(b''.join(plain.streaming_content),
+                         b'body{color:red}' * 40)
+        self.assertEqual(self.client.get(
+            settings.STATIC_URL + '../secret').status_code, 404)
+
+
+class CompressionTests(TestCase):
+    body = b'<p>' + b'word ' * 400 + b'</p>'
+
+    def process(self, response, accept='gzip'):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING=accept)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_gzip(self):
+        """Большой текстовый ответ сжимается, маленький - нет."""
+        response = self.process(HttpResponse(self.body))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), self.body)
+        self.assertIn('Accept-Encoding', response['Vary'])
+        small = self.process(HttpResponse(b'<p>hi</p>'))
+        self.assertFalse(small.has_header('Content-Encoding'))
+        refused = self.process(HttpResponse(self.body), accept='gzip;q=0')
+        self.assertFalse(refused.has_header('Content-Encoding'))
+
+    def test_skips_encoded_and_binary(self):
+        encoded = HttpResponse(self.body)
+        encoded['Content-Encoding'] = 'br'
+        self.assertEqual(self.process(encoded).content, self.body)
+        image = HttpResponse(self.body, content_type='image/png')
+        self.assertFalse(self.process(image).has_header('Content-Encoding'))
+
+    def test_streaming(self):
+        """Потоковый ответ сжимается по частям."""
+        response = self.process(StreamingHttpResponse(
+            iter([self.body] * 3)))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(
+            gzip.decompress(b''.join(response.streaming_content)),
+            self.body * 3)
+
+    def test_minify_keeps_preformatted(self):
+        html = (b'<div>\n  <p>a   b</p>\n</div>\n'
+                b'<pre>  x\n  y</pre> <textarea>  t  </textarea>')
+        self.assertEqual(
+            minify_html(html),
+            b'<div><p>a b</p></div> <pre>  x\n  y</pre> '
+            b'<textarea>  t  </textarea>')
+
+
+class SessionTests(TestCase):
+    def test_file_sharded_store(self):
+        """Сессия хранится в подкаталоге по первым символам ключа."""
+        with tempfile.TemporaryDirectory() as path, override_settings(
+                SESSION_FILE_PATH=path):
+            session = ShardedSessionStore()
+            session['answer'] = 42
+            session.create()
+            key = session.session_key
+            self.assertTrue(os.path.isfile(os.path.join(
+                path, key[:2], key[2:4], settings.SESSION_COOKIE_NAME + key)))
+            self.assertEqual(ShardedSessionStore(key)['answer'], 42)
+            expired = ShardedSessionStore()
+            expired.set_expiry(-1)
+            expired.create()
+            self.assertEqual(ShardedSessionStore.clear_expired(), 1)
+            self.assertEqual(list(ShardedSessionStore.session_keys()), [key])
+
+    def test_cleanup_in_batches(self):
+        """Истёкшие сессии в БД удаляются пачками."""
+        from django.contrib.sessions.backends.db import SessionStore
+        from django.contrib.sessions.models import Session
+
+        for expiry in (-10, -10, -10, 3600):
+            session = SessionStore()
+            session.set_expiry(expiry)
+            session.create()
+        with override_settings(
+                SESSION_ENGINE='django.contrib.sessions.backends.db'):
+            call_command('cleanup_sessions', batch=2,
+                         stdout=open(os.devnull, 'w'))
+        self.assertEqual(Session.objects.count(), 1)
+
+    def test_cached_sessions_need_shared_cache(self):
+        """Сессии в локальном кэше процесса отклоняются проверкой."""
+        self.assertEqual(session_cache_is_shared(None), [])
+        with override_settings(
+                SESSION_ENGINE='django.contrib.sessions.backends.cached_db'):
+            self.assertEqual(
+                [error.id for error in session_cache_is_shared(None)],
+                ['core.E001'])
+
+    def test_benchmark_keeps_live_cache(self):
+        """bench_sessions очищает свой кэш, а не кэш сайта."""
+        cache.set('live', 1)
+        call_command('bench_sessions', requests=1, follows=0,
+                     stdout=open(os.devnull, 'w'))
+        self.assertEqual(cache.get('live'), 1)
+
+
+# Тесты идут в одном процессе, локальный кэш здесь общий
+@override_settings(
+    USER_CACHE='default',
+    SESSION_ENGINE='django.contrib.sessions.backends.cached_db')
+class CachedUserTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username='leo')
+
+    def test_user_cached_until_saved(self):
+        """Пользователь читается из кэша до изменения."""
+        backend = CachedModelBackend()
+        with self.assertNumQueries(1):
+            backend.get_user(self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(backend.get_user(self.user.pk), self.user)
+        self.user.first_name = 'Лев'
+        self.user.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(backend.get_user(self.user.pk).first_name, 'Лев')
+        self.user.is_active = False
+        self.user.save()
+        self.assertIsNone(backend.get_user(self.user.pk))
+
+    def test_password_hash_not_cached(self):
+        """В кэше только нужные поля, пароль дочитывается из БД."""
+        backend = CachedModelBackend()
+        backend.get_user(self.user.pk)
+        fields = cache.get(user_cache_key(self.user.pk))
+        self.assertNotIn('password', fields)
+        self.assertNotIn(self.user.password, fields.values())
+        user = backend.get_user(self.user.pk)
+        self.assertEqual(user.get_session_auth_hash(),
+                         self.user.get_session_auth_hash())
+        with self.assertNumQueries(1):
+            self.assertEqual(user.password, self.user.password)
+
+    def test_logged_in_request_skips_user_query(self):
+        """Вошедший пользователь не загружается из БД на каждом запросе."""
+        self.client.force_login(self.user)
+        self.client.get('/about/author/')
+        response = self.client.get('/about/author/')
+        self.assertEqual(response.wsgi_request.user, self.user)
+        with self.assertNumQueries(0):
+            self.client.get('/about/author/')
+        self.user.set_password('new-password')
+        self.user.save()
+        response = self.client.get('/about/author/')
+        self.assertFalse(response.wsgi_request.user.is_authenticated)
+
+    def test_local_cache_rejected(self):
+        """Проверка не даёт включить кэш пользователей в памяти процесса."""
+        self.assertEqual(
+            [error.id for error in user_cache_is_shared(None)], ['core.E001'])
+        with override_settings(USER_CACHE=None):
+            self.assertEqual(user_cache_is_shared(None), [])
+            backend = CachedModelBackend()
+            for _ in range(2):
+                with self.assertNumQueries(1):
+                    backend.get_user(self.user.pk)
+
+
+class PrerenderTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        settings_override = override_settings(PRERENDER_ROOT=self.root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        call_command('prerender', stdout=open(os.devnull, 'w'))
+
+    def test_guest_gets_file(self):
+        """Гость получает готовый файл без запросов к БД и сессии."""
+        with self.assertNumQueries(0):
+            response = self.client.get('/about/author/')
+        self.assertIn('Привет, я автор',
+                      b''.join(response.streaming_content).decode())
+        self.assertIn('Cookie', response['Vary'])
+        response = self.client.get('/about/tech/',
+                                   HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+    def test_second_run_refreshes_pages(self):
+        """Повторный запуск команды перерисовывает уже сохранённые страницы."""
+        path = os.path.join(self.root, page_file('/about/author/'))
+        with open(path, 'wb') as page:
+            page.write(b'stale')
+        call_command('prerender', stdout=open(os.devnull, 'w'))
+        with open(path, 'rb') as page:
+            content = page.read()
+        self.assertNotEqual(content, b'stale')
+        self.assertIn('Привет, я автор', content.decode())
+
+    def test_logged_in_user_gets_live_page(self):
+        user = get_user_model().objects.create_user(username='leo')
+        self.client.force_login(user)
+        response = self.client.get('/about/author/')
+        self.assertFalse(response.streaming)
+        self.assertContains(response, 'Пользователь: <b>leo</b>')
+
+    def test_not_found_page(self):
+        """Готовая страница 404 получает адрес запроса."""
+        response = self.client.get('/missing/<b>/')
+        self.assertEqual(response.status_code, 404)
+        self.assertContains(response, '/missing/&lt;b&gt;/', status_code=404)
+        self.assertNotContains(response, '__prerender_not_found__',
+                               status_code=404)
+
+
+class FailingBackend(LocmemBackend):
+    def send_messages(self, messages):
+        raise ConnectionError('почтовый сервер недоступен')
+
+
+class FakeSMTP:
+    """Почтовый сервер для smtp.EmailBackend: пишет соединения и письма."""
+    down = False
+    connections = []
+
+    def __init__(self, host, port, **kwargs):
+        if FakeSMTP.down:
+            raise ConnectionRefusedError('почтовый сервер недоступен')
+        self.sent = []
+        FakeSMTP.connections.append(self)
+
+    def sendmail(self, from_email, recipients, message):
+        if 'broken@example.com' in recipients:
+            raise smtplib.SMTPServerDisconnected('обрыв соединения')
+        self.sent.append(recipients)
+
+    def quit(self):
+        pass
+
+
+@override_settings(
+    EMAIL_BACKEND='core.mail.QueuedEmailBackend',
+    EMAIL_DELIVERY_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class QueuedMailTests(TestCase):
+    def test_password_reset_is_queued(self):
+        """Сброс пароля только ставит письмо в очередь."""
+        User = get_user_model()
+        User.objects.create_user('anna', 'anna@example.com', 'password')
+        response = self.client.post(
+            reverse('users:password_reset_form'),
+            {'email': 'anna@example.com'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(mail.outbox, [])
+        outbox = Outbox.objects.get()
+        self.assertEqual(outbox.recipients, 'anna@example.com')
+        self.assertEqual(deliver(), (1, 0))
+        self.assertFalse(Outbox.objects.exists())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['anna@example.com'])
+        self.assertIn(b'/auth/reset/', mail.outbox[0].message().as_bytes())
+
+    def smtp_delivery(self):
+        FakeSMTP.down = False
+        FakeSMTP.connections = []
+        return mock.patch('smtplib.SMTP', FakeSMTP)
+
+    @override_settings(
+        EMAIL_DELIVERY_BACKEND='django.core.mail.backends.smtp.EmailBackend')
+    def test_smtp_connection_reused_and_reopened(self):
+        """Пачка идёт по одному соединению, после обрыва - по новому."""
+        for email in ('anna', 'broken', 'boris', 'fedor'):
+            mail.send_mail('Тема', 'Текст', None, [f'{email}@example.com'])
+        with self.smtp_delivery():
+            self.assertEqual(deliver(), (3, 1))
+        self.assertEqual(
+            [connection.sent for connection in FakeSMTP.connections],
+            [[['anna@example.com']],
+             [['boris@example.com'], ['fedor@example.com']]])
+        self.assertEqual(Outbox.objects.get().recipients,
+                         'broken@example.com')
+
+    @override_settings(
+        EMAIL_DELIVERY_BACKEND='django.core.mail.backends.smtp.EmailBackend')
+    def test_smtp_server_down_postpones_batch(self):
+        """Если сервер не принимает соединение, откладывается вся пачка."""
+        for email in ('anna', 'boris'):
+            mail.send_mail('Тема', 'Текст', None, [f'{email}@example.com'])
+        with self.smtp_delivery():
+            FakeSMTP.down = True
+            self.assertEqual(deliver(), (0, 2))
+            self.assertEqual(deliver(), (0, 0))
+        for outbox in Outbox.objects.all():
+            self.assertEqual(outbox.attempts, 1)
+            self.assertIn('ConnectionRefusedError', outbox.last_error)
+            self.assertGreater(outbox.next_attempt, timezone.now())
+
+    @override_settings(EMAIL_DELIVERY_BACKEND='core.tests.FailingBackend',
+                       EMAIL_QUEUE_MAX_ATTEMPTS=2)
+    def test_failed_delivery_backs_off(self):
+        """Неудачное письмо откладывается, а затем помечается failed."""
+        mail.send_mail('Тема', 'Текст', None, ['anna@example.com'])
+        self.assertEqual(deliver(), (0, 1))
+        outbox = Outbox.objects.get()
+        self.assertEqual(outbox.attempts, 1)
+        self.assertIn('ConnectionError', outbox.last_error)
+        self.assertEqual(deliver(), (0, 0))
+        Outbox.objects.update(next_attempt=outbox.created)
+        self.assertEqual(deliver(), (0, 1))
+        self.assertTrue(Outbox.objects.get().failed)
+        Outbox.objects.update(next_attempt=outbox.created)
+        self.assertEqual(deliver(), (0, 0))
+
+
+# Тесты идут в одном процессе, локальный кэш здесь общий
+@override_settings(THROTTLE_CACHE='default')
+class ThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username='leo')
+        self.client.force_login(self.user)
+
+    def test_window_counter(self):
+        """Сверх лимита возвращается время до следующего окна."""
+        self.assertIsNone(hit('test', 2, 60, now=120.5))
+        self.assertIsNone(hit('test', 2, 60, now=130))
+        self.assertEqual(hit('test', 2, 60, now=150), 30)
+        self.assertIsNone(hit('test', 2, 60, now=180))
+
+    @override_settings(THROTTLE_RATES={'posts:post_create': '2/m'})
+    @mock.patch('core.throttle.time.time', return_value=1000.0)
+    def test_write_requests_are_limited(self, _):
+        """Третья запись за минуту получает 429 с Retry-After."""
+        url = reverse('posts:post_create')
+        for _ in range(2):
+            self.assertEqual(
+                self.client.post(url, {'text': 'Пост'}).status_code, 302)
+        response = self.client.post(url, {'text': 'Пост'})
+        self.assertEqual(response.status_code, 429)
+        self.assertTemplateUsed(response, 'core/429.html')
+        self.assertEqual(response['Retry-After'], '20')
+        self.assertEqual(self.client.get(url).status_code, 200)
+        other = get_user_model().objects.create_user(username='fedor')
+        self.client.force_login(other)
+        self.assertEqual(
+            self.client.post(url, {'text': 'Пост'}).status_code, 302)
+
+    def test_shared_cache_required(self):
+        """Локальный кэш отклоняется, без THROTTLE_CACHE лимитов нет."""
+        self.assertEqual(
+            [error.id for error in throttle_cache_is_shared(None)],
+            ['core.E001'])
+        url = reverse('posts:post_create')
+        with override_settings(THROTTLE_CACHE=None,
+                               THROTTLE_RATES={'posts:post_create': '1/m'}):
+            for _ in range(2):
+                self.assertEqual(
+                    self.client.post(url, {'text': 'Пост'}).status_code, 302)
+
+
+class PasswordPolicyTests(TestCase):
+    @override_settings(PASSWORD_HASH_ITERATIONS=1000)
+    def test_password_rehashed_on_login(self):
+        """Хэш со старым числом итераций пересчитывается при входе."""
+        user = get_user_model().objects.create_user(
+            username='leo', password='correct-horse-battery')
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$1000$'))
+        with override_settings(PASSWORD_HASH_ITERATIONS=2000):
+            self.assertTrue(self.client.login(
+                username='leo', password='correct-horse-battery'))
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$2000$'))
+        self.assertTrue(user.check_password('correct-horse-battery'))
+
+    def test_common_passwords_loaded_once(self):
+        """Список частых паролей общий для всех экземпляров."""
+        validator = CommonPasswordValidator()
+        self.assertIsInstance(validator.passwords, frozenset)
+        self.assertIs(validator.passwords,
+                      CommonPasswordValidator().passwords)
+        with self.assertRaises(ValidationError):
+            validator.validate('Password')
+        validator.validate('correct-horse-battery')
+
+
+def snapshot_group():
+    """Общая фикстура для проверки хэша шаблона."""
+
+
+class TemplateDBTests(TestCase):
+    def test_digest_depends_on_snapshot_fixtures(self):
+        """Другие общие фикстуры - другой шаблон базы."""
+        digest = template_digest(connection)
+        self.assertEqual(digest, template_digest(connection))
+        with override_settings(
+                TEST_SNAPSHOT_FIXTURES=['core.tests.snapshot_group']):
+            self.assertNotEqual(digest, template_digest(connection))
+
+    def test_worker_databases_differ(self):
+        """У каждого воркера свой файл базы."""
+        self.assertNotEqual(db_file_name('default', 'gw0'),
+                            db_file_name('default', 'gw1'))
+        self.assertTrue(db_file_name('default').startswith(
+            settings.TEST_TEMPLATE_DIR))
+
+    def test_other_engines_use_migrations(self):
+        """Базы не на SQLite создаются штатно, миграциями."""
+        with mock.patch.object(connection, 'vendor', 'postgresql'), \
+                mock.patch.object(template_db.utils, 'setup_databases',
+                                  return_value=[]) as setup:
+            self.assertEqual(template_db.setup_databases(parallel=2), [])
+        setup.assert_called_once_with(0, interactive=False, parallel=2)
+
+
+def sleeping_view_body():
+    time.sleep(0.05)
+
+
+def sleeping_render(*args, **kwargs):
+    sleeping_view_body()
+    return HttpResponse()
+
+
+# Тесты идут в одном процессе, локальный кэш здесь общий
+@override_settings(PROFILING_CACHE='default')
+class ProfilingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('core:profiling')
+        self.staff = get_user_model().objects.create_user(
+            username='admin', is_staff=True)
+        self.client.force_login(self.staff)
+
+    def tearDown(self):
+        profiling.stop()
+
+    def test_staff_only(self):
+        """Страница профилирования недоступна обычным пользователям."""
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        user = get_user_model().objects.create_user(username='leo')
+        self.client.force_login(user)
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+        self.assertEqual(
+            self.client.post(self.url, {'rate': 100, 'duration': 60,
+                                        'interval': 5}).status_code, 302)
+        self.assertIsNone(profiling.active_config())
+
+    def test_shared_cache_required(self):
+        """Без общего кэша сеанс не запускается, локальный отклоняется."""
+        self.assertEqual(
+            [error.id for error in profiling_cache_is_shared(None)],
+            ['core.E001'])
+        with override_settings(PROFILING_CACHE=None):
+            response = self.client.post(self.url, {
+                'rate': 100, 'duration': 60, 'interval': 5})
+            self.assertContains(response, 'PROFILING_CACHE')
+            self.assertIsNone(profiling.active_config())
+
+    def test_stacks_flushed_in_batches(self):
+        """Стеки копятся в процессе и пишутся в кэш одним сложением."""
+        config = profiling.start(rate=100, interval=5)
+        with mock.patch.object(profiling, '_merge') as merge:
+            profiling.record(config, 'view', {'a;b': 3})
+            profiling.record(config, 'view', {'a;b': 1, 'a;c': 1})
+            merge.assert_not_called()
+            profiling.flush(force=True)
+        merge.assert_called_once()
+        pending = merge.call_args[0][1]
+        self.assertEqual(pending['requests'], 2)
+        self.assertEqual(pending['stacks'], {'view;a;b': 4, 'view;a;c': 1})
+
+    def test_sampler_collects_stacks(self):
+        """Sampler снимает стек потока с вызовами от корня к листу."""
+        sampler = profiling.sampler()
+        sampler.register(threading.get_ident(), 0.005)
+        sleeping_view_body()
+        stacks = sampler.unregister(threading.get_ident())
+        self.assertTrue(stacks)
+        stack = stacks.most_common(1)[0][0].split(';')
+        self.assertTrue(stack[-1].startswith('sleeping_view_body (core/'))
+        self.assertIn('test_sampler_collects_stacks', stack[-2])
+
+    def test_one_sampler_per_process(self):
+        """Профилируемые запросы не запускают своих потоков."""
+        self.client.post(self.url, {'rate': 100, 'duration': 60,
+                                    'interval': 5})
+        sampler = profiling.sampler()
+        threads = threading.active_count()
+        for _ in range(3):
+            self.client.get(reverse('posts:group_index'))
+        self.assertIs(profiling.sampler(), sampler)
+        self.assertEqual(threading.active_count(), threads)
+        self.assertEqual(sampler.threads, {})
+        self.assertEqual(
+            profiling.collected(profiling.active_config())['requests'], 3)
+
+    def test_session_profiles_chosen_view(self):
+        """Запросы к выбранной view попадают в профиль сеанса."""
+        response = self.client.post(self.url, {
+            'views': 'posts:posts_index', 'rate': 0, 'duration': 60,
+            'interval': 5})
+        self.assertRedirects(response, self.url)
+        self.client.get(reverse('posts:group_index'))
+        with mock.patch('posts.views.render', sleeping_render):
+            self.client.get(reverse('posts:posts_index'))
+        config = profiling.active_config()
+        data = profiling.collected(config)
+        self.assertEqual(data['requests'], 1)
+        self.assertTrue(all(stack.startswith('posts:posts_index;')
+                            for stack in data['stacks']))
+        self.assertTrue(any('sleeping_view_body' in stack
+                            for stack in data['stacks']))
+        self.client.post(self.url, {'stop': ''})
+        self.assertIsNone(profiling.active_config())
+        self.client.get(reverse('posts:posts_index'))
+        self.assertEqual(profiling.collected(config)['requests'], 1)
+
+    def test_export(self):
+        """Стеки выгружаются в формате collapsed и speedscope."""
+        config = profiling.start(rate=100, interval=5)
+        profiling.record(config, 'view', {'a;b': 3, 'a;c': 1})
+        response = self.client.get(self.url, {'export': 'collapsed'})
+        self.assertEqual(response.content.decode(),
+                         'view;a;b 3\nview;a;c 1\n')
+        self.assertIn('attachment', response['Content-Disposition'])
+        response = self.client.get(self.url, {'export': 'speedscope'})
+        speedscope = json.loads(response.content)
+        frames = [frame['name'] for frame in speedscope['shared']['frames']]
+        self.assertEqual(frames, ['view', 'a', 'b', 'c'])
+        profile = speedscope['profiles'][0]
+        self.assertEqual(profile['samples'], [[0, 1, 2], [0, 1, 3]])
+        self.assertEqual(profile['weights'], [15, 5])
+        self.assertEqual(profile['endValue'], 20)
+        self.assertEqual(
+            self.client.get(self.url, {'export': 'pdf'}).status_code, 404)
@@ -0,0 +1,70 @@
+"""Ограничение частоты запросов к view, меняющим данные.
+
+Лимиты задаются в THROTTLE_RATES по имени view: '10/m' - не больше
+десяти запросов в минуту. Счётчик ведётся для пользователя, а для
+гостя - для IP-адреса, в кэше THROTTLE_CACHE по ключу с номером окна,
+поэтому проверка обычно стоит одного cache.incr. Окно ведёт себя как
+корзина токенов, которая целиком пополняется в начале каждого периода.
+
+Кэш должен быть общим (memcached, redis), иначе каждый воркер считает
+сам и лимит умножается на число воркеров; локальный кэш процесса
+отклоняет проверка core.E001. Пока THROTTLE_CACHE не задан, лимиты
+не проверяются.
+
+Считаются только запросы, меняющие данные; view, которые меняют
+данные и по GET, перечисляются в THROTTLE_ALL_METHODS.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def parse_rate(rate):
+    """'10/m' -> (10, 60)."""
+    count, period = rate.split('/')
+    return int(count), PERIODS[period[0]]
+
+
+def client_ident(request):
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return f'user:{user.pk}'
+    return f'ip:{request.META.get("REMOTE_ADDR", "")}'
+
+
+def hit(key, limit, period, now=None):
+    """Засчитывает запрос; None или секунды до нового окна."""
+    now = time.time() if now is None else now
+    window = int(now // period)
+    key = f'throttle:{key}:{window}'
+    cache = caches[settings.THROTTLE_CACHE]
+    try:
+        count = cache.incr(key)
+    except ValueError:
+        # Первый запрос окна; add проигрывает гонку только другому add
+        if cache.add(key, 1, period):
+            count = 1
+        else:
+            count = cache.incr(key)
+    if count <= limit:
+        return None
+    return max(1, int((window + 1) * period - now))
+
+
+def check(request):
+    """Секунды до повтора, если запрос к view превысил лимит, иначе None."""
+    match = request.resolver_match
+    if match is None:
+        return None
+    rate = settings.THROTTLE_RATES.get(match.view_name)
+    if rate is None or not settings.THROTTLE_CACHE:
+        return None
+    if (request.method in SAFE_METHODS
+            and match.view_name not in settings.THROTTLE_ALL_METHODS):
+        return None
+    limit, period = parse_rate(rate)
+    return hit(f'{match.view_name}:{client_ident(request)}', limit, period)
@@ -0,0 +1,10 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'core'
+
+urlpatterns = [
+    path('profiling/', views.profiling_session, name='profiling'),
+    path('fragments/<slug:name>/', views.fragment, name='fragment'),
+]
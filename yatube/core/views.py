@@ -1,10 +1,84 @@
-from django.shortcuts import render
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import Http404, HttpResponse
+from django.shortcuts import redirect, render
+from django.utils.cache import patch_cache_control, patch_vary_headers
+
+from . import fragments, prerender, profiling
+from .forms import ProfilingForm
 
 
 def page_not_found(request, exception):
+    content = prerender.not_found_page(request)
+    if content is not None:
+        return HttpResponse(content, status=404)
     return render(request, 'core/404.html',
                   {'path': request.path}, status=404)
 
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+def too_many_requests(request):
+    return render(request, 'core/429.html', status=429)
+
+
+def fragment(request, name):
+    """Отдельная выдача персонального фрагмента (для ESI и JS)."""
+    html = fragments.render_fragment(request, name, request.GET.dict())
+    if html is None:
+        raise Http404
+    response = HttpResponse(html)
+    patch_vary_headers(response, ('Cookie',))
+    patch_cache_control(response, private=True)
+    return response
+
+
+EXPORTS = {
+    'collapsed': (profiling.to_collapsed, 'text/plain; charset=utf-8',
+                  'txt'),
+    'speedscope': (profiling.to_speedscope, 'application/json',
+                   'speedscope.json'),
+}
+
+
+def export_profile(config, export):
+    convert, content_type, extension = EXPORTS[export]
+    name = f'yatube-{config["session"]}'
+    stacks = profiling.collected(config)['stacks']
+    if export == 'speedscope':
+        content = convert(stacks, name, config['interval'])
+    else:
+        content = convert(stacks)
+    response = HttpResponse(content, content_type=content_type)
+    response['Content-Disposition'] = (
+        f'attachment; filename="{name}.{extension}"')
+    return response
+
+
+@staff_member_required
+def profiling_session(request):
+    """Сеанс профилирования: запуск, остановка и выгрузка стеков."""
+    config = profiling.get_config()
+    export = request.GET.get('export')
+    if export is not None:
+        if config is None or export not in EXPORTS:
+            raise Http404
+        return export_profile(config, export)
+    if request.method == 'POST' and 'stop' in request.POST:
+        profiling.stop()
+        return redirect('core:profiling')
+    form = ProfilingForm(request.POST or None)
+    if form.is_valid():
+        profiling.start(**form.cleaned_data)
+        return redirect('core:profiling')
+    context = {
+        'form': form,
+        'config': config,
+        'active': profiling.active_config() is not None,
+    }
+    if config is not None:
+        data = profiling.collected(config)
+        context['requests'] = data['requests']
+        context['top_frames'] = profiling.top_frames(data['stacks'])
+    return render(request, 'core/profiling.html', context)
@@ -1,15 +1,193 @@
-from django.contrib import admin
+from core.paginator import EstimatedCountPaginator
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.contrib.admin.helpers import ActionForm
+from django.contrib.admin.views.main import IGNORED_PARAMS, SEARCH_VAR
+from django.core.exceptions import ValidationError
+from django.template.response import TemplateResponse
+from django.utils.html import format_html
 
-from .models import Post, Group
+from .models import Comment, Group, ModerationJob, Post, User
+from .moderation import enqueue, requeue
 
+SAMPLE_SIZE = 20
 
-class PostAdmin(admin.ModelAdmin):
+
+class PostActionForm(ActionForm):
+    group = forms.ModelChoiceField(
+        Group.objects.order_by('title'), required=False,
+        label='Группа')
+
+
+class ModerationAdminMixin:
+    """Массовые действия ставят задачу в очередь после подтверждения."""
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        # Стандартное удаление собирает все связанные объекты в память
+        actions.pop('delete_selected', None)
+        return actions
+
+    def confirm(self, request, action, title, message, count, sample):
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': title,
+            'message': message,
+            'count': count,
+            'sample': sample[:SAMPLE_SIZE],
+            'action': action,
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+            'selected': request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+            'select_across': self.select_across(request),
+        }
+        return TemplateResponse(
+            request, 'admin/posts/confirm_moderation.html', context)
+
+    @staticmethod
+    def select_across(request):
+        return request.POST.get('select_across') == '1'
+
+    def list_filters(self, request):
+        """Фильтры и поиск списка из адреса страницы.
+
+        Фильтры списков здесь - поиски по полям модели, поэтому
+        параметры адреса годятся для filter() как есть.
+        """
+        params = request.GET.dict()
+        return {
+            'lookups': {name: value for name, value in params.items()
+                        if name not in IGNORED_PARAMS},
+            'search_fields': self.get_search_fields(request),
+            'search': params.get(SEARCH_VAR, ''),
+        }
+
+    def enqueue(self, request, action, queryset, **kwargs):
+        """Задача по выбранным объектам.
+
+        Если выбраны все объекты списка, задача хранит фильтры
+        и поиск списка, а не id каждого объекта.
+        """
+        if self.select_across(request):
+            kwargs['filters'] = self.list_filters(request)
+            kwargs['total'] = queryset.count()
+        else:
+            kwargs['ids'] = queryset.values_list('pk', flat=True)
+        job = enqueue(action, user=request.user, **kwargs)
+        self.message_user(request, f'Задача «{job}» поставлена в очередь')
+        return job
+
+    def purge_authors(self, request, queryset):
+        authors = User.objects.filter(
+            pk__in=queryset.values('author_id')).order_by('username')
+        if not request.POST.get('confirm'):
+            return self.confirm(
+                request, 'purge_authors', 'Удаление контента авторов',
+                'Будут удалены все посты и комментарии авторов',
+                authors.count(), authors)
+        # Авторов немного, задача всегда хранит их id
+        job = enqueue(
+            ModerationJob.PURGE_AUTHORS,
+            authors.values_list('pk', flat=True), user=request.user,
+            total=(Post.objects.filter(author__in=authors).count()
+                   + Comment.objects.filter(author__in=authors).count()))
+        self.message_user(request, f'Задача «{job}» поставлена в очередь')
+        return None
+    purge_authors.short_description = (
+        'Удалить все посты и комментарии авторов')
+    purge_authors.allowed_permissions = ('delete',)
+
+
+class PostAdmin(ModerationAdminMixin, admin.ModelAdmin):
     list_display = ('pk', 'text', 'pub_date', 'author', 'group')
     search_fields = ('text',)
     list_filter = ('pub_date',)
     list_editable = ('group',)
+    list_select_related = ('author', 'group')
+    autocomplete_fields = ('author', 'group')
+    date_hierarchy = 'pub_date'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    action_form = PostActionForm
+    actions = ('move_to_group', 'delete_posts', 'purge_authors')
     empty_value_display = '-пусто-'
 
+    def move_to_group(self, request, queryset):
+        field = self.action_form.base_fields['group']
+        try:
+            group = field.clean(request.POST.get('group'))
+        except ValidationError:
+            self.message_user(request, 'Неизвестная группа', messages.ERROR)
+            return
+        self.enqueue(request, ModerationJob.MOVE_POSTS, queryset,
+                     group=group)
+    move_to_group.short_description = 'Перенести в выбранную группу'
+    move_to_group.allowed_permissions = ('change',)
+
+    def delete_posts(self, request, queryset):
+        if not request.POST.get('confirm'):
+            return self.confirm(
+                request, 'delete_posts', 'Удаление постов',
+                'Будет удалено постов вместе с комментариями',
+                queryset.count(), queryset)
+        self.enqueue(request, ModerationJob.DELETE_POSTS, queryset)
+        return None
+    delete_posts.short_description = 'Удалить выбранные посты'
+    delete_posts.allowed_permissions = ('delete',)
+
+
+class CommentAdmin(ModerationAdminMixin, admin.ModelAdmin):
+    list_display = ('pk', 'text', 'created', 'author', 'post')
+    search_fields = ('text',)
+    list_select_related = ('author',)
+    raw_id_fields = ('post',)
+    autocomplete_fields = ('author',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ('delete_comments', 'purge_authors')
+    empty_value_display = '-пусто-'
+
+    def delete_comments(self, request, queryset):
+        if not request.POST.get('confirm'):
+            return self.confirm(
+                request, 'delete_comments', 'Удаление комментариев',
+                'Будет удалено комментариев', queryset.count(), queryset)
+        self.enqueue(request, ModerationJob.DELETE_COMMENTS, queryset)
+        return None
+    delete_comments.short_description = 'Удалить выбранные комментарии'
+    delete_comments.allowed_permissions = ('delete',)
+
+
+class ModerationJobAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'action', 'status', 'progress', 'created_by',
+                    'created', 'finished')
+    list_filter = ('status', 'action')
+    list_select_related = ('created_by',)
+    readonly_fields = ('action', 'status', 'group', 'created_by', 'total',
+                       'processed', 'error', 'created', 'heartbeat',
+                       'finished')
+    exclude = ('object_ids', 'filters', 'cursor')
+    actions = ('requeue_jobs',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def progress(self, job):
+        if not job.total:
+            return '-'
+        percent = min(100, job.processed * 100 // job.total)
+        return format_html('{} из {} ({}%)', job.processed, job.total,
+                           percent)
+    progress.short_description = 'Прогресс'
+
+    def requeue_jobs(self, request, queryset):
+        count = requeue(queryset)
+        self.message_user(request, f'Возвращено в очередь: {count}')
+    requeue_jobs.short_description = (
+        'Перезапустить упавшие и зависшие задачи')
+    requeue_jobs.allowed_permissions = ('change',)
+
 
 class GroupAdmin(admin.ModelAdmin):
     list_display = ('pk', 'title', 'slug', 'description')
@@ -19,4 +197,6 @@ class GroupAdmin(admin.ModelAdmin):
 
 
 admin.site.register(Post, PostAdmin)
+admin.site.register(Comment, CommentAdmin)
+admin.site.register(ModerationJob, ModerationJobAdmin)
 admin.site.register(Group, GroupAdmin)
@@ -5,3 +5,6 @@ from django.apps import AppConfig
 class PostsConfig(AppConfig):
     """config."""
     name = 'posts'
+
+    def ready(self):
+        from . import fragments, signals  # noqa: F401
@@ -0,0 +1,9 @@
+from .notifications import unread_count
+
+
+def notifications(request):
+    """Число непрочитанных постов из подписок для шапки."""
+    user = request.user
+    return {
+        'unread_posts': unread_count(user) if user.is_authenticated else 0
+    }
@@ -0,0 +1,322 @@
+"""Граф подписок в памяти процесса.
+
+Таблица Follow загружается в отсортированные массивы 64-битных целых:
+для каждого пользователя хранятся id авторов, на которых он подписан,
+и id его подписчиков. Граф умеет сохранять снимок на диск, чтобы
+воркер стартовал «прогретым»; загружается он при старте сервера
+(yatube/wsgi.py), а не в первом запросе.
+
+Изменения после коммита попадают в граф своего процесса сигналами
+модели Follow и увеличивают общую версию в кэше. Граф, чья версия
+отстала или который не сверялся дольше FOLLOW_GRAPH_SYNC_INTERVAL
+секунд (на случай кэша, не общего для воркеров), догружает новые
+подписки, а если были отписки - загружается заново.
+"""
+import os
+import random
+import struct
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connections
+
+TYPECODE = 'q'
+VERSION_KEY = 'follow_graph:version'
+SNAPSHOT_MAGIC = b'YFG1'
+SNAPSHOT_HEADER = struct.Struct('<4sBxxxQQ')
+EMPTY = array(TYPECODE)
+
+
+def _window(values, size):
+    """size значений подряд со случайного места, с переходом в начало.
+
+    Срез с начала отсортированного массива давал бы только малые id.
+    """
+    if len(values) <= size:
+        return values
+    start = random.randrange(len(values))
+    window = values[start:start + size]
+    return window + values[:size - len(window)]
+
+
+def _insort(values, value):
+    """Вставляет значение в отсортированный массив без дублей."""
+    index = bisect_left(values, value)
+    if index < len(values) and values[index] == value:
+        return False
+    values.insert(index, value)
+    return True
+
+
+def _discard(values, value):
+    """Удаляет значение из отсортированного массива, если оно есть."""
+    index = bisect_left(values, value)
+    if index < len(values) and values[index] == value:
+        del values[index]
+        return True
+    return False
+
+
+def _contains(values, value):
+    index = bisect_left(values, value)
+    return index < len(values) and values[index] == value
+
+
+def _intersect(left, right):
+    """Пересечение двух отсортированных массивов слиянием."""
+    result = array(TYPECODE)
+    i = j = 0
+    while i < len(left) and j < len(right):
+        if left[i] == right[j]:
+            result.append(left[i])
+            i += 1
+            j += 1
+        elif left[i] < right[j]:
+            i += 1
+        else:
+            j += 1
+    return result
+
+
+class FollowGraph:
+    """Списки смежности подписок: пользователь -> авторы и обратно.
+
+    Возвращаемые массивы принадлежат графу, изменять их нельзя.
+    """
+
+    def __init__(self):
+        self._following = {}
+        self._followers = {}
+        self._lock = threading.Lock()
+        self.edges = 0
+        self.last_pk = 0
+        self.loaded = False
+        self.version = None
+        self.synced = 0.0
+
+    def _build(self, edges, last_pk=0):
+        following = {}
+        followers = {}
+        count = 0
+        for user_id, author_id in edges:
+            following.setdefault(user_id, array(TYPECODE)).append(author_id)
+            followers.setdefault(author_id, array(TYPECODE)).append(user_id)
+            count += 1
+        for adjacency in (following, followers):
+            for key, values in adjacency.items():
+                adjacency[key] = array(TYPECODE, sorted(values))
+        with self._lock:
+            self._following = following
+            self._followers = followers
+            self.edges = count
+            self.last_pk = last_pk
+            self.loaded = True
+
+    @classmethod
+    def from_edges(cls, edges):
+        graph = cls()
+        graph._build(edges)
+        return graph
+
+    def load(self):
+        """Полная загрузка графа из таблицы Follow."""
+        from .models import Follow
+
+        rows = Follow.objects.values_list('pk', 'user_id', 'author_id')
+        last_pk = 0
+        edges = []
+        for pk, user_id, author_id in rows.iterator():
+            last_pk = max(last_pk, pk)
+            edges.append((user_id, author_id))
+        self._build(edges, last_pk)
+
+    def add(self, user_id, author_id, pk=0):
+        with self._lock:
+            if _insort(self._following.setdefault(user_id, array(TYPECODE)),
+                       author_id):
+                _insort(self._followers.setdefault(
+                    author_id, array(TYPECODE)), user_id)
+                self.edges += 1
+            self.last_pk = max(self.last_pk, pk)
+
+    def remove(self, user_id, author_id):
+        with self._lock:
+            if _discard(self._following.get(user_id, EMPTY), author_id):
+                _discard(self._followers.get(author_id, EMPTY), user_id)
+                self.edges -= 1
+
+    def following(self, user_id):
+        """Отсортированные id авторов, на которых подписан пользователь."""
+        return self._following.get(user_id, EMPTY)
+
+    def followers(self, user_id):
+        """Отсортированные id подписчиков автора."""
+        return self._followers.get(user_id, EMPTY)
+
+    def is_following(self, user_id, author_id):
+        return _contains(self.following(user_id), author_id)
+
+    def mutual(self, user_id):
+        """Пользователи, с которыми подписка взаимная."""
+        return _intersect(self.following(user_id), self.followers(user_id))
+
+    def recommend(self, user_id, limit=10, fanout=200):
+        """Друзья друзей, на которых пользователь ещё не подписан.
+
+        Кандидаты упорядочены по числу общих связей, затем по id.
+        ``fanout`` ограничивает число просматриваемых авторов
+        у каждого из «друзей», чтобы популярные аккаунты
+        не делали запрос дорогим.
+        """
+        following = self.following(user_id)
+        scores = Counter()
+        for friend_id in following:
+            for candidate in _window(self.following(friend_id), fanout):
+                if candidate != user_id and not _contains(following,
+                                                          candidate):
+                    scores[candidate] += 1
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return [candidate for candidate, _ in ranked[:limit]]
+
+    def dump(self, path):
+        """Сохраняет снимок графа: заголовок и массивы рёбер."""
+        with self._lock:
+            users = array(TYPECODE)
+            authors = array(TYPECODE)
+            for user_id, values in self._following.items():
+                users.extend([user_id] * len(values))
+                authors.extend(values)
+            last_pk = self.last_pk
+        if sys.byteorder != 'little':
+            users.byteswap()
+            authors.byteswap()
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'wb') as snapshot:
+            snapshot.write(SNAPSHOT_HEADER.pack(
+                SNAPSHOT_MAGIC, users.itemsize, len(users), last_pk))
+            users.tofile(snapshot)
+            authors.tofile(snapshot)
+        os.replace(tmp_path, path)
+
+    def load_snapshot(self, path):
+        """Загружает снимок. Возвращает False, если файл не подходит."""
+        with open(path, 'rb') as snapshot:
+            header = snapshot.read(SNAPSHOT_HEADER.size)
+            if len(header) != SNAPSHOT_HEADER.size:
+                return False
+            magic, itemsize, count, last_pk = SNAPSHOT_HEADER.unpack(header)
+            if magic != SNAPSHOT_MAGIC or itemsize != array(
+                    TYPECODE).itemsize:
+                return False
+            users = array(TYPECODE)
+            authors = array(TYPECODE)
+            try:
+                users.fromfile(snapshot, count)
+                authors.fromfile(snapshot, count)
+            except EOFError:
+                return False
+        if sys.byteorder != 'little':
+            users.byteswap()
+            authors.byteswap()
+        self._build(zip(users, authors), last_pk)
+        return True
+
+    def sync(self):
+        """Догружает новые подписки; после отписок загружает граф заново."""
+        from .models import Follow
+
+        new_rows = Follow.objects.filter(pk__gt=self.last_pk)
+        for pk, user_id, author_id in new_rows.values_list(
+                'pk', 'user_id', 'author_id'):
+            self.add(user_id, author_id, pk)
+        if self.edges != Follow.objects.count():
+            self.load()
+
+    def stale(self):
+        return (cache.get(VERSION_KEY) != self.version
+                or time.monotonic() - self.synced
+                >= settings.FOLLOW_GRAPH_SYNC_INTERVAL)
+
+    def warm_start(self, path):
+        """Снимок плюс догрузка новых подписок; иначе полная загрузка.
+
+        Если после догрузки число рёбер не совпадает с таблицей
+        (были отписки после снимка), граф строится заново.
+        """
+        if path and os.path.exists(path) and self.load_snapshot(path):
+            self.sync()
+        else:
+            self.load()
+
+
+graph = FollowGraph()
+_load_lock = threading.Lock()
+
+
+def bump_version():
+    """Отмечает изменение подписок для графов всех воркеров."""
+    try:
+        return cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, 1, None)
+        return cache.incr(VERSION_KEY)
+
+
+def _refresh():
+    # Версия читается до запроса: изменения во время загрузки
+    # приведут к ещё одной сверке
+    version = cache.get(VERSION_KEY)
+    if graph.loaded:
+        graph.sync()
+    else:
+        graph.warm_start(getattr(settings, 'FOLLOW_GRAPH_SNAPSHOT', None))
+    graph.version = version
+    graph.synced = time.monotonic()
+
+
+def get_graph():
+    """Граф текущего процесса, сверенный с общей версией.
+
+    Незагруженный граф загружается сразу. Отставший сверяет один
+    поток, остальные тем временем читают текущий граф.
+    """
+    if not graph.loaded:
+        with _load_lock:
+            if not graph.loaded:
+                _refresh()
+    elif graph.stale() and _load_lock.acquire(blocking=False):
+        try:
+            _refresh()
+        finally:
+            _load_lock.release()
+    return graph
+
+
+def preload():
+    """Загрузка при старте сервера; до migrate таблиц нет - пропускаем."""
+    try:
+        get_graph()
+    except DatabaseError:
+        pass
+    finally:
+        # Соединение не должно достаться форкнутым воркерам
+        connections.close_all()
+
+
+def follow_changed(user_id, author_id, pk=None):
+    """Применяет закоммиченную подписку (pk) или отписку к графу."""
+    if graph.loaded:
+        if pk is None:
+            graph.remove(user_id, author_id)
+        else:
+            graph.add(user_id, author_id, pk)
+    version = bump_version()
+    if graph.version is not None and version == graph.version + 1:
+        # Других изменений не было, свой граф уже актуален
+        graph.version = version
@@ -0,0 +1,72 @@
+"""Подписки текущего пользователя в пределах одного запроса.
+
+FollowSet запоминается на объекте запроса. Списки авторов на странице
+заранее проверяются одним запросом ``IN`` через prime(); для авторов,
+которых не было в списке, один раз загружаются все подписки
+пользователя. Так число запросов не зависит от числа авторов.
+"""
+from django.conf import settings
+
+from .models import Follow
+
+REQUEST_ATTR = '_follow_set'
+
+
+def _author_id(author):
+    return getattr(author, 'pk', author)
+
+
+class FollowSet:
+
+    def __init__(self, user):
+        self.user = user
+        self._known = {}
+        self._all = None
+
+    @property
+    def _enabled(self):
+        return self.user is not None and self.user.is_authenticated
+
+    def _follows(self):
+        return Follow.objects.filter(user_id=self.user.pk)
+
+    def prime(self, authors):
+        """Проверяет список авторов одним запросом."""
+        if not self._enabled or self._all is not None:
+            return
+        ids = {_author_id(author) for author in authors} - set(self._known)
+        ids.discard(None)
+        if not ids:
+            return
+        ids = sorted(ids)
+        limit = settings.FOLLOW_SET_IN_LIMIT
+        for start in range(0, len(ids), limit):
+            chunk = ids[start:start + limit]
+            found = set(self._follows().filter(
+                author_id__in=chunk).values_list('author_id', flat=True))
+            self._known.update(
+                (author_id, author_id in found) for author_id in chunk)
+
+    def load(self):
+        """Загружает все подписки пользователя одним запросом."""
+        if self._all is None:
+            self._all = frozenset(
+                self._follows().values_list('author_id', flat=True))
+        return self._all
+
+    def __contains__(self, author):
+        if not self._enabled:
+            return False
+        author_id = _author_id(author)
+        if author_id in self._known:
+            return self._known[author_id]
+        return author_id in self.load()
+
+
+def following_set(request):
+    """FollowSet текущего запроса."""
+    follow_set = getattr(request, REQUEST_ATTR, None)
+    if follow_set is None:
+        follow_set = FollowSet(getattr(request, 'user', None))
+        setattr(request, REQUEST_ATTR, follow_set)
+    return follow_set
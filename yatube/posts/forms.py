@@ -1,9 +1,31 @@
 from django import forms
+from django.forms.models import ModelChoiceIterator
 
+from .group_cache import group_cache
 from .models import Post, Comment
 
 
+class CachedGroupIterator(ModelChoiceIterator):
+    """Варианты выбора группы из кэша групп, без запроса к БД."""
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ('', self.field.empty_label)
+        for group in group_cache.all():
+            yield self.choice(group)
+
+    def __len__(self):
+        return (len(group_cache.all())
+                + (self.field.empty_label is not None))
+
+
 class PostForm(forms.ModelForm):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        group = self.fields['group']
+        group.iterator = CachedGroupIterator
+        group.widget.choices = group.choices
+
     class Meta:
         model = Post
         fields = ('text', 'group', 'image')
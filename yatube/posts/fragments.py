@@ -0,0 +1,52 @@
+from core.fragments import register
+from django.template.loader import render_to_string
+
+from .following import following_set
+from .forms import CommentForm
+
+
+@register('switcher')
+def switcher(request, view_name=''):
+    """Вкладки «Все авторы / Избранные авторы» для вошедших."""
+    return render_to_string(
+        'posts/fragments/switcher.html', {'view_name': view_name}, request)
+
+
+@register('follow_button')
+def follow_button(request, author='', author_id=''):
+    """Кнопка подписки на автора в профиле."""
+    if author_id.isdigit():
+        following = int(author_id) in following_set(request)
+    else:
+        following = request.user.is_authenticated and (
+            request.user.follower.filter(author__username=author).exists())
+    context = {
+        'author': author,
+        'following': following,
+    }
+    return render_to_string(
+        'posts/fragments/follow_button.html', context, request)
+
+
+@register('comment_form')
+def comment_form(request, post_id=''):
+    """Форма комментария с CSRF-токеном."""
+    if not request.user.is_authenticated or not post_id.isdigit():
+        return ''
+    context = {
+        'post_id': post_id,
+        'form': CommentForm(),
+    }
+    return render_to_string(
+        'posts/fragments/comment_form.html', context, request)
+
+
+@register('post_edit_link')
+def post_edit_link(request, post_id='', author=''):
+    """Ссылка на редактирование для автора поста."""
+    if (not post_id.isdigit() or not request.user.is_authenticated
+            or request.user.get_username() != author):
+        return ''
+    return render_to_string(
+        'posts/fragments/post_edit_link.html', {'post_id': post_id},
+        request)
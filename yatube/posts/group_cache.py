@@ -0,0 +1,94 @@
+"""Кэш групп в памяти процесса.
+
+Все группы загружаются одним запросом и хранятся по slug и id.
+После коммита изменения группы сигнал меняет версию в кэше Django,
+и каждый процесс, увидев новую версию, загружает группы заново.
+Версия - случайная строка, а не счётчик: если ключ пропал из кэша,
+новая версия не совпадёт со старой, запомненной процессом. Версия
+читается до запроса, поэтому загрузка, заставшая незакоммиченные
+данные, не переживёт следующую сверку. Чтобы версия
+доходила до всех воркеров, кэш должен быть общим (memcached, redis);
+GROUP_CACHE_TTL ограничивает устаревание, если версия потерялась.
+"""
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404
+
+VERSION_KEY = 'group_cache:version'
+
+
+def bump_version():
+    """Отмечает изменение групп для кэшей всех воркеров."""
+    cache.set(VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def current_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+class GroupCache:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._groups = None
+        self._by_slug = {}
+        self._by_id = {}
+        self._expires = 0.0
+        self._version = None
+
+    def _fresh(self, now, version):
+        return (self._groups is not None and now < self._expires
+                and version == self._version)
+
+    def _load(self):
+        from .models import Group
+
+        now = time.monotonic()
+        version = current_version()
+        if self._fresh(now, version):
+            return
+        with self._lock:
+            if self._fresh(now, version):
+                return
+            groups = list(Group.objects.order_by('title'))
+            self._by_slug = {group.slug: group for group in groups}
+            self._by_id = {group.pk: group for group in groups}
+            self._groups = groups
+            self._version = version
+            self._expires = now + getattr(settings, 'GROUP_CACHE_TTL', 300)
+
+    def all(self):
+        self._load()
+        return self._groups
+
+    def by_slug(self, slug):
+        self._load()
+        return self._by_slug.get(slug)
+
+    def by_id(self, pk):
+        self._load()
+        return self._by_id.get(pk)
+
+    def invalidate(self):
+        """Сбрасывает кэш групп во всех процессах."""
+        bump_version()
+        with self._lock:
+            self._groups = None
+
+
+group_cache = GroupCache()
+
+
+def get_group_or_404(slug):
+    group = group_cache.by_slug(slug)
+    if group is None:
+        raise Http404('Группа не найдена.')
+    return group
@@ -0,0 +1,38 @@
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from posts.models import Upload
+
+
+class Command(BaseCommand):
+    help = 'Удаляет брошенные загрузки картинок и их файлы.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ttl', type=int, default=settings.CHUNKED_UPLOAD_TTL,
+            help='Возраст загрузки в секундах, после которого она удаляется.')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(seconds=options['ttl'])
+        stale = Upload.objects.filter(created__lt=cutoff)
+        deleted = 0
+        for upload in stale.iterator():
+            upload.delete()
+            deleted += 1
+        orphans = 0
+        root = settings.CHUNKED_UPLOAD_ROOT
+        if os.path.isdir(root):
+            known = {f'{pk}.part' for pk in
+                     Upload.objects.values_list('pk', flat=True)}
+            for name in os.listdir(root):
+                path = os.path.join(root, name)
+                if (name.endswith('.part') and name not in known
+                        and os.path.getmtime(path) < cutoff.timestamp()):
+                    os.remove(path)
+                    orphans += 1
+        self.stdout.write(
+            f'Удалено загрузок: {deleted}, файлов без загрузки: {orphans}')
@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.follow_graph import FollowGraph
+
+
+class Command(BaseCommand):
+    help = 'Сохраняет снимок графа подписок для быстрого старта воркеров.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path', default=settings.FOLLOW_GRAPH_SNAPSHOT,
+            help='Куда записать снимок.')
+
+    def handle(self, *args, **options):
+        graph = FollowGraph()
+        graph.load()
+        graph.dump(options['path'])
+        self.stdout.write(
+            f'Сохранено рёбер: {graph.edges} -> {options["path"]}')
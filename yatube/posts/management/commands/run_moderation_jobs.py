@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.moderation import CHUNK_SIZE, run_pending
+
+
+class Command(BaseCommand):
+    help = 'Выполняет задачи массовой модерации из очереди.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk', type=int, default=CHUNK_SIZE,
+                            help='Сколько объектов обрабатывать за пачку.')
+        parser.add_argument('--loop', type=float, default=0,
+                            help='Опрашивать очередь с этим интервалом '
+                                 'в секундах, а не выйти после одного '
+                                 'прохода.')
+
+    def handle(self, *args, **options):
+        while True:
+            for job in run_pending(options['chunk']):
+                self.stdout.write(
+                    f'{job}: {job.get_status_display()}, '
+                    f'обработано {job.processed} из {job.total}'
+                    + (f' ({job.error})' if job.error else ''))
+            if not options['loop']:
+                return
+            time.sleep(options['loop'])
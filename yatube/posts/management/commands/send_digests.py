@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from posts.notifications import BATCH_SIZE, send_digests
+
+
+class Command(BaseCommand):
+    help = ('Считает новые посты авторов для подписчиков, обновляет '
+            'счётчики непрочитанного и ставит дайджесты в очередь писем.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch', type=int, default=BATCH_SIZE,
+                            help='Сколько подписчиков обрабатывать '
+                                 'за запрос.')
+        parser.add_argument('--no-email', action='store_true',
+                            help='Только обновить счётчики.')
+
+    def handle(self, *args, **options):
+        emails = False if options['no_email'] else None
+        run = send_digests(emails, options['batch'])
+        if run is None:
+            self.stdout.write('Новых постов нет')
+        else:
+            self.stdout.write(
+                f'Посты {run}: подписчиков {run.followers}, '
+                f'писем {run.emails}')
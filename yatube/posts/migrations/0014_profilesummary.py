@@ -0,0 +1,66 @@
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max
+import django.db.models.deletion
+
+FIRST_PAGE_SIZE = 10
+
+
+def build_summaries(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Post = apps.get_model('posts', 'Post')
+    Follow = apps.get_model('posts', 'Follow')
+    ProfileSummary = apps.get_model('posts', 'ProfileSummary')
+    posts = {
+        row['author']: row
+        for row in Post.objects.order_by().values('author').annotate(
+            posts_count=Count('pk'), last_post_at=Max('pub_date'))
+    }
+    followers = dict(Follow.objects.order_by().values('author').annotate(
+        count=Count('pk')).values_list('author', 'count'))
+    following = dict(Follow.objects.order_by().values('user').annotate(
+        count=Count('pk')).values_list('user', 'count'))
+    summaries = []
+    for user_id in User.objects.values_list('pk', flat=True).iterator():
+        stats = posts.get(user_id, {})
+        ids = []
+        if stats:
+            ids = Post.objects.filter(author_id=user_id).order_by(
+                '-pub_date', 'author').values_list(
+                'pk', flat=True)[:FIRST_PAGE_SIZE]
+        summaries.append(ProfileSummary(
+            user_id=user_id,
+            posts_count=stats.get('posts_count', 0),
+            last_post_at=stats.get('last_post_at'),
+            followers_count=followers.get(user_id, 0),
+            following_count=following.get(user_id, 0),
+            first_page=','.join(str(pk) for pk in ids),
+        ))
+    ProfileSummary.objects.bulk_create(summaries, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0013_auto_20230223_1615'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfileSummary',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='profile_summary', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('posts_count', models.PositiveIntegerField(default=0)),
+                ('last_post_at', models.DateTimeField(blank=True, null=True)),
+                ('followers_count', models.PositiveIntegerField(default=0)),
+                ('following_count', models.PositiveIntegerField(default=0)),
+                ('first_page', models.TextField(blank=True, help_text='id постов первой страницы через запятую')),
+            ],
+            options={
+                'verbose_name': 'profile summary',
+                'verbose_name_plural': 'profile summaries',
+            },
+        ),
+        migrations.RunPython(build_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 2.2.16 on 2026-10-19 13:35
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0017_post_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ModerationJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('action', models.CharField(choices=[('delete_posts', 'Удаление постов'), ('move_posts', 'Перенос постов в группу'), ('delete_comments', 'Удаление комментариев'), ('purge_authors', 'Удаление всего контента авторов')], max_length=20)),
+                ('status', models.CharField(choices=[('pending', 'В очереди'), ('running', 'Выполняется'), ('done', 'Готово'), ('failed', 'Ошибка')], db_index=True, default='pending', max_length=10)),
+                ('object_ids', models.TextField(help_text='id объектов или авторов через запятую')),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('processed', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('finished', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='moderation_jobs', to=settings.AUTH_USER_MODEL)),
+                ('group', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='posts.Group')),
+            ],
+            options={
+                'verbose_name': 'moderation job',
+                'verbose_name_plural': 'moderation jobs',
+                'ordering': ['-created'],
+            },
+        ),
+    ]
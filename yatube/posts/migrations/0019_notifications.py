@@ -0,0 +1,43 @@
+# Generated by Django 2.2.16 on 2026-10-19 13:39
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0018_moderationjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DigestRun',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('first_post_id', models.PositiveIntegerField()),
+                ('last_post_id', models.PositiveIntegerField()),
+                ('followers', models.PositiveIntegerField(default=0)),
+                ('emails', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'digest run',
+                'verbose_name_plural': 'digest runs',
+                'ordering': ['-last_post_id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='notification', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('unread', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'notification',
+                'verbose_name_plural': 'notifications',
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 2.2.16 on 2026-10-19 14:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0019_notifications'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='moderationjob',
+            name='cursor',
+            field=models.BigIntegerField(default=0, help_text='Последний обработанный id выборки'),
+        ),
+        migrations.AddField(
+            model_name='moderationjob',
+            name='heartbeat',
+            field=models.DateTimeField(blank=True, help_text='Последний признак жизни выполняющего процесса', null=True),
+        ),
+        migrations.AddField(
+            model_name='moderationjob',
+            name='query',
+            field=models.TextField(blank=True, help_text='Выборка объектов вместо списка id (выбраны все)'),
+        ),
+        migrations.AlterField(
+            model_name='moderationjob',
+            name='object_ids',
+            field=models.TextField(blank=True, help_text='id объектов или авторов через запятую'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-19 14:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0020_moderationjob_query_heartbeat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='digestrun',
+            name='claimed',
+            field=models.BooleanField(default=False),
+        ),
+    ]
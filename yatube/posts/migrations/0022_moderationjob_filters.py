@@ -0,0 +1,22 @@
+# Generated by Django 2.2.16 on 2026-10-19 14:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0021_digestrun_claimed'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='moderationjob',
+            name='query',
+        ),
+        migrations.AddField(
+            model_name='moderationjob',
+            name='filters',
+            field=models.TextField(blank=True, help_text='Фильтры и поиск списка в JSON вместо списка id (выбраны все)'),
+        ),
+    ]
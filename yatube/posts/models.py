@@ -1,7 +1,13 @@
+import json
+import os
+import uuid
+
 from core.models import CreatedModel
+from core.storage import content_storage
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db import models
-from django.db.models import UniqueConstraint
+from django.db.models import Q, UniqueConstraint
 
 User = get_user_model()
 
@@ -21,6 +27,17 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+
+    def bulk_create(self, objs, *args, **kwargs):
+        """bulk_create не шлёт сигналы, поэтому сводки обновляем здесь."""
+        from .profile_summary import refresh_posts
+
+        objs = super().bulk_create(objs, *args, **kwargs)
+        refresh_posts({post.author_id for post in objs})
+        return objs
+
+
 class Post(CreatedModel):
     text = models.TextField(verbose_name='Текст',
                             help_text='Введите текст поста')
@@ -39,13 +56,23 @@ class Post(CreatedModel):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=content_storage,
         blank=True
     )
 
+    objects = PostQuerySet.as_manager()
+
     class Meta:
         verbose_name = "post"
         verbose_name_plural = "posts"
         ordering = ['-pub_date', 'author']
+        indexes = [
+            models.Index(fields=['-pub_date'], name='post_pub_date_idx'),
+            models.Index(fields=['author', '-pub_date'],
+                         name='post_author_pub_date_idx'),
+            models.Index(fields=['group', '-pub_date'],
+                         name='post_group_pub_date_idx'),
+        ]
 
     def __str__(self):
         return self.text[:STR_LEN]
@@ -91,3 +118,200 @@ class Follow(CreatedModel):
             UniqueConstraint(fields=['user', 'author'],
                              name='unique_following')
         ]
+
+
+class ProfileSummary(models.Model):
+    """Сводка профиля автора, поддерживается сигналами."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='profile_summary'
+    )
+    posts_count = models.PositiveIntegerField(default=0)
+    last_post_at = models.DateTimeField(blank=True, null=True)
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+    first_page = models.TextField(
+        blank=True,
+        help_text='id постов первой страницы через запятую'
+    )
+
+    class Meta:
+        verbose_name = 'profile summary'
+        verbose_name_plural = 'profile summaries'
+
+    def __str__(self):
+        return f'{self.user_id}: {self.posts_count}'
+
+    @property
+    def first_page_ids(self):
+        return [int(pk) for pk in self.first_page.split(',') if pk]
+
+
+class Upload(CreatedModel):
+    """Картинка, загружаемая частями. Смещение - размер файла на диске."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4,
+                          editable=False)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='uploads'
+    )
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    completed = models.BooleanField(default=False)
+
+    class Meta:
+        verbose_name = 'upload'
+        verbose_name_plural = 'uploads'
+
+    def __str__(self):
+        return self.filename
+
+    @property
+    def path(self):
+        return os.path.join(settings.CHUNKED_UPLOAD_ROOT, f'{self.pk}.part')
+
+    @property
+    def offset(self):
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+
+class ModerationJob(CreatedModel):
+    """Массовое действие модератора, выполняемое в фоне пачками."""
+    DELETE_POSTS = 'delete_posts'
+    MOVE_POSTS = 'move_posts'
+    DELETE_COMMENTS = 'delete_comments'
+    PURGE_AUTHORS = 'purge_authors'
+    ACTIONS = (
+        (DELETE_POSTS, 'Удаление постов'),
+        (MOVE_POSTS, 'Перенос постов в группу'),
+        (DELETE_COMMENTS, 'Удаление комментариев'),
+        (PURGE_AUTHORS, 'Удаление всего контента авторов'),
+    )
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Готово'),
+        (FAILED, 'Ошибка'),
+    )
+
+    action = models.CharField(max_length=20, choices=ACTIONS)
+    status = models.CharField(max_length=10, choices=STATUSES,
+                              default=PENDING, db_index=True)
+    object_ids = models.TextField(
+        blank=True,
+        help_text='id объектов или авторов через запятую'
+    )
+    filters = models.TextField(
+        blank=True,
+        help_text='Фильтры и поиск списка в JSON вместо списка id '
+                  '(выбраны все)'
+    )
+    cursor = models.BigIntegerField(
+        default=0,
+        help_text='Последний обработанный id выборки'
+    )
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='+'
+    )
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='moderation_jobs'
+    )
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    heartbeat = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text='Последний признак жизни выполняющего процесса'
+    )
+    finished = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        verbose_name = 'moderation job'
+        verbose_name_plural = 'moderation jobs'
+        ordering = ['-created']
+
+    def __str__(self):
+        return f'{self.get_action_display()} #{self.pk}'
+
+    @property
+    def ids(self):
+        return [int(pk) for pk in self.object_ids.split(',') if pk]
+
+    def set_filters(self, lookups, search_fields=(), search=''):
+        """Запоминает фильтры списка: поиски полей и строку поиска."""
+        self.filters = json.dumps({
+            'lookups': lookups,
+            'search_fields': list(search_fields),
+            'search': search,
+        }, ensure_ascii=False)
+
+    def get_queryset(self, model):
+        """Выборка по сохранённым фильтрам, как в списке админки.
+
+        Каждое слово поиска ищется по любому из search_fields.
+        """
+        filters = json.loads(self.filters)
+        queryset = model._default_manager.filter(**filters['lookups'])
+        for word in filters['search'].split():
+            condition = Q()
+            for field in filters['search_fields']:
+                condition |= Q(**{f'{field}__icontains': word})
+            queryset = queryset.filter(condition)
+        return queryset
+
+
+class Notification(models.Model):
+    """Число непрочитанных новых постов авторов из подписок."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='notification'
+    )
+    unread = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'notification'
+        verbose_name_plural = 'notifications'
+
+    def __str__(self):
+        return f'{self.user_id}: {self.unread}'
+
+
+class DigestRun(CreatedModel):
+    """Проход рассылки дайджестов; last_post_id - водяной знак.
+
+    claimed ставит следующий проход, забирая посты после водяного знака.
+    """
+    first_post_id = models.PositiveIntegerField()
+    last_post_id = models.PositiveIntegerField()
+    followers = models.PositiveIntegerField(default=0)
+    emails = models.PositiveIntegerField(default=0)
+    claimed = models.BooleanField(default=False)
+
+    class Meta:
+        verbose_name = 'digest run'
+        verbose_name_plural = 'digest runs'
+        ordering = ['-last_post_id']
+
+    def __str__(self):
+        return f'{self.first_post_id}-{self.last_post_id}'
@@ -0,0 +1,200 @@
+"""Фоновые задачи массовой модерации.
+
+Действие админки только записывает ModerationJob: список id или,
+когда выбраны все объекты списка, фильтры и поиск списка в JSON. Команда
+run_moderation_jobs выполняет задачу пачками по CHUNK_SIZE объектов.
+Каждая пачка и сохранение прогресса - одна транзакция, поэтому
+перезапущенная задача продолжает с первой необработанной пачки.
+
+Выполняющий процесс отмечает heartbeat после каждой пачки. Задача,
+чей heartbeat старше LEASE секунд (процесс упал), возвращается
+в очередь; её прежний исполнитель, если он жив, на следующей пачке
+видит, что задачу забрали, и останавливается.
+
+Удаление идёт через QuerySet.delete(), сигналы моделей срабатывают
+как обычно, а пересчёт сводок профилей откладывается до конца
+пачки. Оболочки страниц сбрасываются один раз после пачки.
+"""
+from datetime import timedelta
+
+from core.page_cache import bump_page_version
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Comment, ModerationJob, Post
+from .profile_summary import batch
+
+CHUNK_SIZE = 500
+# Сколько секунд задача без heartbeat считается выполняющейся
+LEASE = 10 * 60
+
+
+class LeaseLost(Exception):
+    """Задачу вернули в очередь, пока этот процесс её выполнял."""
+
+
+def enqueue(action, ids=None, user=None, group=None, total=None,
+            filters=None):
+    """Ставит задачу в очередь и сразу возвращает её.
+
+    Объекты задаются списком ids или словарём filters с ключами
+    lookups, search_fields и search (см. ModerationJob.set_filters).
+    """
+    job = ModerationJob(action=action, group=group, created_by=user)
+    if filters is not None:
+        job.set_filters(**filters)
+        if total is None:
+            model = ACTION_MODELS[action]
+            total = job.get_queryset(model).count()
+        job.total = total
+    else:
+        ids = sorted(set(ids))
+        job.object_ids = ','.join(str(pk) for pk in ids)
+        job.total = len(ids) if total is None else total
+    job.save()
+    return job
+
+
+def _chunks(job, model, size):
+    if job.filters:
+        queryset = job.get_queryset(model).order_by('pk').values_list(
+            'pk', flat=True)
+        while True:
+            # cursor сдвигает run() после каждой пачки
+            ids = list(queryset.filter(pk__gt=job.cursor)[:size])
+            if not ids:
+                return
+            yield ids
+    else:
+        ids = job.ids
+        for start in range(job.processed, len(ids), size):
+            yield ids[start:start + size]
+
+
+def _delete_posts(job, size):
+    for ids in _chunks(job, Post, size):
+        with batch():
+            Post.objects.filter(pk__in=ids).delete()
+        yield ids
+
+
+def _move_posts(job, size):
+    for ids in _chunks(job, Post, size):
+        # update() не шлёт сигналов, сводки профилей от группы не зависят
+        Post.objects.filter(pk__in=ids).update(group=job.group)
+        yield ids
+
+
+def _delete_comments(job, size):
+    for ids in _chunks(job, Comment, size):
+        Comment.objects.filter(pk__in=ids).delete()
+        yield ids
+
+
+def _purge_authors(job, size):
+    authors = job.ids
+    for model in (Comment, Post):
+        objects = model.objects.filter(author_id__in=authors).order_by()
+        while True:
+            ids = list(objects.values_list('pk', flat=True)[:size])
+            if not ids:
+                break
+            with batch():
+                model.objects.filter(pk__in=ids).delete()
+            yield ids
+
+
+ACTION_MODELS = {
+    ModerationJob.DELETE_POSTS: Post,
+    ModerationJob.MOVE_POSTS: Post,
+    ModerationJob.DELETE_COMMENTS: Comment,
+}
+
+HANDLERS = {
+    ModerationJob.DELETE_POSTS: _delete_posts,
+    ModerationJob.MOVE_POSTS: _move_posts,
+    ModerationJob.DELETE_COMMENTS: _delete_comments,
+    ModerationJob.PURGE_AUTHORS: _purge_authors,
+}
+
+
+def claim(job):
+    """Забирает задачу из очереди; False, если её забрал другой процесс."""
+    job.heartbeat = timezone.now()
+    return bool(ModerationJob.objects.filter(
+        pk=job.pk, status=ModerationJob.PENDING).update(
+        status=ModerationJob.RUNNING, heartbeat=job.heartbeat))
+
+
+def _save_progress(job, ids):
+    """Прогресс после пачки; LeaseLost откатывает пачку."""
+    heartbeat = timezone.now()
+    updated = ModerationJob.objects.filter(
+        pk=job.pk, status=ModerationJob.RUNNING,
+        heartbeat=job.heartbeat).update(
+        processed=job.processed + len(ids), cursor=ids[-1],
+        heartbeat=heartbeat)
+    if not updated:
+        raise LeaseLost
+    job.heartbeat = heartbeat
+
+
+def run(job, size=CHUNK_SIZE):
+    """Выполняет задачу, сохраняя прогресс после каждой пачки."""
+    steps = HANDLERS[job.action](job, size)
+    try:
+        while True:
+            with transaction.atomic():
+                ids = next(steps, None)
+                if ids is None:
+                    break
+                _save_progress(job, ids)
+            job.processed += len(ids)
+            job.cursor = ids[-1]
+            bump_page_version()
+    except LeaseLost:
+        job.refresh_from_db()
+        return job
+    except Exception as error:
+        job.status = ModerationJob.FAILED
+        job.error = repr(error)
+    else:
+        job.status = ModerationJob.DONE
+        job.error = ''
+    job.finished = timezone.now()
+    ModerationJob.objects.filter(
+        pk=job.pk, status=ModerationJob.RUNNING,
+        heartbeat=job.heartbeat).update(
+        status=job.status, error=job.error, finished=job.finished)
+    return job
+
+
+def requeue_stale(lease=LEASE):
+    """Возвращает в очередь задачи, чей исполнитель перестал отмечаться."""
+    return ModerationJob.objects.filter(
+        status=ModerationJob.RUNNING,
+        heartbeat__lt=timezone.now() - timedelta(seconds=lease)).update(
+        status=ModerationJob.PENDING)
+
+
+def run_pending(size=CHUNK_SIZE, limit=None):
+    """Выполняет задачи из очереди по порядку, возвращает их."""
+    requeue_stale()
+    finished = []
+    pending = ModerationJob.objects.filter(
+        status=ModerationJob.PENDING).order_by('created', 'pk')
+    for job in pending[:limit]:
+        if claim(job):
+            job.status = ModerationJob.RUNNING
+            finished.append(run(job, size))
+    return finished
+
+
+def requeue(queryset):
+    """Возвращает в очередь упавшие и зависшие задачи."""
+    stale = timezone.now() - timedelta(seconds=LEASE)
+    failed = queryset.filter(status=ModerationJob.FAILED).update(
+        status=ModerationJob.PENDING, error='', finished=None)
+    return failed + queryset.filter(
+        status=ModerationJob.RUNNING, heartbeat__lt=stale).update(
+        status=ModerationJob.PENDING)
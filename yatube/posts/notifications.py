@@ -0,0 +1,136 @@
+"""Уведомления подписчиков о новых постах.
+
+Отдельных событий не пишется: событие - сам пост, а водяной знак
+последнего прохода хранится в DigestRun. Команда send_digests берёт
+посты между водяным знаком и текущим максимальным id и одним
+агрегирующим запросом по Follow и Post считает новые посты для каждой
+пары подписчик - автор. Счётчики непрочитанного увеличиваются
+UPDATE с подзапросом пачками подписчиков, письма уходят через
+EMAIL_BACKEND. Всё это и новый водяной знак пишутся в одной
+транзакции. Проход забирает посты условным UPDATE предыдущего
+водяного знака (claimed), поэтому из двух одновременных проходов
+работу делает один, и пост не попадёт в два дайджеста. SELECT FOR
+UPDATE для этого не годится: в SQLite он ничего не блокирует.
+
+Первый проход только ставит водяной знак: старые посты не рассылаются.
+"""
+from itertools import groupby
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Count, F, Max, OuterRef, Subquery
+from django.template.loader import render_to_string
+
+from .models import DigestRun, Follow, Notification, Post
+
+BATCH_SIZE = 500
+UNREAD_KEY = 'notifications:unread:{}'
+SUBJECT = 'Новые посты в ваших подписках'
+
+
+def unread_count(user):
+    """Число непрочитанных постов пользователя, из кэша."""
+    key = UNREAD_KEY.format(user.pk)
+    count = cache.get(key)
+    if count is None:
+        count = Notification.objects.filter(user=user).values_list(
+            'unread', flat=True).first() or 0
+        cache.set(key, count, settings.NOTIFICATIONS_CACHE_TIMEOUT)
+    return count
+
+
+def mark_read(user):
+    """Обнуляет счётчик непрочитанных постов пользователя."""
+    if unread_count(user):
+        Notification.objects.filter(user=user).update(unread=0)
+        cache.set(UNREAD_KEY.format(user.pk), 0,
+                  settings.NOTIFICATIONS_CACHE_TIMEOUT)
+
+
+def _chunks(ids, size):
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def _add_unread(follows, first, last, size):
+    """Увеличивает счётчики подписчиков на число их новых постов."""
+    user_ids = list(follows.values_list('user_id', flat=True).distinct())
+    new_posts = Post.objects.filter(
+        pk__gte=first, pk__lte=last,
+        author__following__user_id=OuterRef('user_id')).order_by().values(
+        'author__following__user_id').annotate(count=Count('pk')).values(
+        'count')
+    for chunk in _chunks(user_ids, size):
+        Notification.objects.bulk_create(
+            (Notification(user_id=user_id) for user_id in chunk),
+            ignore_conflicts=True)
+        Notification.objects.filter(user_id__in=chunk).update(
+            unread=F('unread') + Subquery(new_posts))
+        # Второй сброс после фиксации убирает значение, прочитанное
+        # из БД другим запросом до конца транзакции
+        keys = [UNREAD_KEY.format(pk) for pk in chunk]
+        cache.delete_many(keys)
+        transaction.on_commit(lambda keys=keys: cache.delete_many(keys))
+    return len(user_ids)
+
+
+def _digests(follows):
+    """Письма подписчикам: авторы и число их новых постов."""
+    pairs = follows.exclude(user__email='').values(
+        'user_id', 'user__username', 'user__email',
+        'author__username').annotate(count=Count('author__posts')).order_by(
+        'user_id', 'author__username')
+    for (_, username, email), rows in groupby(
+            pairs.iterator(),
+            lambda row: (row['user_id'], row['user__username'],
+                         row['user__email'])):
+        body = render_to_string('posts/email/digest.txt', {
+            'user': {'username': username},
+            'authors': [(row['author__username'], row['count'])
+                        for row in rows],
+            'site_url': settings.DIGEST_SITE_URL,
+        })
+        yield EmailMessage(SUBJECT, body, to=[email])
+
+
+def _send(messages, size):
+    sent = 0
+    connection = get_connection()
+    batch = []
+    for message in messages:
+        batch.append(message)
+        if len(batch) == size:
+            sent += connection.send_messages(batch)
+            batch = []
+    if batch:
+        sent += connection.send_messages(batch)
+    return sent
+
+
+def send_digests(emails=None, size=BATCH_SIZE):
+    """Проход рассылки: DigestRun или None, если новых постов нет."""
+    if emails is None:
+        emails = settings.DIGEST_EMAILS
+    with transaction.atomic():
+        previous = DigestRun.objects.first()
+        last = Post.objects.aggregate(last=Max('pk'))['last']
+        if last is None or (previous and last <= previous.last_post_id):
+            return None
+        if previous is None:
+            return DigestRun.objects.create(first_post_id=last,
+                                            last_post_id=last)
+        if not DigestRun.objects.filter(
+                pk=previous.pk, claimed=False).update(claimed=True):
+            # Посты после водяного знака забрал другой проход
+            return None
+        first = previous.last_post_id + 1
+        follows = Follow.objects.filter(
+            author__posts__pk__gte=first, author__posts__pk__lte=last)
+        run = DigestRun(first_post_id=first, last_post_id=last)
+        run.followers = _add_unread(follows, first, last, size)
+        if emails:
+            run.emails = _send(_digests(follows), size)
+        run.save()
+    return run
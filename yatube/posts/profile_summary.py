@@ -0,0 +1,117 @@
+"""Сводки профилей авторов.
+
+Сводка хранит число постов, время последнего поста, число
+подписчиков и подписок и id постов первой страницы профиля.
+Значения каждый раз пересчитываются из таблиц, а не увеличиваются
+на единицу, поэтому гонки двух обновлений не накапливают ошибку.
+
+Сигналы обновляют только уже существующие сводки: так удаление
+пользователя каскадом не создаёт сводку заново. Отсутствующая
+сводка строится при первом открытии профиля.
+
+Внутри batch() пересчёт откладывается до выхода из блока, чтобы
+массовые операции пересчитывали каждую сводку один раз.
+"""
+import threading
+from contextlib import contextmanager
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Max
+from django.shortcuts import get_object_or_404
+
+from yatube.settings import PER_PAGE
+from .models import Follow, Post, ProfileSummary, User
+
+
+def _posts_values(author_id):
+    posts = Post.objects.filter(author_id=author_id)
+    stats = posts.order_by().aggregate(
+        posts_count=Count('pk'), last_post_at=Max('pub_date'))
+    ids = posts.values_list('pk', flat=True)[:PER_PAGE]
+    stats['first_page'] = ','.join(str(pk) for pk in ids)
+    return stats
+
+
+def _follows_values(user_id):
+    return {
+        'followers_count': Follow.objects.filter(author_id=user_id).count(),
+        'following_count': Follow.objects.filter(user_id=user_id).count(),
+    }
+
+
+CHUNK_SIZE = 500
+_pending = threading.local()
+
+
+@contextmanager
+def batch():
+    """Откладывает пересчёт сводок до конца блока."""
+    if getattr(_pending, 'values', None) is not None:
+        yield
+        return
+    _pending.values = {}
+    try:
+        yield
+    finally:
+        pending, _pending.values = _pending.values, None
+        for values, user_ids in pending.items():
+            _update(user_ids, values)
+
+
+def _update(user_ids, values):
+    pending = getattr(_pending, 'values', None)
+    if pending is not None:
+        pending.setdefault(values, set()).update(user_ids)
+        return
+    user_ids = sorted(user_ids)
+    for start in range(0, len(user_ids), CHUNK_SIZE):
+        existing = ProfileSummary.objects.filter(
+            user_id__in=user_ids[start:start + CHUNK_SIZE]).values_list(
+            'user_id', flat=True)
+        for user_id in existing:
+            ProfileSummary.objects.filter(user_id=user_id).update(
+                **values(user_id))
+
+
+def refresh_posts(author_ids):
+    """Пересчитывает посты в сводках авторов."""
+    _update(author_ids, _posts_values)
+
+
+def refresh_follows(user_ids):
+    """Пересчитывает подписчиков и подписки в сводках."""
+    _update(user_ids, _follows_values)
+
+
+def build(user):
+    """Строит сводку пользователя целиком."""
+    values = {**_posts_values(user.pk), **_follows_values(user.pk)}
+    try:
+        with transaction.atomic():
+            summary, _ = ProfileSummary.objects.update_or_create(
+                user=user, defaults=values)
+    except IntegrityError:
+        summary = ProfileSummary.objects.get(user=user)
+    summary.user = user
+    return summary
+
+
+def get_summary_or_404(username):
+    """Сводка вместе с пользователем одним запросом."""
+    summary = ProfileSummary.objects.select_related('user').filter(
+        user__username=username).first()
+    if summary is None:
+        summary = build(get_object_or_404(User, username=username))
+    return summary
+
+
+def first_page_posts(summary):
+    """Посты первой страницы по сохранённым id или None.
+
+    None возвращается, если список id не соответствует счётчику,
+    например после изменения PER_PAGE.
+    """
+    ids = summary.first_page_ids
+    if len(ids) != min(summary.posts_count, PER_PAGE):
+        return None
+    return Post.objects.filter(pk__in=ids).select_related('group')
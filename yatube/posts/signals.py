@@ -0,0 +1,75 @@
+from core.page_cache import bump_page_version_on_commit
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .follow_graph import follow_changed
+from .group_cache import group_cache
+from .models import Comment, Follow, Group, Post, Upload, User
+from .profile_summary import refresh_follows, refresh_posts
+from .uploads import remove_file
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    """Добавляет ребро в граф подписок после коммита."""
+    if created:
+        user_id, author_id, pk = (
+            instance.user_id, instance.author_id, instance.pk)
+        transaction.on_commit(
+            lambda: follow_changed(user_id, author_id, pk))
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    """Убирает ребро из графа подписок после коммита."""
+    user_id, author_id = instance.user_id, instance.author_id
+    transaction.on_commit(lambda: follow_changed(user_id, author_id))
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def follow_summary_changed(sender, instance, **kwargs):
+    """Пересчитывает подписчиков и подписки в сводках профилей."""
+    refresh_follows({instance.user_id, instance.author_id})
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def post_summary_changed(sender, instance, **kwargs):
+    """Пересчитывает посты в сводке автора."""
+    refresh_posts({instance.author_id})
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, **kwargs):
+    """Сбрасывает кэш групп всех процессов после коммита."""
+    transaction.on_commit(group_cache.invalidate)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def content_changed(sender, **kwargs):
+    """Сбрасывает закэшированные оболочки страниц."""
+    bump_page_version_on_commit()
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, update_fields=None, **kwargs):
+    """Имя автора есть в оболочках; вход пользователя их не меняет."""
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    bump_page_version_on_commit()
+
+
+@receiver(post_delete, sender=Upload)
+def upload_deleted(sender, instance, **kwargs):
+    """Удаляет недокачанный файл вместе с загрузкой."""
+    remove_file(instance)
@@ -0,0 +1,14 @@
+from django import template
+
+from ..following import following_set
+
+register = template.Library()
+
+
+@register.filter
+def is_following(author, request):
+    """Подписан ли текущий пользователь на автора.
+
+    Использует FollowSet запроса: {{ author|is_following:request }}.
+    """
+    return author in following_set(request)
@@ -0,0 +1,261 @@
+import json
+from datetime import timedelta
+
+from core.paginator import COUNT_LIMIT, EstimatedCountPaginator
+from django.contrib.admin import helpers
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.db.models.signals import post_delete
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Comment, Group, ModerationJob, Post
+from ..moderation import LEASE, claim, enqueue, requeue, run, run_pending
+
+User = get_user_model()
+
+
+class PostAdminTests(TestCase):
+    """Массовые действия админки работают пачками."""
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password')
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        Post.objects.bulk_create(
+            Post(text=f'Пост {i}', author=cls.author) for i in range(5))
+        cls.posts = list(Post.objects.order_by('pk'))
+
+    def setUp(self):
+        self.client.force_login(PostAdminTests.admin)
+        self.url = reverse('admin:posts_post_changelist')
+
+    def action(self, action, ids, **data):
+        return self.client.post(self.url, {
+            'action': action, helpers.ACTION_CHECKBOX_NAME: ids, **data})
+
+    def test_changelist(self):
+        """Список постов открывается с фильтром по датам."""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Пост 4')
+        actions = dict(response.context['action_form'].fields[
+            'action'].choices)
+        self.assertNotIn('delete_selected', actions)
+        self.assertIn('delete_posts', actions)
+
+    def test_move_to_group(self):
+        """Перенос в группу ставится в очередь и выполняется в фоне."""
+        ids = [post.pk for post in PostAdminTests.posts[:3]]
+        response = self.action(
+            'move_to_group', ids, group=PostAdminTests.group.pk)
+        self.assertRedirects(response, self.url)
+        self.assertFalse(Post.objects.filter(group__isnull=False).exists())
+        job = ModerationJob.objects.get()
+        self.assertEqual((job.action, job.total, job.created_by),
+                         (ModerationJob.MOVE_POSTS, 3, PostAdminTests.admin))
+        run_pending(size=2)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.processed),
+                         (ModerationJob.DONE, 3))
+        self.assertEqual(
+            set(Post.objects.filter(group=PostAdminTests.group).values_list(
+                'pk', flat=True)), set(ids))
+
+    def test_delete_posts(self):
+        """Удаление сначала спрашивает подтверждение."""
+        post = PostAdminTests.posts[0]
+        Comment.objects.create(
+            post=post, author=PostAdminTests.author, text='Комментарий')
+        ids = [post.pk, PostAdminTests.posts[1].pk]
+        response = self.action('delete_posts', ids)
+        self.assertTemplateUsed(response,
+                                'admin/posts/confirm_moderation.html')
+        self.assertEqual(response.context['count'], 2)
+        response = self.action('delete_posts', ids, confirm='yes')
+        self.assertRedirects(response, self.url)
+        self.assertEqual(Post.objects.count(), 5)
+        run_pending()
+        self.assertEqual(Post.objects.count(), 3)
+        self.assertFalse(Comment.objects.exists())
+        summary_url = reverse('posts:profile', args=['author'])
+        self.assertContains(self.client.get(summary_url), 'Пост 4')
+
+    def test_select_across_stores_filter(self):
+        """Выбор всех объектов сохраняет выборку, а не список id."""
+        Post.objects.filter(pk=PostAdminTests.posts[0].pk).update(
+            text='Другой')
+        response = self.client.post(f'{self.url}?q=Пост', {
+            'action': 'move_to_group', 'select_across': '1',
+            'group': PostAdminTests.group.pk,
+            helpers.ACTION_CHECKBOX_NAME: [PostAdminTests.posts[1].pk]})
+        self.assertEqual(response.status_code, 302)
+        job = ModerationJob.objects.get()
+        self.assertEqual((job.object_ids, job.total), ('', 4))
+        self.assertEqual(json.loads(job.filters), {
+            'lookups': {}, 'search_fields': ['text'], 'search': 'Пост'})
+        run_pending(size=3)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.processed),
+                         (ModerationJob.DONE, 4))
+        self.assertEqual(Post.objects.filter(group__isnull=True).get().text,
+                         'Другой')
+
+    def test_select_across_with_list_filter(self):
+        """Фильтр списка по дате тоже сохраняется и применяется."""
+        old = PostAdminTests.posts[0]
+        Post.objects.filter(pk=old.pk).update(
+            pub_date=timezone.now() - timedelta(days=400))
+        year = timezone.now().year
+        response = self.client.post(f'{self.url}?pub_date__year={year}', {
+            'action': 'delete_posts', 'select_across': '1', 'confirm': 'yes',
+            helpers.ACTION_CHECKBOX_NAME: [PostAdminTests.posts[1].pk]})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(ModerationJob.objects.get().total, 4)
+        run_pending()
+        self.assertEqual(list(Post.objects.all()), [old])
+
+    def test_actions_require_permissions(self):
+        """Действия доступны только с правами на изменение и удаление."""
+        moderator = User.objects.create_user(
+            username='moderator', is_staff=True)
+        moderator.user_permissions.add(
+            Permission.objects.get(codename='view_post'))
+        self.client.force_login(moderator)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.context['action_form'])
+        self.action('move_to_group', [PostAdminTests.posts[0].pk],
+                    group=PostAdminTests.group.pk)
+        self.assertFalse(ModerationJob.objects.exists())
+        moderator.user_permissions.add(
+            Permission.objects.get(codename='change_post'))
+        actions = dict(self.client.get(self.url).context[
+            'action_form'].fields['action'].choices)
+        self.assertIn('move_to_group', actions)
+        self.assertNotIn('delete_posts', actions)
+
+    def test_delete_comments_confirmation(self):
+        """Удаление комментариев тоже спрашивает подтверждение."""
+        comment = Comment.objects.create(
+            post=PostAdminTests.posts[0], author=PostAdminTests.author,
+            text='Комментарий')
+        url = reverse('admin:posts_comment_changelist')
+        data = {'action': 'delete_comments',
+                helpers.ACTION_CHECKBOX_NAME: [comment.pk]}
+        response = self.client.post(url, data)
+        self.assertTemplateUsed(response,
+                                'admin/posts/confirm_moderation.html')
+        self.assertFalse(ModerationJob.objects.exists())
+        self.client.post(url, {**data, 'confirm': 'yes'})
+        run_pending()
+        self.assertFalse(Comment.objects.exists())
+
+    def test_purge_authors(self):
+        """Удаляются все посты и комментарии авторов выбранных постов."""
+        spammer = User.objects.create_user(username='spammer')
+        spam = Post.objects.create(text='Спам', author=spammer)
+        Comment.objects.create(
+            post=PostAdminTests.posts[0], author=spammer, text='Спам')
+        Comment.objects.create(
+            post=spam, author=PostAdminTests.author, text='Ответ')
+        self.action('purge_authors', [spam.pk], confirm='yes')
+        job = ModerationJob.objects.get()
+        self.assertEqual((job.ids, job.total), ([spammer.pk], 2))
+        run_pending(size=1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ModerationJob.DONE)
+        self.assertFalse(Post.objects.filter(author=spammer).exists())
+        self.assertFalse(Comment.objects.exists())
+        self.assertEqual(Post.objects.count(), 5)
+
+
+class ModerationJobTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        Post.objects.bulk_create(
+            Post(text=str(i), author=cls.author) for i in range(5))
+        cls.ids = list(Post.objects.values_list('pk', flat=True))
+
+    def test_failed_job_resumes(self):
+        """Перезапущенная задача продолжает с необработанной пачки."""
+        job = enqueue(ModerationJob.DELETE_POSTS, self.ids)
+        calls = []
+
+        def fail_second_chunk(sender, **kwargs):
+            calls.append(sender)
+            if len(calls) == 3:
+                raise RuntimeError('сбой')
+
+        post_delete.connect(fail_second_chunk, sender=Post)
+        try:
+            run_pending(size=2)
+        finally:
+            post_delete.disconnect(fail_second_chunk, sender=Post)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.processed),
+                         (ModerationJob.FAILED, 2))
+        self.assertEqual(Post.objects.count(), 3)
+        self.assertEqual(requeue(ModerationJob.objects.all()), 1)
+        run_pending(size=2)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.processed),
+                         (ModerationJob.DONE, 5))
+        self.assertFalse(Post.objects.exists())
+
+    def test_stale_running_job_requeued(self):
+        """Задача упавшего процесса возвращается в очередь по heartbeat."""
+        job = enqueue(ModerationJob.DELETE_POSTS, self.ids)
+        self.assertTrue(claim(job))
+        self.assertEqual(run_pending(), [])
+        ModerationJob.objects.filter(pk=job.pk).update(
+            heartbeat=timezone.now() - timedelta(seconds=LEASE + 1))
+        [finished] = run_pending(size=2)
+        self.assertEqual((finished.status, finished.processed),
+                         (ModerationJob.DONE, 5))
+        self.assertFalse(Post.objects.exists())
+
+    def test_lost_lease_stops_worker(self):
+        """Прежний исполнитель останавливается, если задачу забрали."""
+        job = enqueue(ModerationJob.DELETE_POSTS, self.ids)
+        self.assertTrue(claim(job))
+        ModerationJob.objects.filter(pk=job.pk).update(
+            heartbeat=timezone.now() - timedelta(seconds=LEASE + 1))
+        self.assertEqual(requeue(ModerationJob.objects.all()), 1)
+        job = run(job, size=2)
+        self.assertEqual((job.status, job.processed),
+                         (ModerationJob.PENDING, 0))
+        self.assertEqual(Post.objects.count(), 5)
+
+    def test_claimed_job_is_skipped(self):
+        """Задачу, которую забрал другой процесс, второй раз не берут."""
+        job = enqueue(ModerationJob.DELETE_POSTS, self.ids)
+        self.assertTrue(claim(job))
+        self.assertEqual(run_pending(), [])
+        self.assertEqual(Post.objects.count(), 5)
+
+
+class EstimatedCountPaginatorTests(TestCase):
+    def test_filtered_count_is_limited(self):
+        """Для выборки с фильтром COUNT ограничен COUNT_LIMIT."""
+        author = User.objects.create_user(username='author')
+        Post.objects.bulk_create(
+            Post(text=str(i), author=author) for i in range(3))
+        paginator = EstimatedCountPaginator(
+            Post.objects.filter(author=author), 2)
+        self.assertEqual(paginator.count, 3)
+        self.assertEqual(paginator.num_pages, 2)
+        self.assertGreater(COUNT_LIMIT, paginator.count)
+
+    def test_small_table_is_counted(self):
+        """Небольшая таблица считается точно, а не по оценке."""
+        author = User.objects.create_user(username='author')
+        Post.objects.bulk_create(
+            Post(text=str(i), author=author) for i in range(3))
+        Post.objects.order_by('pk').first().delete()
+        self.assertEqual(EstimatedCountPaginator(Post.objects.all(), 10).count,
+                         2)
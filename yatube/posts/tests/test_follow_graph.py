@@ -0,0 +1,130 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from ..follow_graph import FollowGraph, bump_version, get_graph, graph
+from ..models import Follow
+
+User = get_user_model()
+
+
+class FollowGraphTests(TestCase):
+    """Проверяем граф подписок в памяти."""
+    def setUp(self):
+        self.graph = FollowGraph.from_edges(
+            [(1, 2), (1, 3), (2, 1), (2, 4), (3, 4), (3, 5), (4, 5)])
+
+    def test_adjacency(self):
+        """Списки подписок и подписчиков отсортированы."""
+        self.assertEqual(list(self.graph.following(1)), [2, 3])
+        self.assertEqual(list(self.graph.followers(5)), [3, 4])
+        self.assertEqual(list(self.graph.following(42)), [])
+        self.assertTrue(self.graph.is_following(3, 5))
+        self.assertFalse(self.graph.is_following(5, 3))
+
+    def test_mutual(self):
+        """Взаимные подписки."""
+        self.assertEqual(list(self.graph.mutual(1)), [2])
+        self.assertEqual(list(self.graph.mutual(3)), [])
+
+    def test_recommend(self):
+        """Рекомендации: друзья друзей по числу общих связей."""
+        self.assertEqual(self.graph.recommend(1), [4, 5])
+        self.assertEqual(self.graph.recommend(1, limit=1), [4])
+
+    def test_recommend_fanout_window(self):
+        """fanout берёт авторов подряд со случайного места, а не с начала."""
+        graph = FollowGraph.from_edges(
+            [(1, 2)] + [(2, author) for author in range(10, 20)])
+        with mock.patch('posts.follow_graph.random.randrange',
+                        return_value=8):
+            self.assertEqual(graph.recommend(1, fanout=3), [10, 18, 19])
+
+    def test_incremental_updates(self):
+        """Добавление и удаление рёбер."""
+        self.graph.add(5, 1)
+        self.graph.add(5, 1)
+        self.assertEqual(list(self.graph.followers(1)), [2, 5])
+        self.assertEqual(self.graph.edges, 8)
+        self.graph.remove(1, 2)
+        self.assertFalse(self.graph.is_following(1, 2))
+        self.assertEqual(list(self.graph.followers(2)), [])
+        self.assertEqual(self.graph.edges, 7)
+
+    def test_snapshot_roundtrip(self):
+        """Снимок на диске восстанавливает тот же граф."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'graph.bin')
+            self.graph.dump(path)
+            restored = FollowGraph()
+            self.assertTrue(restored.load_snapshot(path))
+        self.assertEqual(restored.edges, self.graph.edges)
+        for user_id in range(1, 6):
+            with self.subTest(user_id=user_id):
+                self.assertEqual(restored.following(user_id),
+                                 self.graph.following(user_id))
+                self.assertEqual(restored.followers(user_id),
+                                 self.graph.followers(user_id))
+
+    def test_large_ids(self):
+        """id больше 2**31 помещаются в массивы."""
+        big = 2 ** 40
+        graph = FollowGraph.from_edges([(big, big + 1)])
+        self.assertEqual(list(graph.following(big)), [big + 1])
+
+    def test_follow_index_keeps_rank(self):
+        """Лента подписок показывает рекомендации в порядке графа."""
+        reader = User.objects.create_user(username='reader')
+        anna = User.objects.create_user(username='anna')
+        boris = User.objects.create_user(username='boris')
+        self.client.force_login(reader)
+        with mock.patch.object(graph, 'recommend',
+                               return_value=[boris.pk, anna.pk]):
+            response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.context['recommended'], [boris, anna])
+
+
+class FollowGraphSyncTests(TransactionTestCase):
+    """Граф процесса меняется только закоммиченными подписками."""
+    def setUp(self):
+        self.leo = User.objects.create_user(username='leo')
+        self.anna = User.objects.create_user(username='anna')
+        graph.load()
+        graph.version = bump_version()
+
+    def test_signals_update_loaded_graph(self):
+        """Сигналы Follow обновляют загруженный граф процесса."""
+        follow = Follow.objects.create(user=self.leo, author=self.anna)
+        self.assertTrue(graph.is_following(self.leo.pk, self.anna.pk))
+        follow.delete()
+        self.assertFalse(graph.is_following(self.leo.pk, self.anna.pk))
+
+    def test_rolled_back_follow_not_added(self):
+        """Откаченная подписка не попадает в граф."""
+        with transaction.atomic():
+            Follow.objects.create(user=self.leo, author=self.anna)
+            transaction.set_rollback(True)
+        self.assertFalse(graph.is_following(self.leo.pk, self.anna.pk))
+
+    @override_settings(FOLLOW_GRAPH_SYNC_INTERVAL=60 * 60)
+    def test_changes_from_other_workers(self):
+        """Граф сверяется с таблицей, когда меняется общая версия."""
+        # Подписки другого воркера: сигналы этого процесса их не видят
+        Follow.objects.bulk_create([
+            Follow(user=self.leo, author=self.anna),
+            Follow(user=self.anna, author=self.leo)])
+        self.assertFalse(get_graph().is_following(self.leo.pk, self.anna.pk))
+        bump_version()
+        self.assertTrue(get_graph().is_following(self.leo.pk, self.anna.pk))
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {Follow._meta.db_table} '
+                           f'WHERE user_id = %s', [self.leo.pk])
+        self.assertTrue(get_graph().is_following(self.leo.pk, self.anna.pk))
+        bump_version()
+        self.assertFalse(get_graph().is_following(self.leo.pk, self.anna.pk))
+        self.assertTrue(get_graph().is_following(self.anna.pk, self.leo.pk))
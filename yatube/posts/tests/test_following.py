@@ -0,0 +1,59 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.template import Context, Template
+from django.test import RequestFactory, TestCase
+
+from ..following import following_set
+from ..models import Follow
+
+User = get_user_model()
+
+
+class FollowSetTests(TestCase):
+    """Подписки пользователя проверяются пачкой за запрос."""
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='anna')
+        cls.authors = [User.objects.create_user(username=f'author{i}')
+                       for i in range(5)]
+        for author in cls.authors[:2]:
+            Follow.objects.create(user=cls.reader, author=author)
+
+    def setUp(self):
+        self.request = RequestFactory().get('/')
+        self.request.user = FollowSetTests.reader
+
+    def test_prime_is_one_query(self):
+        """Список авторов проверяется одним запросом."""
+        authors = FollowSetTests.authors
+        follow_set = following_set(self.request)
+        self.assertIs(follow_set, following_set(self.request))
+        with self.assertNumQueries(1):
+            follow_set.prime(authors)
+            flags = [author in follow_set for author in authors]
+        self.assertEqual(flags, [True, True, False, False, False])
+
+    def test_unknown_author_loads_once(self):
+        """Без prime все подписки загружаются один раз."""
+        follow_set = following_set(self.request)
+        with self.assertNumQueries(1):
+            for author in FollowSetTests.authors:
+                author.pk in follow_set
+
+    def test_anonymous_no_queries(self):
+        self.request.user = AnonymousUser()
+        with self.assertNumQueries(0):
+            self.assertNotIn(FollowSetTests.authors[0],
+                             following_set(self.request))
+
+    def test_template_filter(self):
+        """Фильтр is_following не делает запросов после prime."""
+        authors = FollowSetTests.authors
+        following_set(self.request).prime(authors)
+        template = Template(
+            '{% load following %}{% for author in authors %}'
+            '{{ author|is_following:request|yesno:"1,0" }}{% endfor %}')
+        with self.assertNumQueries(0):
+            html = template.render(Context(
+                {'authors': authors, 'request': self.request}))
+        self.assertEqual(html, '11000')
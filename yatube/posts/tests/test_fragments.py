@@ -0,0 +1,68 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Follow, Post
+
+User = get_user_model()
+
+
+class FragmentTests(TestCase):
+    """Общая оболочка страницы и персональные фрагменты."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='leo')
+        cls.reader = User.objects.create_user(username='anna')
+        cls.post = Post.objects.create(author=cls.author, text='Тест')
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(FragmentTests.reader)
+        self.author_client = Client()
+        self.author_client.force_login(FragmentTests.author)
+
+    def test_cached_shell_is_personalized(self):
+        """Закэшированная оболочка дополняется данными пользователя."""
+        url = reverse('posts:post_detail',
+                      kwargs={'post_id': FragmentTests.post.pk})
+        guest = self.client.get(url)
+        reader = self.reader_client.get(url)
+        author = self.author_client.get(url)
+        self.assertContains(guest, 'Войти')
+        self.assertNotContains(guest, 'csrfmiddlewaretoken')
+        self.assertContains(reader, 'Пользователь: <b>anna</b>')
+        self.assertContains(reader, 'csrfmiddlewaretoken')
+        self.assertNotContains(reader, 'редактировать запись')
+        self.assertContains(author, 'редактировать запись')
+        for response in (guest, reader, author):
+            self.assertNotContains(response, '<esi:include')
+
+    def test_follow_button(self):
+        """Кнопка подписки зависит от читателя, а не от кэша."""
+        url = reverse('posts:profile', kwargs={'username': 'leo'})
+        self.assertContains(self.reader_client.get(url), 'Подписаться')
+        Follow.objects.create(user=FragmentTests.reader,
+                              author=FragmentTests.author)
+        self.assertContains(self.reader_client.get(url), 'Отписаться')
+
+    def test_edge_keeps_esi(self):
+        """Для edge-кэша с поддержкой ESI разметка не заполняется."""
+        response = self.client.get(
+            reverse('posts:profile', kwargs={'username': 'leo'}),
+            HTTP_SURROGATE_CAPABILITY='edge="ESI/1.0"')
+        self.assertContains(response, '<esi:include')
+        self.assertEqual(response['Surrogate-Control'], 'content="ESI/1.0"')
+
+    def test_fragment_url(self):
+        """Фрагмент доступен по отдельному адресу."""
+        response = self.reader_client.get(
+            reverse('core:fragment', args=['follow_button']),
+            {'author': 'leo'})
+        self.assertContains(response, reverse(
+            'posts:profile_follow', kwargs={'username': 'leo'}))
+        response = self.client.get(
+            reverse('core:fragment', args=['unknown']))
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,94 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..forms import PostForm
+from ..group_cache import GroupCache, group_cache
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class GroupCacheTests(TestCase):
+    """Кэш групп и каталог групп."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='leo')
+        cls.group = Group.objects.create(
+            title='Группа поклонников графа',
+            slug='tolstoi',
+            description='Что-то о группе'
+        )
+        cls.empty_group = Group.objects.create(
+            title='Пустая группа',
+            slug='empty',
+            description='Без записей'
+        )
+        Post.objects.create(author=cls.user, text='Пост', group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        group_cache.invalidate()
+
+    def test_group_page_without_group_query(self):
+        """Страница группы не запрашивает саму группу из БД."""
+        group_cache.all()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('posts:group_list', kwargs={'slug': 'tolstoi'}))
+        self.assertEqual(response.context['group'], GroupCacheTests.group)
+        for query in queries.captured_queries:
+            self.assertNotIn('FROM "posts_group"', query['sql'])
+
+    def test_unknown_group(self):
+        response = self.client.get(
+            reverse('posts:group_list', kwargs={'slug': 'nope'}))
+        self.assertEqual(response.status_code, 404)
+
+    def test_post_form_choices_from_cache(self):
+        """Выбор группы в форме рендерится без запросов."""
+        group_cache.all()
+        with self.assertNumQueries(0):
+            html = str(PostForm()['group'])
+        self.assertIn('Пустая группа', html)
+
+    def test_group_index(self):
+        """Каталог показывает число записей в группах."""
+        response = self.client.get(reverse('posts:group_index'))
+        items = {item['group'].slug: item
+                 for item in response.context['groups']}
+        self.assertEqual(items['tolstoi']['posts_count'], 1)
+        self.assertIsNotNone(items['tolstoi']['latest'])
+        self.assertEqual(items['empty']['posts_count'], 0)
+        self.assertContains(response, 'Пустая группа')
+
+
+class GroupCacheSyncTests(TransactionTestCase):
+    """Сброс кэша групп после коммита во всех процессах."""
+    def setUp(self):
+        cache.clear()
+        group_cache.invalidate()
+
+    def test_invalidation(self):
+        """Изменение группы сбрасывает кэш после коммита."""
+        self.assertIsNone(group_cache.by_slug('new'))
+        with transaction.atomic():
+            group = Group.objects.create(title='Новая', slug='new',
+                                         description='')
+            self.assertIsNone(group_cache.by_slug('new'))
+        self.assertEqual(group_cache.by_slug('new'), group)
+        group.delete()
+        self.assertIsNone(group_cache.by_slug('new'))
+
+    def test_other_worker_sees_new_group(self):
+        """Кэш другого воркера сверяется с общей версией."""
+        other = GroupCache()
+        self.assertIsNone(other.by_slug('new'))
+        group = Group.objects.create(title='Новая', slug='new',
+                                     description='')
+        self.assertEqual(other.by_slug('new'), group)
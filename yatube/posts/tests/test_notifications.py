@@ -0,0 +1,88 @@
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import DigestRun, Follow, Notification, Post
+from ..notifications import send_digests, unread_count
+
+User = get_user_model()
+
+
+class DigestTests(TestCase):
+    """Дайджесты считаются за проход команды, а не при публикации."""
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(
+            username='anna', email='anna@example.com')
+        cls.silent = User.objects.create_user(username='boris')
+        cls.leo = User.objects.create_user(username='leo')
+        cls.fedor = User.objects.create_user(username='fedor')
+        for author in (cls.leo, cls.fedor):
+            Follow.objects.create(user=cls.reader, author=author)
+        Follow.objects.create(user=cls.silent, author=cls.leo)
+        Post.objects.create(author=cls.leo, text='Старый пост')
+
+    def setUp(self):
+        cache.clear()
+
+    def publish(self, author, count):
+        Post.objects.bulk_create(
+            Post(author=author, text=f'Пост {i}') for i in range(count))
+
+    def test_first_run_sets_watermark(self):
+        """Первый проход не рассылает старые посты."""
+        run = send_digests()
+        self.assertEqual((run.followers, run.emails), (0, 0))
+        self.assertIsNone(send_digests())
+        self.assertFalse(Notification.objects.exists())
+        self.assertEqual(mail.outbox, [])
+
+    def test_digest_counts_new_posts(self):
+        """Счётчики и письма получают только подписчики авторов."""
+        send_digests()
+        self.publish(DigestTests.leo, 2)
+        self.publish(DigestTests.fedor, 1)
+        self.assertEqual(unread_count(DigestTests.reader), 0)
+        with self.assertNumQueries(12):
+            run = send_digests(size=1)
+        self.assertEqual((run.followers, run.emails), (2, 1))
+        self.assertEqual(unread_count(DigestTests.reader), 3)
+        self.assertEqual(unread_count(DigestTests.silent), 2)
+        self.assertEqual(unread_count(DigestTests.leo), 0)
+        self.assertEqual(mail.outbox[0].to, ['anna@example.com'])
+        self.assertIn('leo: 2', mail.outbox[0].body)
+        self.assertIn('fedor: 1', mail.outbox[0].body)
+        self.assertEqual(DigestRun.objects.first(), run)
+        self.publish(DigestTests.fedor, 1)
+        send_digests(emails=False)
+        self.assertEqual(unread_count(DigestTests.reader), 4)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_follow_read_resets_counter(self):
+        """Счётчик в шапке сбрасывает только POST, а не открытие ленты."""
+        send_digests()
+        self.publish(DigestTests.leo, 2)
+        send_digests()
+        self.client.force_login(DigestTests.silent)
+        response = self.client.get(reverse('about:tech'))
+        self.assertContains(response, 'badge bg-danger">2<')
+        self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(unread_count(DigestTests.silent), 2)
+        url = reverse('posts:follow_read')
+        self.assertEqual(self.client.get(url).status_code, 405)
+        self.assertRedirects(self.client.post(url),
+                             reverse('posts:follow_index'))
+        self.assertEqual(unread_count(DigestTests.silent), 0)
+        self.assertNotContains(self.client.get(reverse('about:tech')),
+                               'badge')
+
+    def test_claimed_watermark_skipped(self):
+        """Посты после забранного водяного знака второй раз не считаются."""
+        previous = send_digests()
+        self.publish(DigestTests.leo, 1)
+        DigestRun.objects.filter(pk=previous.pk).update(claimed=True)
+        self.assertIsNone(send_digests())
+        self.assertFalse(Notification.objects.exists())
+        self.assertEqual(DigestRun.objects.count(), 1)
@@ -0,0 +1,147 @@
+import os
+
+from core.testing.perf import Baseline, PerfRecorder
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase
+from django.urls import reverse
+
+from yatube.settings import PER_PAGE
+from .. import urls
+from ..group_cache import group_cache
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+BASELINE = Baseline(os.path.join(os.path.dirname(__file__),
+                                 'perf_baseline.json'))
+SIZES = (2, PER_PAGE)
+
+# Имя view -> (адрес по набору данных, кто открывает страницу)
+PAGES = {
+    'posts:posts_index': (lambda data: reverse('posts:posts_index'),
+                          'reader'),
+    'posts:group_index': (lambda data: reverse('posts:group_index'),
+                          'reader'),
+    'posts:group_list': (lambda data: reverse(
+        'posts:group_list', args=[data['group'].slug]), 'reader'),
+    'posts:profile': (lambda data: reverse(
+        'posts:profile', args=[data['author'].username]), 'reader'),
+    'posts:post_detail': (lambda data: reverse(
+        'posts:post_detail', args=[data['post'].pk]), 'reader'),
+    'posts:follow_index': (lambda data: reverse('posts:follow_index'),
+                           'reader'),
+    'posts:post_create': (lambda data: reverse('posts:post_create'),
+                          'reader'),
+    'posts:post_edit': (lambda data: reverse(
+        'posts:post_edit', args=[data['post'].pk]), 'author'),
+}
+
+# Имя изменяющей view -> запрос читателя по набору данных
+WRITES = {
+    'posts:add_comment': lambda client, data: client.post(
+        reverse('posts:add_comment', args=[data['post'].pk]),
+        {'text': 'Ещё комментарий'}),
+    'posts:profile_follow': lambda client, data: client.get(
+        reverse('posts:profile_follow', args=['other'])),
+    'posts:profile_unfollow': lambda client, data: client.get(
+        reverse('posts:profile_unfollow', args=['other'])),
+    'posts:follow_read': lambda client, data: client.post(
+        reverse('posts:follow_read')),
+    'posts:upload_create': lambda client, data: client.post(
+        reverse('posts:upload_create'), HTTP_UPLOAD_LENGTH='10',
+        HTTP_UPLOAD_NAME='cat.png'),
+}
+# Замеряются отдельно: нужен объект, созданный другой view
+SEPARATE = {'posts:upload_detail'}
+
+
+class ViewPerformanceTests(TestCase):
+    """Запросы и время каждой view из posts.urls против базовой линии."""
+
+    @classmethod
+    def tearDownClass(cls):
+        BASELINE.save()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.perf = PerfRecorder(BASELINE)
+
+    def dataset(self, size):
+        author = User.objects.create_user(username='author')
+        reader = User.objects.create_user(username='reader')
+        User.objects.create_user(username='other')
+        group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        Post.objects.bulk_create(
+            Post(author=author, group=group, text=f'Пост {i}')
+            for i in range(size))
+        post = Post.objects.latest('pk')
+        Comment.objects.bulk_create(
+            Comment(post=post, author=reader, text=f'Комментарий {i}')
+            for i in range(size))
+        Follow.objects.create(user=reader, author=author)
+        return {'author': author, 'reader': reader, 'group': group,
+                'post': post}
+
+    def request(self, call, warm_up=None):
+        """Прогревает кэши процесса, затем замеряет холодный общий кэш.
+
+        warm_up - адрес, открываемый заранее: так строятся данные,
+        которые view создаёт при первом показе (сводка профиля), и
+        замеряется установившееся число запросов.
+        """
+        self.client.get(warm_up or reverse('posts:posts_index'))
+        cache.clear()
+        # Версия кэша групп лежит в общем кэше: без неё кэш групп
+        # процесса загрузился бы заново внутри замера
+        group_cache.all()
+        return call
+
+    def test_pages_do_not_scale_with_page_size(self):
+        """Число запросов страниц не зависит от числа объектов."""
+        for size in SIZES:
+            with transaction.atomic():
+                data = self.dataset(size)
+                for name, (url, user) in PAGES.items():
+                    self.client.force_login(data[user])
+                    address = url(data)
+                    response = self.perf.measure(
+                        name, self.request(lambda: self.client.get(address),
+                                           warm_up=address),
+                        objects=size, size=size)
+                    self.assertEqual(response.status_code, 200, name)
+                transaction.set_rollback(True)
+        for name in PAGES:
+            self.perf.assert_constant(name)
+
+    def test_profile_first_view_builds_summary(self):
+        """Первый показ профиля строит сводку, следующие её читают."""
+        data = self.dataset(PER_PAGE)
+        address = reverse('posts:profile', args=[data['author'].username])
+        first = self.perf.measure('posts:profile:first', self.request(
+            lambda: self.client.get(address)))
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(self.client.get(address).status_code, 200)
+
+    def test_write_views(self):
+        """Изменяющие view укладываются в базовую линию."""
+        data = self.dataset(PER_PAGE)
+        reader = data['reader']
+        self.client.force_login(reader)
+        for name, write in WRITES.items():
+            response = self.perf.measure(name, self.request(
+                lambda: write(self.client, data)))
+            self.assertIn(response.status_code, (201, 302), name)
+        upload = reader.uploads.get()
+        response = self.perf.measure('posts:upload_detail', self.request(
+            lambda: self.client.head(
+                reverse('posts:upload_detail', args=[upload.pk]))))
+        self.assertEqual(response.status_code, 200)
+        upload.delete()
+
+    def test_every_view_measured(self):
+        """Каждая view из posts.urls есть в замерах."""
+        names = {f'posts:{pattern.name}' for pattern in urls.urlpatterns}
+        self.assertEqual(names, set(PAGES) | set(WRITES) | SEPARATE)
@@ -0,0 +1,79 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from yatube.settings import PER_PAGE
+from ..models import Follow, Post, ProfileSummary
+from ..profile_summary import get_summary_or_404
+
+User = get_user_model()
+
+
+class ProfileSummaryTests(TestCase):
+    """Сводка профиля поддерживается сигналами."""
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='leo')
+        cls.reader = User.objects.create_user(username='anna')
+
+    def setUp(self):
+        cache.clear()
+
+    def summary(self):
+        return ProfileSummary.objects.get(user=ProfileSummaryTests.author)
+
+    def test_built_on_first_view(self):
+        """Отсутствующая сводка строится при открытии профиля."""
+        Post.objects.create(author=ProfileSummaryTests.author, text='Тест')
+        self.assertFalse(ProfileSummary.objects.exists())
+        summary = get_summary_or_404('leo')
+        self.assertEqual(summary.posts_count, 1)
+        self.assertEqual(summary.user, ProfileSummaryTests.author)
+
+    def test_signals_update_summary(self):
+        """Посты и подписки пересчитывают счётчики."""
+        get_summary_or_404('leo')
+        get_summary_or_404('anna')
+        post = Post.objects.create(author=ProfileSummaryTests.author,
+                                   text='Тест')
+        summary = self.summary()
+        self.assertEqual(summary.posts_count, 1)
+        self.assertEqual(summary.first_page_ids, [post.pk])
+        self.assertEqual(summary.last_post_at, post.pub_date)
+        Follow.objects.create(user=ProfileSummaryTests.reader,
+                              author=ProfileSummaryTests.author)
+        self.assertEqual(self.summary().followers_count, 1)
+        self.assertEqual(ProfileSummary.objects.get(
+            user=ProfileSummaryTests.reader).following_count, 1)
+        post.delete()
+        Follow.objects.all().delete()
+        summary = self.summary()
+        self.assertEqual((summary.posts_count, summary.first_page,
+                          summary.followers_count), (0, '', 0))
+
+    def test_bulk_create_updates_summary(self):
+        """bulk_create без сигналов тоже обновляет сводку."""
+        get_summary_or_404('leo')
+        Post.objects.bulk_create(
+            Post(author=ProfileSummaryTests.author, text=f'Пост {i}')
+            for i in range(PER_PAGE + 3))
+        summary = self.summary()
+        self.assertEqual(summary.posts_count, PER_PAGE + 3)
+        self.assertEqual(len(summary.first_page_ids), PER_PAGE)
+
+    def test_profile_first_page_queries(self):
+        """Первая страница профиля - не больше двух запросов."""
+        Post.objects.bulk_create(
+            Post(author=ProfileSummaryTests.author, text=f'Пост {i}')
+            for i in range(PER_PAGE + 3))
+        get_summary_or_404('leo')
+        url = reverse('posts:profile', kwargs={'username': 'leo'})
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        page_obj = response.context['page_obj']
+        self.assertEqual(set(page_obj.object_list),
+                         set(Post.objects.all()[:PER_PAGE]))
+        self.assertEqual(page_obj.paginator.count, PER_PAGE + 3)
+        self.assertEqual(len(self.client.get(
+            url, {'page': 2}).context['page_obj']), 3)
@@ -0,0 +1,128 @@
+import io
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Post, Upload
+from ..uploads import UploadError, append_chunk
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+TEMP_UPLOAD_ROOT = os.path.join(TEMP_MEDIA_ROOT, 'uploads')
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x01\x00\x01\x00\x00\x00\x00\x21\xf9\x04'
+    b'\x01\x0a\x00\x01\x00\x2c\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02'
+    b'\x02\x4c\x01\x00\x3b')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT,
+                   CHUNKED_UPLOAD_ROOT=TEMP_UPLOAD_ROOT)
+class ChunkedUploadTests(TestCase):
+    """Загрузка картинки частями."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='leo')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(ChunkedUploadTests.user)
+
+    def start(self, content, name='small.gif'):
+        response = self.authorized_client.post(
+            reverse('posts:upload_create'),
+            HTTP_UPLOAD_LENGTH=str(len(content)), HTTP_UPLOAD_NAME=name)
+        self.assertEqual(response.status_code, 201)
+        return response['Location']
+
+    def send(self, url, data, offset):
+        return self.authorized_client.patch(
+            url, data, content_type='application/offset+octet-stream',
+            HTTP_UPLOAD_OFFSET=str(offset))
+
+    def test_resume_and_attach(self):
+        """Части дописываются с нужного смещения, пост получает файл."""
+        url = self.start(SMALL_GIF)
+        response = self.send(url, SMALL_GIF[:10], 0)
+        self.assertEqual(response['Upload-Offset'], '10')
+        self.assertEqual(self.send(url, SMALL_GIF[5:], 5).status_code, 409)
+        self.assertEqual(self.authorized_client.head(url)['Upload-Offset'],
+                         '10')
+        response = self.send(url, SMALL_GIF[10:], 10)
+        self.assertTrue(response.json()['completed'])
+        upload = Upload.objects.get()
+        path = upload.path
+        response = self.authorized_client.post(
+            reverse('posts:post_create'),
+            {'text': 'Пост с картинкой', 'upload_id': str(upload.pk)})
+        self.assertRedirects(response, reverse(
+            'posts:profile', kwargs={'username': 'leo'}))
+        post = Post.objects.get(text='Пост с картинкой')
+        self.assertTrue(post.image.name.startswith('posts/'))
+        with post.image.open('rb') as image:
+            self.assertEqual(image.read(), SMALL_GIF)
+        self.assertFalse(Upload.objects.exists())
+        self.assertFalse(os.path.exists(path))
+
+    def test_concurrent_chunk_rejected(self):
+        """Пока пишется часть, вторая часть с того же смещения - 409.
+
+        Тело копируется вне транзакции, база на это время не занята.
+        """
+        url = self.start(SMALL_GIF)
+        upload = Upload.objects.get()
+        second = {}
+        depth = len(connection.savepoint_ids)
+
+        class Stream(io.BytesIO):
+            def read(stream, size=-1):
+                self.assertEqual(len(connection.savepoint_ids), depth)
+                if not second:
+                    try:
+                        append_chunk(upload, 0, io.BytesIO(SMALL_GIF), 10)
+                    except UploadError as error:
+                        second['status'] = error.status
+                return super().read(size)
+
+        offset = append_chunk(upload, 0, Stream(SMALL_GIF[:10]), 10)
+        self.assertEqual(second, {'status': 409})
+        self.assertEqual(offset, 10)
+        self.assertEqual(self.authorized_client.head(url)['Upload-Offset'],
+                         '10')
+
+    def test_rejects_non_image(self):
+        """Файл, который не является картинкой, отклоняется по заголовку."""
+        url = self.start(b'not an image', name='notes.txt')
+        response = self.send(url, b'not an image', 0)
+        self.assertEqual(response.status_code, 415)
+        self.assertFalse(Upload.objects.exists())
+
+    def test_incomplete_upload_not_attached(self):
+        url = self.start(SMALL_GIF)
+        self.send(url, SMALL_GIF[:10], 0)
+        upload_id = url.rstrip('/').rsplit('/', 1)[-1]
+        response = self.authorized_client.post(
+            reverse('posts:post_create'),
+            {'text': 'Без картинки', 'upload_id': upload_id})
+        self.assertFormError(response, 'form', 'image',
+                             'Загрузка картинки не найдена')
+
+    def test_cleanup_command(self):
+        self.start(SMALL_GIF)
+        path = Upload.objects.get().path
+        call_command('cleanup_uploads', ttl=-1, stdout=open(os.devnull, 'w'))
+        self.assertFalse(Upload.objects.exists())
+        self.assertFalse(os.path.exists(path))
@@ -3,6 +3,7 @@ from http import HTTPStatus
 from django.contrib.auth import get_user_model
 from django.test import Client, TestCase
 
+from ..group_cache import group_cache
 from ..models import Group, Post
 
 User = get_user_model()
@@ -25,6 +26,8 @@ class StaticURLTests(TestCase):
         )
 
     def setUp(self):
+        # Группа создана в транзакции теста, сброс после коммита не придёт
+        group_cache.invalidate()
         self.guest_client = self.client
         self.user = User.objects.create_user(username='HasNoName')
         self.authorized_client = Client()
@@ -1,8 +1,11 @@
+from core.page_cache import page_version
 from django import forms
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase
+from django.db import transaction
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
 from django.urls import reverse
 
 from yatube.settings import PER_PAGE
@@ -100,6 +103,23 @@ class PostViewTests(TestCase):
                 response = self.authorized_client.get(reverse_name)
                 self.assertTemplateUsed(response, template)
 
+    @override_settings(
+        JINJA2_VIEWS={'posts:posts_index', 'posts:post_detail'})
+    def test_jinja2_templates(self):
+        """Ленту и пост можно отрендерить шаблонами Jinja2."""
+        urls = (
+            reverse('posts:posts_index'),
+            reverse('posts:post_detail',
+                    kwargs={'post_id': PostViewTests.post.pk}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertContains(response, PostViewTests.post.text)
+                self.assertContains(response, PostViewTests.user.username)
+                self.assertTemplateNotUsed(response, 'base.html')
+
     def test_paginator_correct_context(self):
         """Шаблон index, group_list и profile
         сформированы с корректным Paginator."""
@@ -294,3 +314,13 @@ class PostViewTests(TestCase):
         )
         context_unfollow = response_unfollow.context
         self.assertEqual(len(context_unfollow['page_obj']), 0)
+
+
+class PageVersionTests(TransactionTestCase):
+    def test_version_bumped_after_commit(self):
+        """Версия оболочек меняется ещё раз после коммита изменения."""
+        user = User.objects.create_user(username='leo')
+        with transaction.atomic():
+            Post.objects.create(author=user, text='Пост')
+            inside = page_version()
+        self.assertNotEqual(page_version(), inside)
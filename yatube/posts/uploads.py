@@ -0,0 +1,185 @@
+"""Загрузка картинок постов частями с докачкой.
+
+Клиент создаёт загрузку (POST с заголовками Upload-Length и
+Upload-Name), затем отправляет тело файла PATCH-запросами с
+заголовком Upload-Offset. Текущее смещение - размер файла на диске,
+его можно узнать HEAD-запросом и продолжить после обрыва. Запись
+части держит блокировку файла, второй PATCH в это время получает 409;
+транзакции БД на время передачи не открываются.
+Тело читается из потока блоками CHUNKED_UPLOAD_READ_SIZE, поэтому
+память на загрузку не зависит от размера файла.
+
+Как только на диске оказывается начало файла, Pillow проверяет
+заголовок картинки без декодирования пикселей. Готовый файл
+перемещается в хранилище при сохранении поста.
+"""
+import os
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File, locks
+from PIL import Image
+
+from .models import Upload
+
+HEADER_SIZE = 256 * 1024
+IMAGE_FORMATS = {'GIF', 'JPEG', 'PNG', 'WEBP'}
+
+
+class UploadError(Exception):
+    """Ошибка загрузки с HTTP-статусом для ответа."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def create_upload(user, size, filename):
+    """Новая загрузка после проверки заявленного размера и имени."""
+    try:
+        size = int(size)
+    except (TypeError, ValueError):
+        raise UploadError('Не указан размер файла')
+    if not 0 < size <= settings.CHUNKED_UPLOAD_MAX_SIZE:
+        raise UploadError('Недопустимый размер файла', status=413)
+    filename = os.path.basename(filename or '')
+    if not filename:
+        raise UploadError('Не указано имя файла')
+    os.makedirs(settings.CHUNKED_UPLOAD_ROOT, exist_ok=True)
+    upload = Upload.objects.create(user=user, size=size,
+                                   filename=filename[:255])
+    open(upload.path, 'wb').close()
+    return upload
+
+
+def check_header(path):
+    """Проверяет заголовок картинки, не декодируя её."""
+    try:
+        with Image.open(path) as image:
+            image_format = image.format
+            width, height = image.size
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError):
+        raise UploadError('Файл не является картинкой', status=415)
+    if image_format not in IMAGE_FORMATS:
+        raise UploadError('Неподдерживаемый формат картинки', status=415)
+    if width * height > settings.CHUNKED_UPLOAD_MAX_PIXELS:
+        raise UploadError('Слишком большая картинка', status=413)
+
+
+def copy_stream(stream, part, remaining):
+    """Копирует до remaining байт блоками; обрыв потока не ошибка."""
+    read_size = settings.CHUNKED_UPLOAD_READ_SIZE
+    while remaining > 0:
+        data = stream.read(min(read_size, remaining))
+        if not data:
+            break
+        part.write(data)
+        remaining -= len(data)
+    part.flush()
+
+
+def check_state(upload):
+    """Загрузка ещё существует и не завершена."""
+    completed = Upload.objects.filter(pk=upload.pk).values_list(
+        'completed', flat=True).first()
+    if completed is None:
+        raise UploadError('Загрузка не найдена', status=404)
+    if completed:
+        raise UploadError('Загрузка уже завершена', status=409)
+
+
+def write_chunk(upload, offset, stream, length):
+    """Пишет часть под блокировкой файла, возвращает (старое, новое) смещение.
+
+    Тело копируется вне транзакции: на SQLite она держала бы блокировку
+    базы, пока идёт передача. Завершение отмечается одним условным
+    UPDATE, пока файл ещё заблокирован.
+    """
+    try:
+        part = open(upload.path, 'r+b')
+    except FileNotFoundError:
+        raise UploadError('Загрузка не найдена', status=404)
+    with part:
+        try:
+            locks.lock(part, locks.LOCK_EX | locks.LOCK_NB)
+        except BlockingIOError:
+            raise UploadError('Часть уже загружается', status=409)
+        try:
+            check_state(upload)
+            current = os.fstat(part.fileno()).st_size
+            if offset != current:
+                raise UploadError('Неверное смещение', status=409)
+            part.seek(current)
+            copy_stream(stream, part, min(length, upload.size - current))
+            new_offset = part.tell()
+            if new_offset == upload.size and not Upload.objects.filter(
+                    pk=upload.pk, completed=False).update(completed=True):
+                raise UploadError('Загрузка не найдена', status=404)
+        finally:
+            locks.unlock(part)
+    upload.completed = new_offset == upload.size
+    return current, new_offset
+
+
+def append_chunk(upload, offset, stream, length):
+    """Дописывает часть файла из потока, возвращает новое смещение.
+
+    Смещение клиента должно совпадать с размером файла на диске.
+    Если соединение оборвалось, сохраняется всё, что успело прийти.
+    Ошибка проверки заголовка удаляет загрузку.
+    """
+    current, new_offset = write_chunk(upload, offset, stream, length)
+    header_end = min(HEADER_SIZE, upload.size)
+    if current < header_end <= new_offset:
+        try:
+            check_header(upload.path)
+        except UploadError:
+            upload.delete()
+            raise
+    return new_offset
+
+
+class UploadedChunks(File):
+    """Готовая загрузка как файл на диске.
+
+    temporary_file_path() позволяет хранилищу переместить файл,
+    а не копировать его.
+    """
+
+    def __init__(self, upload):
+        super().__init__(open(upload.path, 'rb'), name=upload.filename)
+        self.upload_path = upload.path
+
+    def temporary_file_path(self):
+        return self.upload_path
+
+
+def attach_upload(request, form):
+    """Прикрепляет готовую загрузку из поля upload_id к посту формы.
+
+    Возвращает False и добавляет ошибку в форму, если загрузка
+    не найдена или не завершена.
+    """
+    upload_id = request.POST.get('upload_id')
+    if not upload_id:
+        return True
+    try:
+        upload = Upload.objects.get(pk=upload_id, user=request.user,
+                                    completed=True)
+    except (Upload.DoesNotExist, ValidationError):
+        form.add_error('image', 'Загрузка картинки не найдена')
+        return False
+    content = UploadedChunks(upload)
+    try:
+        form.instance.image.save(upload.filename, content, save=False)
+    finally:
+        content.close()
+    upload.delete()
+    return True
+
+
+def remove_file(upload):
+    try:
+        os.remove(upload.path)
+    except FileNotFoundError:
+        pass
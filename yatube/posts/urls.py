@@ -7,6 +7,8 @@ app_name = 'posts'
 
 urlpatterns = [
     path('', views.index, name='posts_index'),
+    # Каталог групп
+    path('groups/', views.group_index, name='group_index'),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
     # Профайл пользователя
     path('profile/<str:username>/', views.profile, name='profile'),
@@ -16,11 +18,17 @@ urlpatterns = [
     path('create/', views.post_create, name='post_create'),
     # Редактирование поста
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
+    # Загрузка картинки частями
+    path('uploads/', views.upload_create, name='upload_create'),
+    path('uploads/<uuid:upload_id>/', views.upload_detail,
+         name='upload_detail'),
     # Добавление комментария к посту
     path('posts/<int:post_id>/comment/', views.add_comment,
          name='add_comment'),
     # Страница подписок
     path('follow/', views.follow_index, name='follow_index'),
+    # Сброс счётчика непрочитанных постов
+    path('follow/read/', views.follow_read, name='follow_read'),
     # Подписка на автора
     path(
         'profile/<str:username>/follow/',
@@ -1,8 +1,10 @@
 from django.core.paginator import Paginator
 
 
-def page(request, posts, per_page: int):
+def page(request, posts, per_page: int, count=None):
     paginator = Paginator(posts, per_page)
+    if count is not None:
+        paginator.count = count
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     return page_obj
@@ -1,59 +1,101 @@
+from urllib.parse import unquote
+
 from django.contrib.auth.decorators import login_required
+from django.db.models import Count, Max
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
-
-from yatube.settings import PER_PAGE
+from django.urls import reverse
+from django.views.decorators.cache import cache_page
+from django.views.decorators.http import require_http_methods
+
+from core.page_cache import cache_shell
+from core.shortcuts import template_engine
+from yatube.settings import (FOLLOW_RECOMMENDATIONS, PAGE_CACHE_TIMEOUT,
+                             PER_PAGE)
+from .follow_graph import get_graph
+from .following import following_set
 from .forms import CommentForm, PostForm
-from .models import Group, Post, User, Follow
+from .group_cache import get_group_or_404, group_cache
+from .models import Post, Upload, User, Follow
+from .notifications import mark_read
+from .profile_summary import first_page_posts, get_summary_or_404
+from .uploads import (UploadError, append_chunk, attach_upload,
+                      create_upload)
 from .utils import page
-from django.views.decorators.cache import cache_page
 
 
 @cache_page(20, key_prefix='index_page')
 def index(request):
-    post_list = Post.objects.all()
+    post_list = Post.objects.select_related('author', 'group')
     page_obj = page(request, post_list, PER_PAGE)
     context = {
         'page_obj': page_obj,
     }
-    return render(request, 'posts/index.html', context)
+    return render(request, 'posts/index.html', context,
+                  using=template_engine(request))
 
 
+@cache_shell(PAGE_CACHE_TIMEOUT, key_prefix='group_page')
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    posts = Post.objects.all().filter(
-        group=group)
+    group = get_group_or_404(slug)
+    posts = Post.objects.select_related('author').filter(
+        group_id=group.pk)
     page_obj = page(request, posts, PER_PAGE)
     context = {
         'page_obj': page_obj,
         'group': group,
     }
-    return render(request, 'posts/group_list.html', context)
-
-
+    return render(request, 'posts/group_list.html', context,
+                  using=template_engine(request))
+
+
+@cache_shell(PAGE_CACHE_TIMEOUT, key_prefix='groups_page')
+def group_index(request):
+    stats = Post.objects.filter(group__isnull=False).order_by().values(
+        'group').annotate(posts_count=Count('pk'), latest=Max('pub_date'))
+    stats = {row['group']: row for row in stats}
+    groups = [
+        {
+            'group': group,
+            'posts_count': stats.get(group.pk, {}).get('posts_count', 0),
+            'latest': stats.get(group.pk, {}).get('latest'),
+        }
+        for group in group_cache.all()
+    ]
+    return render(request, 'posts/group_index.html', {'groups': groups})
+
+
+@cache_shell(PAGE_CACHE_TIMEOUT, key_prefix='profile_page')
 def profile(request, username):
 
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.all()
-    page_obj = page(request, post_list, PER_PAGE)
-    following = False
-    if request.user.is_authenticated:
-        following = request.user.follower.filter(author=author).exists()
+    summary = get_summary_or_404(username)
+    author = summary.user
+    post_list = author.posts.select_related('group')
+    page_obj = page(request, post_list, PER_PAGE, count=summary.posts_count)
+    if page_obj.number == 1:
+        first_page = first_page_posts(summary)
+        if first_page is not None:
+            page_obj.object_list = first_page
     context = {
         'author': author,
+        'summary': summary,
         'page_obj': page_obj,
-        'following': following
     }
-    return render(request, 'posts/profile.html', context)
+    return render(request, 'posts/profile.html', context,
+                  using=template_engine(request))
 
 
+@cache_shell(PAGE_CACHE_TIMEOUT, key_prefix='post_page')
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author', 'group'), pk=post_id)
     context = {
         'post': post,
-        'comments': post.comments.all(),
+        'comments': post.comments.select_related('author'),
         'form': CommentForm(),
     }
-    return render(request, 'posts/post_detail.html', context)
+    return render(request, 'posts/post_detail.html', context,
+                  using=template_engine(request))
 
 
 @login_required
@@ -62,7 +104,7 @@ def post_create(request):
         request.POST or None,
         files=request.FILES or None
     )
-    if form.is_valid():
+    if form.is_valid() and attach_upload(request, form):
         temp_form = form.save(commit=False)
         temp_form.author = request.user
         temp_form.save()
@@ -83,7 +125,7 @@ def post_edit(request, post_id):
         files=request.FILES or None,
         instance=post
     )
-    if form.is_valid():
+    if form.is_valid() and attach_upload(request, form):
         form.save()
         return redirect(
             'posts:post_detail', post_id
@@ -96,6 +138,54 @@ def post_edit(request, post_id):
     return render(request, 'posts/post_create.html', data)
 
 
+def upload_state(upload, status=200):
+    response = JsonResponse({
+        'id': str(upload.pk),
+        'offset': upload.offset,
+        'size': upload.size,
+        'completed': upload.completed,
+    }, status=status)
+    response['Upload-Offset'] = upload.offset
+    response['Upload-Length'] = upload.size
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+@login_required
+@require_http_methods(['POST'])
+def upload_create(request):
+    try:
+        upload = create_upload(
+            request.user,
+            request.META.get('HTTP_UPLOAD_LENGTH'),
+            unquote(request.META.get('HTTP_UPLOAD_NAME', '')))
+    except UploadError as error:
+        return JsonResponse({'error': str(error)}, status=error.status)
+    response = upload_state(upload, status=201)
+    response['Location'] = reverse('posts:upload_detail', args=[upload.pk])
+    return response
+
+
+@login_required
+@require_http_methods(['GET', 'HEAD', 'PATCH', 'DELETE'])
+def upload_detail(request, upload_id):
+    upload = get_object_or_404(Upload, pk=upload_id, user=request.user)
+    if request.method == 'DELETE':
+        upload.delete()
+        return HttpResponse(status=204)
+    if request.method == 'PATCH':
+        try:
+            append_chunk(upload,
+                         int(request.META.get('HTTP_UPLOAD_OFFSET', -1)),
+                         request,
+                         int(request.META.get('CONTENT_LENGTH') or 0))
+        except ValueError:
+            return JsonResponse({'error': 'Неверные заголовки'}, status=400)
+        except UploadError as error:
+            return JsonResponse({'error': str(error)}, status=error.status)
+    return upload_state(upload)
+
+
 @login_required
 def add_comment(request, post_id):
     # Получите пост и сохраните его в переменную post.
@@ -112,13 +202,32 @@ def add_comment(request, post_id):
 def follow_index(request):
     template = 'posts/follow.html'
     title = 'Публикации избранных авторов'
-    posts = Post.objects.filter(author__following__user=request.user)
+    posts = Post.objects.filter(
+        author__following__user=request.user).select_related(
+        'author', 'group')
     page_obj = page(request, posts, PER_PAGE)
+    recommended_ids = get_graph().recommend(
+        request.user.pk, FOLLOW_RECOMMENDATIONS)
+    # Порядок рекомендаций из графа: по числу общих связей
+    rank = {pk: index for index, pk in enumerate(recommended_ids)}
+    recommended = sorted(
+        User.objects.filter(pk__in=recommended_ids),
+        key=lambda user: rank[user.pk]) if recommended_ids else []
+    following_set(request).prime(recommended_ids)
     context = {
         'title': title,
         'page_obj': page_obj,
+        'recommended': recommended,
     }
-    return render(request, template, context)
+    return render(request, template, context,
+                  using=template_engine(request))
+
+
+@login_required
+@require_http_methods(['POST'])
+def follow_read(request):
+    mark_read(request.user)
+    return redirect('posts:follow_index')
 
 
 @login_required
@@ -11,6 +11,12 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
 import os
+import tempfile
+
+try:
+    import jinja2
+except ImportError:
+    jinja2 = None
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -35,18 +41,51 @@ ALLOWED_HOSTS = [
 handler404 = 'core.views.page_not_found'
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
+# Пользователь берётся из кэша; ModelBackend оставлен для сессий,
+# созданных до его подключения
+AUTHENTICATION_BACKENDS = [
+    'core.auth_backends.CachedModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+# Алиас общего кэша (memcached, redis) для пользователей; локальный
+# кэш процесса не годится: сброс после смены пароля не дойдёт до
+# других воркеров. None - пользователь читается из БД
+USER_CACHE = None
+USER_CACHE_TIMEOUT = 5 * 60
+
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:posts_index'
 # LOGOUT_REDIRECT_URL = 'posts:posts_index'
 
 
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Письма складываются в очередь, send_queued_mail отправляет их
+# через EMAIL_DELIVERY_BACKEND
+EMAIL_BACKEND = 'core.mail.QueuedEmailBackend'
+EMAIL_DELIVERY_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+EMAIL_QUEUE_BATCH = 100
+EMAIL_QUEUE_MAX_ATTEMPTS = 5
+# Пауза перед повтором удваивается с каждой неудачной попыткой
+EMAIL_QUEUE_RETRY_DELAY = 60
 
 # Constants
 
 PER_PAGE = 10
 
+# Снимок графа подписок, с которого стартуют воркеры
+FOLLOW_GRAPH_SNAPSHOT = os.path.join(BASE_DIR, 'follow_graph.bin')
+# Не реже чем раз в столько секунд граф сверяется с таблицей Follow
+FOLLOW_GRAPH_SYNC_INTERVAL = 60
+FOLLOW_RECOMMENDATIONS = 5
+# Сколько id авторов проверять одним запросом IN
+FOLLOW_SET_IN_LIMIT = 500
+
+# Время жизни закэшированных оболочек страниц групп, профилей и постов
+PAGE_CACHE_TIMEOUT = 60
+
+# Сколько секунд кэш групп живёт без сигнала об изменении
+GROUP_CACHE_TTL = 300
+
 # Application definition
 
 CACHES = {
@@ -71,21 +110,26 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.ProfilingMiddleware',
+    'core.middleware.StaticFilesMiddleware',
+    'core.middleware.PrerenderMiddleware',
+    'core.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.ThrottleMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.FragmentMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template_backends.DjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
@@ -93,11 +137,50 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.year.year',
+                'posts.context_processors.notifications',
+            ],
+            # Кэширующий загрузчик включен явно и не зависит от DEBUG
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
             ],
         },
     },
 ]
 
+if jinja2 is not None:
+    TEMPLATES.append({
+        'NAME': 'jinja2',
+        'BACKEND': 'django.template.backends.jinja2.Jinja2',
+        'DIRS': [os.path.join(BASE_DIR, 'jinja2')],
+        'OPTIONS': {
+            'environment': 'core.jinja2_env.environment',
+            'context_processors': [
+                'django.contrib.auth.context_processors.auth',
+                'core.context_processors.year.year',
+            ],
+        },
+    })
+
+# Процессоры, которые вычисляются только когда шаблон
+# обращается к одному из перечисленных ключей. auth сюда не входит:
+# его user и perms и так ленивые, а теги админки ждут их без обёртки
+LAZY_CONTEXT_PROCESSORS = {
+    'django.contrib.messages.context_processors.messages': (
+        'messages', 'DEFAULT_MESSAGE_LEVELS'),
+    'core.context_processors.year.year': ('year',),
+    'posts.context_processors.notifications': ('unread_posts',),
+}
+
+# Компилировать все шаблоны из DIRS при старте воркера (yatube/wsgi.py)
+TEMPLATES_WARMUP = True
+
+# Имена view, которые рендерятся шаблонами Jinja2 (если он установлен),
+# например {'posts:posts_index', 'posts:post_detail'}
+JINJA2_VIEWS = set()
+
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
 
@@ -115,6 +198,17 @@ DATABASES = {
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
 
+# Хэширование в отдельном пуле потоков; при смене числа итераций
+# хэш пароля пересчитывается при следующем входе
+PASSWORD_HASHERS = [
+    'core.hashers.PooledPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+PASSWORD_HASH_ITERATIONS = 150000
+PASSWORD_HASH_WORKERS = 4
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -123,7 +217,7 @@ AUTH_PASSWORD_VALIDATORS = [
         'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
     },
     {
-        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
+        'NAME': 'core.password_validation.CommonPasswordValidator',
     },
     {
         'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
@@ -152,5 +246,83 @@ POSTS_SHOWED = 10
 
 STATIC_URL = '/static/'
 STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static'),)
+STATIC_ROOT = os.path.join(BASE_DIR, 'collected_static')
+# Имена с хэшем содержимого, .gz и .br создаются при collectstatic
+STATICFILES_STORAGE = 'core.staticfiles.CompressedManifestStaticFilesStorage'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Хранилище сессий выбирается переменной окружения YATUBE_SESSIONS.
+# cached_db допускается только с общим SESSION_CACHE_ALIAS (core.E001)
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+    'file_sharded': 'core.sessions.file_sharded',
+}
+SESSION_ENGINE = SESSION_ENGINES[
+    os.environ.get('YATUBE_SESSIONS', 'db')]
+SESSION_FILE_PATH = os.path.join(BASE_DIR, 'sessions')
+
+# Страницы, которые команда prerender сохраняет для гостей
+PRERENDER_ROOT = os.path.join(BASE_DIR, 'prerendered')
+PRERENDER_VIEWS = ['about:author', 'about:tech']
+PRERENDER_MAX_AGE = 10 * 60
+
+# Сжатие ответов (CompressionMiddleware) и удаление пробелов из HTML
+COMPRESSION_MIN_SIZE = 512
+COMPRESSION_LEVEL = 6
+HTML_MINIFY = False
+
+# Отдавать статику и медиа из процесса (StaticFilesMiddleware)
+SERVE_FILES = True
+# Cache-Control для файлов без хэша в имени
+FILES_MAX_AGE = 60 * 60
+
+# Загрузка картинок частями: недокачанные файлы, лимиты и срок хранения
+CHUNKED_UPLOAD_ROOT = os.path.join(BASE_DIR, 'uploads')
+CHUNKED_UPLOAD_MAX_SIZE = 20 * 1024 * 1024
+CHUNKED_UPLOAD_READ_SIZE = 64 * 1024
+CHUNKED_UPLOAD_MAX_PIXELS = 50_000_000
+CHUNKED_UPLOAD_TTL = 24 * 60 * 60
+# Сколько секунд файл без ссылок хранится до удаления командой gc_media
+MEDIA_GC_GRACE = 24 * 60 * 60
+
+# Дайджесты новых постов для подписчиков (команда send_digests)
+DIGEST_EMAILS = True
+DIGEST_SITE_URL = 'http://localhost:8000'
+NOTIFICATIONS_CACHE_TIMEOUT = 5 * 60
+
+# Лимиты запросов, меняющих данные: пользователь или IP гостя.
+# Счётчики живут в общем кэше THROTTLE_CACHE (memcached, redis);
+# пока он не задан, лимиты не проверяются
+THROTTLE_CACHE = None
+THROTTLE_RATES = {
+    'posts:post_create': '20/m',
+    'posts:post_edit': '30/m',
+    'posts:add_comment': '30/m',
+    'posts:profile_follow': '60/m',
+    'posts:profile_unfollow': '60/m',
+    'users:signup': '20/h',
+}
+# View, которые меняют данные и по GET
+THROTTLE_ALL_METHODS = {'posts:profile_follow', 'posts:profile_unfollow'}
+
+# Профилирование на работающем сайте (страница core:profiling).
+# Сеансы и стеки хранятся в общем кэше PROFILING_CACHE (memcached,
+# redis); пока он не задан, сеанс не запускается
+PROFILING_CACHE = None
+PROFILING_INTERVAL_MS = 5
+# Как часто воркер перечитывает настройку сеанса из кэша
+PROFILING_CONFIG_TTL = 5
+# Сколько секунд стеки хранятся после конца сеанса
+PROFILING_KEEP = 24 * 60 * 60
+PROFILING_MAX_STACKS = 5000
+# Как часто воркер добавляет накопленные стеки в кэш
+PROFILING_FLUSH_INTERVAL = 5
+
+# Тесты: базы копируются из мигрированного шаблона (core.testing)
+TEST_RUNNER = 'core.testing.runner.TemplateDBTestRunner'
+TEST_TEMPLATE_DIR = os.path.join(tempfile.gettempdir(), 'yatube-test-db')
+# Функции, заполняющие шаблон общими данными один раз
+TEST_SNAPSHOT_FIXTURES = []
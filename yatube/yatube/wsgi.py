@@ -14,3 +14,14 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+# Шаблоны компилируются и граф подписок загружается до первого запроса
+# воркера, а не при каждой команде manage.py
+from django.conf import settings  # noqa: E402
+
+from core.templates_warmup import warm_templates  # noqa: E402
+from posts.follow_graph import preload  # noqa: E402
+
+if settings.TEMPLATES_WARMUP:
+    warm_templates()
+preload()